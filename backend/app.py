@@ -12,6 +12,8 @@ from routes.products import product_bp
 from routes.factor import factor_bp
 from routes.emissions import emission_bp
 from routes.report import report_bp
+from routes.report_jobs import start_report_job_sweeper
+from routes.token_revocation import get_revocation_store
 
 load_dotenv()
 jwt = JWTManager()
@@ -27,8 +29,18 @@ def create_app(config_class=Config):
     app.config["REPORT_RECORDS_DIR"] = os.path.join(
         app.root_path, "report", "records"
     )
+    app.config["REPORT_CACHE_DIR"] = os.path.join(
+        app.root_path, "report", "cache"
+    )
+    app.config["REPORT_JOBS_DIR"] = os.path.join(
+        app.root_path, "report", "jobs"
+    )
     jwt.init_app(app)  
 
+    @jwt.token_in_blocklist_loader
+    def token_revoked(jwt_header, jwt_payload):
+        return get_revocation_store(app.config).is_revoked(jwt_payload)
+
     # register blueprints
     app.register_blueprint(onchain_bp)
     app.register_blueprint(auth_bp)
@@ -37,6 +49,9 @@ def create_app(config_class=Config):
     app.register_blueprint(factor_bp)
     app.register_blueprint(emission_bp) 
     app.register_blueprint(report_bp)
+
+    # renew report job leases and pick up jobs orphaned by other workers
+    start_report_job_sweeper(app.config)
     
     # --------- Swagger ---------
     @app.route("/openapi.yaml")  # Serve raw OpenAPI file
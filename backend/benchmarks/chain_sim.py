@@ -0,0 +1,212 @@
+# backend/benchmarks/chain_sim.py
+#
+# Stand-in for chain-service (chain-service/src/index.js) that needs no Quorum
+# node. It speaks the same API:
+#   POST /send      {emission_id, payload}          one record per emission
+#   POST /anchor    {batch_id, merkle_root, leaf_count}  one record per batch
+#   GET  /record/:id
+#   GET  /health
+# and, like the real service, reports each outcome to CALLBACK_URL with the
+# X-Chain-Secret header before answering.
+#
+# Transactions are "mined" by a block timer: a request waits for the next
+# block, as tx.wait() does, on top of a configurable RPC latency. A share of
+# the requests fails with a 500 and a 'failed' callback.
+#
+# Usage (from backend/):
+#   python -m benchmarks.chain_sim --port 3001 --block-time 1 --latency 0.05 --failure-rate 0.02
+# then point the backend's CHAIN_SERVICE_URL at http://<host>:3001.
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+CREATOR = "0x" + "5a" * 20  # stands in for the wallet address
+HEX_ROOT = re.compile(r"^[0-9a-f]{64}$")
+
+
+class SimulatedChain:
+    """Append-only record store with a block clock."""
+
+    def __init__(self, block_time: float):
+        self.block_time = block_time
+        self.records: list[tuple[int, str, str]] = []
+        self.block = 0
+        self.nonce = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self.counts = {"sent": 0, "failed": 0, "callbacks_failed": 0}
+        if block_time > 0:
+            threading.Thread(target=self._mine, name="chain-sim-miner", daemon=True).start()
+
+    def _mine(self):
+        while not self._stop.wait(self.block_time):
+            with self._cond:
+                self.block += 1
+                self._cond.notify_all()
+
+    def add_record(self, content: str) -> tuple[str, int]:
+        """Queue a record, wait for the block that includes it; returns (tx_hash, record_id)."""
+        with self._cond:
+            self.nonce += 1
+            tx_hash = "0x" + hashlib.sha256(f"{self.nonce}:{content}".encode("utf-8")).hexdigest()
+            record_id = len(self.records)
+            self.records.append((record_id, content, CREATOR))
+            included_in = self.block + 1
+            if self.block_time > 0:
+                while self.block < included_in and not self._stop.is_set():
+                    self._cond.wait()
+        return tx_hash, record_id
+
+    def count(self, name: str):
+        with self._cond:
+            self.counts[name] += 1
+
+    def get_record(self, record_id: int) -> tuple[int, str, str] | None:
+        with self._cond:
+            if 0 <= record_id < len(self.records):
+                return self.records[record_id]
+        return None
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+
+def make_handler(chain: SimulatedChain, *, latency: float, jitter: float, failure_rate: float,
+                 callback_url: str, secret: str, quiet: bool):
+    local = threading.local()  # one keep-alive session per handler thread
+
+    def callback(body: dict):
+        if not callback_url:
+            return
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        try:
+            local.session.put(callback_url, json=body, headers={"X-Chain-Secret": secret}, timeout=10)
+        except requests.RequestException as e:
+            chain.count("callbacks_failed")
+            print(f"Callback failed: {e}")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like express
+
+        def log_message(self, fmt, *args):
+            if not quiet:
+                super().log_message(fmt, *args)
+
+        def _json(self, code: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                return json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return {}
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._json(200, {"ok": True, "msg": "chain-service simulator running"})
+            m = re.fullmatch(r"/record/(\d+)", self.path)
+            if not m:
+                return self._json(404, {"ok": False, "error": "not found"})
+            record = chain.get_record(int(m.group(1)))
+            if record is None:
+                return self._json(500, {"ok": False, "error": "record does not exist"})
+            return self._json(200, {"ok": True, "record": {"id": str(record[0]), "content": record[1], "creator": record[2]}})
+
+        def do_POST(self):
+            body = self._body()
+            if self.path == "/send":
+                key, content = "emission_id", body.get("payload")
+                if not body.get("emission_id") or not content:
+                    return self._json(400, {"ok": False, "error": "Missing emission_id or payload"})
+                content = json.dumps(content, separators=(",", ":"))  # as JSON.stringify
+            elif self.path == "/anchor":
+                key = "batch_id"
+                if (not body.get("batch_id") or not HEX_ROOT.match(str(body.get("merkle_root") or ""))
+                        or not (body.get("leaf_count") or 0) > 0):
+                    return self._json(400, {"ok": False, "error": "Missing batch_id, merkle_root or leaf_count"})
+                content = json.dumps({
+                    "type": "merkle_batch",
+                    "batch_id": body["batch_id"],
+                    "merkle_root": body["merkle_root"],
+                    "leaf_count": body["leaf_count"],
+                }, separators=(",", ":"))
+            else:
+                return self._json(404, {"ok": False, "error": "not found"})
+
+            time.sleep(max(0.0, random.gauss(latency, jitter)))
+            if random.random() < failure_rate:
+                chain.count("failed")
+                error = "simulated transaction failure"
+                callback({key: body[key], "status": "failed", "error_msg": error})
+                return self._json(500, {"ok": False, "error": error})
+
+            tx_hash, record_id = chain.add_record(content)
+            chain.count("sent")
+            result = {key: body[key], "status": "submitted", "tx_hash": tx_hash}
+            if key == "batch_id":
+                result["record_id"] = str(record_id)
+            callback(result)
+            return self._json(200, {"ok": True, "txHash": tx_hash, "recordId": str(record_id)})
+
+    return Handler
+
+
+def serve(host: str, port: int, **options) -> tuple[ThreadingHTTPServer, SimulatedChain]:
+    """Start the simulator in a background thread; returns (server, chain)."""
+    chain = SimulatedChain(options.pop("block_time"))
+    server = ThreadingHTTPServer((host, port), make_handler(chain, **options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="chain-sim", daemon=True).start()
+    return server, chain
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Simulated chain-service for local throughput testing")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=3001)
+    ap.add_argument("--block-time", type=float, default=1.0, help="seconds per block; 0 mines instantly")
+    ap.add_argument("--latency", type=float, default=0.05, help="mean RPC latency in seconds")
+    ap.add_argument("--jitter", type=float, default=0.01, help="latency standard deviation")
+    ap.add_argument("--failure-rate", type=float, default=0.0, help="share of requests that fail, 0..1")
+    ap.add_argument("--callback-url", default=os.getenv("CALLBACK_URL", ""))
+    ap.add_argument("--secret", default=os.getenv("CHAIN_SECRET", ""))
+    ap.add_argument("--quiet", action="store_true", help="do not log each request")
+    args = ap.parse_args()
+
+    server, chain = serve(
+        args.host, args.port,
+        block_time=args.block_time, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, callback_url=args.callback_url,
+        secret=args.secret, quiet=args.quiet,
+    )
+    print(f"chain-service simulator listening on port {server.server_port}")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"chain-sim: block {chain.block}, {len(chain.records)} records, {json.dumps(chain.counts)}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        chain.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# backend/benchmarks/onchain_load.py
+#
+# End-to-end load test of the on-chain flow:
+#   POST /onchain/emissions/<id>  ->  onchain dispatcher  ->  chain-service
+#   ->  PUT /onchain/callback     ->  status visible via GET /onchain/emissions
+#
+# Posts the given emissions concurrently, then polls their statuses in bulk
+# until every one has settled (submitted/confirmed, or failed/dead) and
+# reports submission throughput, settle throughput and the post-to-status
+# latency distribution. Latencies are only as precise as --poll.
+#
+# Needs a running backend, database and dispatcher. With --sim-port the
+# chain-service simulator (benchmarks/chain_sim.py) is started in-process and
+# calls back into --backend; point the dispatcher's CHAIN_SERVICE_URL at it.
+# Emissions whose payload is already queued or on chain are not re-queued by
+# the backend; they are reported as "unchanged" and left out of the latencies.
+#
+# Usage (from backend/):
+#   python -m benchmarks.onchain_load --backend http://localhost:5001 --ids 1-2000 \
+#       --sim-port 3001 --block-time 1 --failure-rate 0.01
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from benchmarks import chain_sim
+
+SETTLED = {"submitted", "confirmed"}
+GAVE_UP = {"failed", "dead"}
+STATUS_CHUNK = 1000  # ids per bulk status query
+
+
+def parse_ids(spec: str) -> list[int]:
+    """'1-5,9,12-13' -> [1, 2, 3, 4, 5, 9, 12, 13]"""
+    ids = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        lo, _, hi = part.partition("-")
+        ids.extend(range(int(lo), int(hi or lo) + 1))
+    return list(dict.fromkeys(ids))
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[k], 4)
+
+
+def post_all(session: requests.Session, backend: str, ids: list[int], concurrency: int) -> dict:
+    """Queue every emission; returns {id: (posted_at, http_status, unchanged)}."""
+    def post(emission_id: int):
+        try:
+            resp = session.post(f"{backend}/onchain/emissions/{emission_id}", timeout=30)
+            unchanged = resp.ok and bool(resp.json().get("unchanged"))
+            return emission_id, (time.monotonic(), resp.status_code, unchanged)
+        except requests.RequestException:
+            return emission_id, (time.monotonic(), None, False)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return dict(pool.map(post, ids))
+
+
+def poll_until_settled(session: requests.Session, backend: str, ids: list[int], poll: float, timeout: float) -> dict:
+    """Returns {id: (seen_at, status)} for every id that settled before the timeout."""
+    seen = {}
+    waiting = list(ids)
+    deadline = time.monotonic() + timeout
+    while waiting and time.monotonic() < deadline:
+        for start in range(0, len(waiting), STATUS_CHUNK):
+            chunk = waiting[start:start + STATUS_CHUNK]
+            resp = session.get(f"{backend}/onchain/emissions", params={"ids": ",".join(map(str, chunk))}, timeout=30)
+            resp.raise_for_status()
+            now = time.monotonic()
+            for row in resp.json()["emissions"]:
+                if row["status"] in SETTLED | GAVE_UP:
+                    seen.setdefault(row["emission_id"], (now, row["status"]))
+        waiting = [i for i in waiting if i not in seen]
+        if waiting:
+            time.sleep(poll)
+    return seen
+
+
+def run(backend: str, ids: list[int], *, concurrency: int, poll: float, timeout: float) -> dict:
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=concurrency))
+
+    t0 = time.monotonic()
+    posted = post_all(session, backend, ids, concurrency)
+    post_seconds = time.monotonic() - t0
+
+    queued = [i for i, (_, code, unchanged) in posted.items() if code == 201 and not unchanged]
+    seen = poll_until_settled(session, backend, queued, poll, timeout)
+    total_seconds = time.monotonic() - t0
+
+    latencies = [seen[i][0] - posted[i][0] for i in queued if i in seen and seen[i][1] in SETTLED]
+    statuses = {}
+    for _, status in seen.values():
+        statuses[status] = statuses.get(status, 0) + 1
+
+    return {
+        "emissions": len(ids),
+        "queued": len(queued),
+        "unchanged": sum(1 for _, code, unchanged in posted.values() if unchanged),
+        "post_errors": sum(1 for _, code, _ in posted.values() if code not in (200, 201)),
+        "statuses": statuses,
+        "timed_out": len(queued) - len(seen),
+        "post_seconds": round(post_seconds, 3),
+        "posts_per_second": round(len(ids) / post_seconds, 1) if post_seconds else None,
+        "total_seconds": round(total_seconds, 3),
+        "settled_per_second": round(len(latencies) / total_seconds, 1) if total_seconds else None,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(max(latencies), 4) if latencies else None,
+        },
+        "poll_seconds": poll,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test the backend's on-chain submission flow")
+    ap.add_argument("--backend", default="http://localhost:5001", help="backend base URL")
+    ap.add_argument("--ids", required=True, help="emission ids, e.g. 1-500,900")
+    ap.add_argument("--concurrency", type=int, default=16, help="parallel POSTs")
+    ap.add_argument("--poll", type=float, default=0.5, help="seconds between status polls")
+    ap.add_argument("--timeout", type=float, default=600, help="give up waiting after this many seconds")
+    ap.add_argument("--output", help="also write the results as JSON")
+
+    sim = ap.add_argument_group("in-process chain-service simulator")
+    sim.add_argument("--sim-port", type=int, help="start the simulator on this port")
+    sim.add_argument("--block-time", type=float, default=1.0)
+    sim.add_argument("--latency", type=float, default=0.05)
+    sim.add_argument("--jitter", type=float, default=0.01)
+    sim.add_argument("--failure-rate", type=float, default=0.0)
+    sim.add_argument("--secret", default=os.getenv("CHAIN_WEBHOOK_SECRET", ""))
+    args = ap.parse_args()
+
+    backend = args.backend.rstrip("/")
+    server = chain = None
+    if args.sim_port:
+        server, chain = chain_sim.serve(
+            "0.0.0.0", args.sim_port,
+            block_time=args.block_time, latency=args.latency, jitter=args.jitter,
+            failure_rate=args.failure_rate, callback_url=f"{backend}/onchain/callback",
+            secret=args.secret, quiet=True,
+        )
+        print(f"chain-service simulator on port {server.server_port}")
+
+    try:
+        results = run(backend, parse_ids(args.ids), concurrency=args.concurrency, poll=args.poll, timeout=args.timeout)
+    finally:
+        if server:
+            server.shutdown()
+            chain.stop()
+    if chain:
+        results["chain"] = {"transactions": chain.counts["sent"], "failed": chain.counts["failed"], "blocks": chain.block}
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
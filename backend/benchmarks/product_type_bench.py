@@ -0,0 +1,170 @@
+# backend/benchmarks/product_type_bench.py
+#
+# Concurrent product type creation in one organization, comparing
+#   legacy    SELECT MAX(order_id) + 1 ... FOR UPDATE, then INSERT, in one
+#             transaction (create_product_type before the sequence table)
+#   sequence  create_product_type with the product_type_sequences counter
+#   block     the same with PRODUCT_TYPE_ORDER_BLOCK-style block reservation
+# Each mode runs in a fresh throwaway organization, which is deleted
+# afterwards. Reports creates/s, latency percentiles and failed creates by
+# MySQL error (deadlocks, lock wait timeouts, duplicate order_ids), and checks
+# that the order_ids handed out are unique.
+#
+# Needs the database (DB_* environment as for the backend).
+#
+# Usage (from backend/):
+#   python -m benchmarks.product_type_bench --creates 2000 --concurrency 32
+import argparse
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import mysql.connector
+
+from db_connection import get_db
+from models.order_sequence_model import next_order_id
+from models.organizations_model import create_organization
+from models.product_types_model import create_product_type
+
+MODES = ("legacy", "sequence", "block")
+
+
+def _create_legacy(organization_id: int, name: str) -> int:
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            conn.start_transaction()
+            cur.execute(
+                "SELECT COALESCE(MAX(order_id), 0) + 1 "
+                "FROM product_types WHERE organization_id=%s FOR UPDATE",
+                (organization_id,)
+            )
+            (next_order,) = cur.fetchone()
+            cur.execute(
+                "INSERT INTO product_types (organization_id, name, order_id) VALUES (%s, %s, %s)",
+                (organization_id, name, next_order),
+            )
+            conn.commit()
+            return cur.lastrowid
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+
+def _create_block(organization_id: int, name: str, block: int) -> int:
+    with get_db() as conn:
+        order_id = next_order_id(conn, organization_id, block)
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "INSERT INTO product_types (organization_id, name, order_id) VALUES (%s, %s, %s)",
+                (organization_id, name, order_id),
+            )
+            conn.commit()
+            return cur.lastrowid
+        finally:
+            cur.close()
+
+
+def _percentile(ordered: list[float], pct: float) -> float | None:
+    if not ordered:
+        return None
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[k] * 1000, 2)
+
+
+def _order_ids(organization_id: int) -> list[int]:
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT order_id FROM product_types WHERE organization_id = %s", (organization_id,))
+            return [r[0] for r in cur.fetchall()]
+        finally:
+            cur.close()
+
+
+def _delete_org(organization_id: int):
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM organizations WHERE id = %s", (organization_id,))
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def run_mode(mode: str, creates: int, concurrency: int, block: int) -> dict:
+    org_id = create_organization(f"bench-pt-{mode}-{uuid.uuid4().hex[:8]}")["id"]
+    create = {
+        "legacy": _create_legacy,
+        "sequence": create_product_type,
+        "block": lambda org, name: _create_block(org, name, block),
+    }[mode]
+
+    def one(i: int):
+        t0 = time.perf_counter()
+        try:
+            create(org_id, f"type {i}")
+            return time.perf_counter() - t0, None
+        except mysql.connector.Error as e:
+            return time.perf_counter() - t0, str(e.errno)
+
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(creates)))
+        seconds = time.perf_counter() - t0
+        order_ids = _order_ids(org_id)
+    finally:
+        _delete_org(org_id)
+
+    latencies = sorted(r[0] for r in results if r[1] is None)
+    errors: dict[str, int] = {}
+    for _, err in results:
+        if err is not None:
+            errors[err] = errors.get(err, 0) + 1
+    return {
+        "mode": mode,
+        "creates": creates,
+        "concurrency": concurrency,
+        "succeeded": len(latencies),
+        "errors_by_mysql_errno": errors,  # 1213 deadlock, 1205 lock wait timeout, 1062 duplicate
+        "seconds": round(seconds, 3),
+        "creates_per_second": round(len(latencies) / seconds, 1) if seconds else None,
+        "latency_ms": {
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+        },
+        "order_ids_unique": len(order_ids) == len(set(order_ids)),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark concurrent product type creation")
+    ap.add_argument("--creates", type=int, default=1000, help="product types to create per mode")
+    ap.add_argument("--concurrency", type=int, default=16, help="parallel creates")
+    ap.add_argument("--block", type=int, default=32, help="ids reserved per round trip in block mode")
+    ap.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of " + ", ".join(MODES))
+    ap.add_argument("--output", help="also write the results as JSON")
+    args = ap.parse_args()
+
+    results = []
+    for mode in args.modes.split(","):
+        mode = mode.strip()
+        if mode not in MODES:
+            raise SystemExit(f"unknown mode {mode!r}")
+        result = run_mode(mode, args.creates, args.concurrency, args.block)
+        print(json.dumps(result))
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+# backend/benchmarks/report_bench.py
+#
+# Report rendering benchmark. Runs offline: the model query behind
+# build_report_data is replaced with synthetic products whose emissions are
+# spread round-robin over the five stages, so no database is needed.
+#
+# Usage (from backend/):
+#   python -m benchmarks.report_bench                    # compare with the baseline
+#   python -m benchmarks.report_bench --check            # exit 1 on a regression
+#   python -m benchmarks.report_bench --update-baseline  # record a new baseline
+import argparse
+import datetime
+import io
+import json
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+from pathlib import Path
+
+import routes.generate_report as gr
+
+BASE_DIR = Path(__file__).resolve().parent
+TEMPLATE = BASE_DIR.parent / "report" / "report_template.xlsx"
+BASELINE = BASE_DIR / "report_baseline.json"
+
+SIZES = [10, 1000, 10000]
+EXACT_PHASES = ["fetch", "collect_by_stage", "load_template", "ensure_space", "write_rows", "save"]
+FAST_PHASES = ["fetch", "collect_by_stage", "render_fast"]
+
+# phases faster than this are noise, never a regression
+NOISE_FLOOR = 0.005
+
+
+def synthetic_rows(product_id: int, n: int) -> tuple[dict, list[dict]]:
+    """Rows shaped like get_product_report_data output for a product with n emissions."""
+    product = {"id": product_id, "name": f"Bench product {n}", "type_id": 1}
+    created = datetime.datetime(2025, 1, 1)
+    emissions = []
+    for i in range(n):
+        emissions.append({
+            "product_id": product_id,
+            "product_name": product["name"],
+            "type_id": 1,
+            "id": i + 1,
+            "name": f"material {i}",
+            "stage_id": gr.STAGE_ORDER_KEYS[i % len(gr.STAGE_ORDER_KEYS)],
+            "factor_id": i % 40 + 1,
+            "quantity": Decimal("1.2500"),
+            "emission_amount": Decimal(f"{(i * 7919) % 10000 / 100:.6f}"),
+            "created_at": created + datetime.timedelta(seconds=i),
+            "unit": "kg",
+        })
+    return product, emissions
+
+
+def stub_model(products: dict[int, tuple[dict, list[dict]]]):
+    """Point build_report_data at in-memory products instead of MySQL."""
+    def get_product_report_data(product_id: int):
+        return products.get(product_id, (None, []))
+    gr.get_product_report_data = get_product_report_data
+
+
+def run_exact(product_id: int) -> dict[str, float]:
+    """Render through the exact path, timing each phase."""
+    timings = {}
+    clock = time.perf_counter
+
+    t = clock()
+    data = gr.build_report_data(product_id)
+    timings["fetch"] = clock() - t
+
+    t = clock()
+    stage_rows = gr.collect_by_stage(data)
+    timings["collect_by_stage"] = clock() - t
+
+    t = clock()
+    wb = gr.load_template(str(TEMPLATE))
+    ws = wb.active
+    ws[gr.PRODUCT_NAME_CELL].value = gr.collect_product_name(data)
+    timings["load_template"] = clock() - t
+
+    # ensure_space_for_rows' job: plan free rows per stage and shift the sheet
+    t = clock()
+    layout = gr.plan_stage_layout(ws, stage_rows)
+    gr.apply_row_insertions(ws, [(st["insert_at"], st["extra"]) for st in layout])
+    timings["ensure_space"] = clock() - t
+
+    t = clock()
+    for st in layout:
+        rows = st["rows"]
+        data_row = st["data_row"]
+        gr.unmerge_on_rows_for_cols(ws, data_row, data_row + len(rows) - 1, st["cols"])
+        gr.write_rows(ws, data_row, st["cols"], rows)
+    timings["write_rows"] = clock() - t
+
+    t = clock()
+    wb.save(io.BytesIO())
+    timings["save"] = clock() - t
+    return timings
+
+
+def run_fast(product_id: int) -> dict[str, float]:
+    timings = {}
+    clock = time.perf_counter
+
+    t = clock()
+    data = gr.build_report_data(product_id)
+    timings["fetch"] = clock() - t
+
+    t = clock()
+    gr.collect_by_stage(data)
+    timings["collect_by_stage"] = clock() - t
+
+    t = clock()
+    gr.render_report(data, str(TEMPLATE), io.BytesIO(), mode="fast")
+    timings["render_fast"] = clock() - t
+    return timings
+
+
+def peak_memory(run, product_id: int) -> int:
+    tracemalloc.start()
+    try:
+        run(product_id)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench(sizes: list[int], repeat: int) -> dict:
+    products = {n: synthetic_rows(n, n) for n in sizes}
+    stub_model(products)
+
+    # warm the per-worker template caches so they are not billed to a size
+    run_exact(sizes[0])
+    run_fast(sizes[0])
+
+    results = {}
+    for n in sizes:
+        entry = {}
+        for mode, run in (("exact", run_exact), ("fast", run_fast)):
+            runs = [run(n) for _ in range(repeat)]
+            phases = {k: min(r[k] for r in runs) for k in runs[0]}
+            entry[mode] = {
+                "phases": {k: round(v, 6) for k, v in phases.items()},
+                "total": round(sum(phases.values()), 6),
+                "peak_bytes": peak_memory(run, n),
+            }
+        results[str(n)] = entry
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a line for every phase that got slower than the baseline allows."""
+    regressions = []
+    for size, entry in results.items():
+        for mode, res in entry.items():
+            base = baseline.get(size, {}).get(mode)
+            if not base:
+                continue
+            pairs = list(res["phases"].items()) + [("total", res["total"])]
+            for phase, value in pairs:
+                old = base["total"] if phase == "total" else base["phases"].get(phase)
+                if old is None or value < NOISE_FLOOR:
+                    continue
+                if value > old * (1 + tolerance):
+                    regressions.append(f"{mode} n={size} {phase}: {old:.4f}s -> {value:.4f}s")
+            old_peak = base.get("peak_bytes")
+            if old_peak and res["peak_bytes"] > old_peak * (1 + tolerance):
+                regressions.append(
+                    f"{mode} n={size} peak memory: {old_peak / 2**20:.1f}MB -> {res['peak_bytes'] / 2**20:.1f}MB"
+                )
+    return regressions
+
+
+def print_table(results: dict, baseline: dict):
+    for size, entry in results.items():
+        for mode, res in entry.items():
+            base = baseline.get(size, {}).get(mode, {})
+            print(f"n={size} {mode}  peak {res['peak_bytes'] / 2**20:.1f}MB")
+            pairs = list(res["phases"].items()) + [("total", res["total"])]
+            for phase, value in pairs:
+                old = base.get("total") if phase == "total" else base.get("phases", {}).get(phase)
+                delta = f"  ({value / old:.2f}x baseline)" if old else ""
+                print(f"  {phase:<18}{value * 1000:10.1f} ms{delta}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark report rendering on synthetic products")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="emissions per product")
+    ap.add_argument("--repeat", type=int, default=3, help="runs per size; the fastest counts")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--check", action="store_true", help="exit 1 when a phase regressed")
+    ap.add_argument("--output", type=Path, help="also write results as JSON")
+    args = ap.parse_args()
+
+    results = bench(args.sizes, max(1, args.repeat))
+    baseline = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8")).get("results", {})
+
+    print_table(results, baseline)
+
+    if args.output:
+        args.output.write_text(json.dumps({"results": results}, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        merged = {**baseline, **results}
+        args.baseline.write_text(
+            json.dumps({"python": sys.version.split()[0], "results": merged}, indent=2) + "\n",
+            encoding="utf-8",
+        )
+        print(f"baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions and args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,89 @@ class Config:
         "auth_plugin": "caching_sha2_password",
     }
 
+    # Report settings
+    REPORT_SNAPSHOT_RECORDS = (
+        os.environ.get("REPORT_SNAPSHOT_RECORDS", "true").lower() == "true"
+    )
+    # versioned record snapshots; 0 disables either pruning rule
+    REPORT_RECORD_KEEP_VERSIONS = int(os.environ.get("REPORT_RECORD_KEEP_VERSIONS", 50))
+    REPORT_RECORD_MAX_AGE_DAYS = int(os.environ.get("REPORT_RECORD_MAX_AGE_DAYS", 0))
+    REPORT_SPOOL_MAX_SIZE = int(os.environ.get("REPORT_SPOOL_MAX_SIZE", 8 * 1024 * 1024))
+    # 0 disables the rendered report cache
+    REPORT_CACHE_MAX_BYTES = int(
+        os.environ.get("REPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+    )
+    # "exact" edits the template with openpyxl (its cost is copying and saving
+    # the whole workbook); "fast" streams the sheet, so rows dominate its cost
+    REPORT_RENDER_MODE = os.environ.get("REPORT_RENDER_MODE", "exact")
+
+    # Batch (ZIP) reports; 0 workers means one per CPU core
+    REPORT_BATCH_WORKERS = int(os.environ.get("REPORT_BATCH_WORKERS", 0)) or None
+    REPORT_BATCH_MAX_PRODUCTS = int(os.environ.get("REPORT_BATCH_MAX_PRODUCTS", 500))
+    # seconds a batch waits for the pool to finish its next report
+    REPORT_BATCH_RENDER_TIMEOUT = float(os.environ.get("REPORT_BATCH_RENDER_TIMEOUT", 120))
+
+    # Asynchronous report jobs
+    REPORT_JOB_WORKERS = int(os.environ.get("REPORT_JOB_WORKERS", 2))
+    REPORT_JOB_TTL_SECONDS = int(os.environ.get("REPORT_JOB_TTL_SECONDS", 3600))
+    # a claimed job is held for LEASE seconds and renewed every HEARTBEAT seconds,
+    # which is also how often each worker sweeps for orphaned and expired jobs
+    REPORT_JOB_LEASE_SECONDS = int(os.environ.get("REPORT_JOB_LEASE_SECONDS", 60))
+    REPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get("REPORT_JOB_HEARTBEAT_SECONDS", 15))
+    REPORT_JOB_MAX_ATTEMPTS = int(os.environ.get("REPORT_JOB_MAX_ATTEMPTS", 3))
+    REPORT_JOB_MAX_WAIT = 30
+
+    # On-chain outbox dispatcher (python -m routes.onchain_dispatcher)
+    CHAIN_SERVICE_URL = os.environ.get("CHAIN_SERVICE_URL", "").strip()
+    # "merkle" anchors one Merkle root per batch; "single" sends one transaction per emission
+    CHAIN_DISPATCH_MODE = os.environ.get("CHAIN_DISPATCH_MODE", "merkle")
+    CHAIN_ANCHOR_BATCH_SIZE = int(os.environ.get("CHAIN_ANCHOR_BATCH_SIZE", 2000))
+    CHAIN_DISPATCH_BATCH_SIZE = int(os.environ.get("CHAIN_DISPATCH_BATCH_SIZE", 50))
+    CHAIN_DISPATCH_CONCURRENCY = int(os.environ.get("CHAIN_DISPATCH_CONCURRENCY", 8))
+    CHAIN_DISPATCH_MAX_ATTEMPTS = int(os.environ.get("CHAIN_DISPATCH_MAX_ATTEMPTS", 8))
+    CHAIN_DISPATCH_BACKOFF_BASE = float(os.environ.get("CHAIN_DISPATCH_BACKOFF_BASE", 2))
+    CHAIN_DISPATCH_BACKOFF_MAX = float(os.environ.get("CHAIN_DISPATCH_BACKOFF_MAX", 300))
+    # /send waits for the transaction to be mined; the lease must outlast it
+    CHAIN_DISPATCH_TIMEOUT = float(os.environ.get("CHAIN_DISPATCH_TIMEOUT", 60))
+    CHAIN_DISPATCH_LEASE_SECONDS = int(os.environ.get("CHAIN_DISPATCH_LEASE_SECONDS", 120))
+    CHAIN_DISPATCH_POLL_SECONDS = float(os.environ.get("CHAIN_DISPATCH_POLL_SECONDS", 1))
+
+    # On-chain status stream (GET /onchain/stream)
+    CHAIN_EVENTS_POLL_SECONDS = float(os.environ.get("CHAIN_EVENTS_POLL_SECONDS", 0.5))
+    CHAIN_EVENTS_HEARTBEAT_SECONDS = float(os.environ.get("CHAIN_EVENTS_HEARTBEAT_SECONDS", 15))
+    CHAIN_EVENTS_RETENTION_HOURS = int(os.environ.get("CHAIN_EVENTS_RETENTION_HOURS", 24))
+
+    # Password hashing (password_hasher.py); older hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+    # queued + running operations per backend worker before requests get a 503
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 32))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 10))
+
+    # Sign-in rate limits (routes/rate_limit.py), token buckets shared by the
+    # workers of one host through RATE_LIMIT_FILE
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_FILE = os.environ.get("RATE_LIMIT_FILE", "/tmp/carbon-auth-ratelimit.bin")
+    RATE_LIMIT_GROUPS = int(os.environ.get("RATE_LIMIT_GROUPS", 8192))
+    RATE_LIMIT_IP_PER_MINUTE = float(os.environ.get("RATE_LIMIT_IP_PER_MINUTE", 30))
+    RATE_LIMIT_IP_BURST = float(os.environ.get("RATE_LIMIT_IP_BURST", 30))
+    RATE_LIMIT_ACCOUNT_PER_MINUTE = float(os.environ.get("RATE_LIMIT_ACCOUNT_PER_MINUTE", 5))
+    RATE_LIMIT_ACCOUNT_BURST = float(os.environ.get("RATE_LIMIT_ACCOUNT_BURST", 10))
+    # X-Forwarded-For entries added by trusted proxies, honoured only for requests
+    # from RATE_LIMIT_TRUSTED_PROXIES (comma-separated addresses, networks or host
+    # names); the defaults fit the frontend's nginx in docker-compose
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get("RATE_LIMIT_PROXY_HOPS", 1))
+    RATE_LIMIT_TRUSTED_PROXIES = os.environ.get("RATE_LIMIT_TRUSTED_PROXIES", "frontend")
+
+    # JWT revocation (routes/token_revocation.py): per-worker Bloom filter over
+    # the revoked_tokens table, extended every TOKEN_REVOCATION_SYNC_SECONDS
+    TOKEN_REVOCATION_SYNC_SECONDS = float(os.environ.get("TOKEN_REVOCATION_SYNC_SECONDS", 2))
+    TOKEN_REVOCATION_CAPACITY = int(os.environ.get("TOKEN_REVOCATION_CAPACITY", 100000))
+    TOKEN_REVOCATION_FP_RATE = float(os.environ.get("TOKEN_REVOCATION_FP_RATE", 0.01))
+
+    # product_types.order_id ids reserved per round trip; 1 keeps them in creation order
+    PRODUCT_TYPE_ORDER_BLOCK = int(os.environ.get("PRODUCT_TYPE_ORDER_BLOCK", 1))
+
     # Application settings
     DEBUG = os.environ.get("FLASK_DEBUG", "false").lower() == "true"
     TESTING = False
@@ -0,0 +1,17 @@
+# backend/gunicorn.conf.py
+#
+# Production server settings, read by the Dockerfile's gunicorn command.
+# Threaded workers: every /onchain/stream client holds a thread for as long as
+# it stays connected, so sync workers (one request each) would let a single
+# open stream block the API. With gthread the worker's heartbeat runs apart
+# from its request threads, so `timeout` does not kill long-lived streams.
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+worker_class = "gthread"
+workers = int(os.environ.get("GUNICORN_WORKERS", 2))
+# request threads per worker, open event streams included
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+# idle keep-alive connections also hold a thread
+keepalive = 5
@@ -2,6 +2,7 @@
 import json
 from typing import Optional 
 from db_connection import get_db
+from models.onchain_events_model import record_status_events
 
 def fetch_emission(emission_id: int): 
     sql = """
@@ -13,7 +14,6 @@ def fetch_emission(emission_id: int):
             e.tag_id, 
             e.quantity, 
             e.created_by, 
-            e.sort_order, 
             e.created_at, 
             p.organization_id, 
             p.type_id, 
@@ -41,7 +41,6 @@ def build_payload(em: dict) -> dict:
         "tag_id": em["tag_id"],
         "quantity": em["quantity"],
         "created_by": em["created_by"],
-        "sort_order": em["sort_order"],
         "product_name": em["product_name"],
         "timestamp": em["created_at"].isoformat() if em["created_at"] else None,
     }
@@ -53,12 +52,21 @@ def upsert_pending(emission_id: int)-> None:
         VALUES (%s,'pending')
         ON DUPLICATE KEY UPDATE
             status='pending',
-            error_msg=NULL
+            error_msg=NULL,
+            attempts=0,
+            next_attempt_at=NULL,
+            claimed_by=NULL,
+            claimed_at=NULL,
+            batch_id=NULL,
+            leaf_index=NULL,
+            leaf_hash=NULL,
+            merkle_proof=NULL
         """
     with get_db() as conn:
         cur = conn.cursor()
         try:
             cur.execute(sql, (emission_id, ))
+            record_status_events(cur, "eo.emission_id = %s", (emission_id,))
             conn.commit()
         finally:
             cur.close()
@@ -100,4 +108,138 @@ def set_status_by_tx(tx_hash: str, *, status: str, error_msg: str | None) -> int
             conn.commit()
             return cur.rowcount
         finally:
-            cur.close()
\ No newline at end of file
+            cur.close()
+
+# ---- bulk ---- #
+STATUS_COLUMNS = """
+    eo.emission_id,
+    eo.status,
+    eo.tx_hash,
+    eo.batch_id,
+    eo.error_msg,
+    eo.updated_at
+"""
+
+
+def get_statuses(emission_ids: list[int]) -> list[dict]:
+    """Statuses for many emissions in one ux_emission_once lookup."""
+    if not emission_ids:
+        return []
+    placeholders = ", ".join(["%s"] * len(emission_ids))
+    sql = f"""
+        SELECT {STATUS_COLUMNS}
+        FROM emissions_onchain eo
+        WHERE eo.emission_id IN ({placeholders})
+        ORDER BY eo.emission_id
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, tuple(emission_ids))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def get_product_statuses(product_id: int) -> list[dict]:
+    """Statuses of every emission of a product that has an on-chain record."""
+    sql = f"""
+        SELECT {STATUS_COLUMNS}
+        FROM emissions e
+        JOIN emissions_onchain eo ON eo.emission_id = e.id
+        WHERE e.product_id = %s
+        ORDER BY eo.emission_id
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (product_id,))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def apply_status_updates(updates: list[dict]) -> int:
+    """
+    Apply {"emission_id", "status", "tx_hash", "error_msg"} updates in one
+    UPDATE joined against the updates as a derived table. A missing tx_hash
+    keeps the stored one; 'submitted' (reported once the transaction is
+    mined) or 'confirmed' records the sent payload as anchored. Returns the number of rows changed.
+    """
+    if not updates:
+        return 0
+    derived = " UNION ALL ".join(
+        ["SELECT %s AS emission_id, %s AS status, %s AS tx_hash, %s AS error_msg"] * len(updates)
+    )
+    params = []
+    for u in updates:
+        params += [u["emission_id"], u["status"], u.get("tx_hash"), u.get("error_msg")]
+    sql = f"""
+        UPDATE emissions_onchain eo
+        JOIN ({derived}) v ON v.emission_id = eo.emission_id
+        SET eo.anchored_hash = IF(v.status IN ('submitted', 'confirmed'), COALESCE(eo.sent_hash, eo.anchored_hash), eo.anchored_hash),
+            eo.status = v.status,
+            eo.tx_hash = COALESCE(v.tx_hash, eo.tx_hash),
+            eo.error_msg = v.error_msg
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, tuple(params))
+            updated = cur.rowcount
+            ids = [u["emission_id"] for u in updates]
+            record_status_events(cur, f"eo.emission_id IN ({', '.join(['%s'] * len(ids))})", tuple(ids))
+            conn.commit()
+            return updated
+        finally:
+            cur.close()
+
+
+def fetch_onchain_chunk(after_id: int, limit: int) -> list[dict]:
+    """
+    Next `limit` emissions_onchain rows after id `after_id` (keyset order), each
+    joined with the current emission data build_payload needs and its batch.
+    onchain_id is the emissions_onchain id to resume from.
+    """
+    sql = """
+        SELECT
+            eo.id AS onchain_id,
+            eo.status,
+            eo.payload_hash,
+            eo.sent_hash,
+            eo.anchored_hash,
+            eo.leaf_hash,
+            eo.merkle_proof,
+            eo.batch_id,
+            b.merkle_root,
+            b.record_id,
+            e.id,
+            e.product_id,
+            e.stage_id,
+            e.factor_id,
+            e.tag_id,
+            e.quantity,
+            e.created_by,
+            e.created_at,
+            p.organization_id,
+            p.type_id,
+            p.name AS product_name
+        FROM emissions_onchain eo
+        JOIN emissions e ON e.id = eo.emission_id
+        JOIN products p ON p.id = e.product_id
+        LEFT JOIN onchain_batches b ON b.id = eo.batch_id
+        WHERE eo.id > %s
+        ORDER BY eo.id
+        LIMIT %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (after_id, limit))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+    for row in rows:
+        if isinstance(row["merkle_proof"], (str, bytes)):
+            row["merkle_proof"] = json.loads(row["merkle_proof"])
+    return rows
@@ -29,6 +29,68 @@ def get_emissions_by_product(product_id):
         finally:
             cursor.close()
 
+REPORT_DATA_SELECT = """
+    SELECT
+        p.id AS product_id,
+        p.name AS product_name,
+        p.type_id,
+        e.id,
+        e.name,
+        e.stage_id,
+        e.factor_id,
+        e.quantity,
+        e.emission_amount,
+        e.created_at,
+        f.unit
+    FROM products p
+    LEFT JOIN emissions e ON e.product_id = p.id
+    LEFT JOIN factors f ON f.id = e.factor_id
+"""
+
+def _group_report_rows(rows) -> dict[int, tuple[dict, list[dict]]]:
+    out: dict[int, tuple[dict, list[dict]]] = {}
+    for r in rows:
+        pid = r["product_id"]
+        if pid not in out:
+            out[pid] = (
+                {"id": pid, "name": r["product_name"], "type_id": r["type_id"]},
+                [],
+            )
+        if r["id"] is not None:
+            out[pid][1].append(r)
+    return out
+
+def _fetch_report_rows(where: str, params: tuple):
+    sql = f"{REPORT_DATA_SELECT} WHERE {where} ORDER BY p.id, e.id"
+    with get_db() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+def get_product_report_data(product_id: int):
+    """
+    Fetch a product, its emissions and each emission's factor unit in a
+    single joined query. Returns (product, emissions); product is None when
+    the product does not exist, emissions is empty when it has none.
+    """
+    grouped = _group_report_rows(_fetch_report_rows("p.id = %s", (product_id,)))
+    return grouped.get(product_id, (None, []))
+
+def get_products_report_data(product_ids: list[int]) -> dict[int, tuple[dict, list[dict]]]:
+    """Batch form of get_product_report_data: product_id -> (product, emissions)."""
+    if not product_ids:
+        return {}
+    placeholders = ", ".join(["%s"] * len(product_ids))
+    return _group_report_rows(
+        _fetch_report_rows(f"p.id IN ({placeholders})", tuple(product_ids))
+    )
+
+def get_product_type_report_data(type_id: int) -> dict[int, tuple[dict, list[dict]]]:
+    return _group_report_rows(_fetch_report_rows("p.type_id = %s", (type_id,)))
+
 def get_emissions_by_product_and_stage(product_id, stage_id):
     sql = """
         SELECT *
@@ -46,9 +108,12 @@ def get_emissions_by_product_and_stage(product_id, stage_id):
 def get_emission(emission_id: int):
     with get_db() as conn:
         cursor = conn.cursor(dictionary=True)
-        sql = "SELECT * FROM emissions WHERE id = %s"
-        cursor.execute(sql, (emission_id,))
-    return cursor.fetchone()
+        try:
+            sql = "SELECT * FROM emissions WHERE id = %s"
+            cursor.execute(sql, (emission_id,))
+            return cursor.fetchone()
+        finally:
+            cursor.close()
  
 def create_emission(
     name: str,
@@ -0,0 +1,100 @@
+# backend/models/lifecycle_model.py
+#
+# Everything the lifecycle page shows for one product, read on one connection
+# with a fixed number of queries: a fingerprint of the product's rows first,
+# then (unless the caller already has that version) the product, the stages,
+# its steps and its emissions with their factors.
+import hashlib
+
+from db_connection import get_db
+
+# CONCAT_WS skips NULLs, so every column is IFNULL'ed to keep fields aligned
+FINGERPRINT_SQL = """
+    SELECT
+        (SELECT CONCAT_WS('|', p.name, IFNULL(p.serial_number, ''), IFNULL(p.code, ''), IFNULL(p.type_id, ''))
+         FROM products p WHERE p.id = %s AND p.organization_id = %s) AS product,
+        (SELECT CONCAT_WS('|', COUNT(*), IFNULL(BIT_XOR(CRC32(CONCAT_WS('|', s.id, s.stage_id,
+                    IFNULL(s.tag_id, ''), s.name, IFNULL(s.sort_order, ''), IFNULL(t.name, '')))), 0),
+                IFNULL(SUM(CRC32(CONCAT_WS('|', s.id, s.name, IFNULL(s.sort_order, '')))), 0))
+         FROM steps s LEFT JOIN tags t ON t.id = s.tag_id
+         WHERE s.product_id = %s) AS steps,
+        (SELECT CONCAT_WS('|', COUNT(*), IFNULL(BIT_XOR(CRC32(CONCAT_WS('|', e.id, IFNULL(e.name, ''),
+                    e.stage_id, IFNULL(e.step_id, ''), IFNULL(e.tag_id, ''), e.factor_id,
+                    IFNULL(e.quantity, ''), IFNULL(e.emission_amount, ''), f.name, f.unit))), 0),
+                IFNULL(SUM(CRC32(CONCAT_WS('|', e.id, IFNULL(e.quantity, ''), IFNULL(e.emission_amount, '')))), 0))
+         FROM emissions e JOIN factors f ON f.id = e.factor_id
+         WHERE e.product_id = %s) AS emissions,
+        (SELECT CONCAT_WS('|', COUNT(*), IFNULL(BIT_XOR(CRC32(CONCAT_WS('|', st.id, st.title))), 0))
+         FROM stages st) AS stages
+"""
+
+PRODUCT_SQL = """
+    SELECT id, organization_id, type_id, name, serial_number, code, created_at
+    FROM products
+    WHERE id = %s
+"""
+
+STAGES_SQL = "SELECT id, title FROM stages"
+
+STEPS_SQL = """
+    SELECT s.id, s.stage_id, s.tag_id, t.name AS tag_name, s.name, s.sort_order
+    FROM steps s
+    LEFT JOIN tags t ON t.id = s.tag_id
+    WHERE s.product_id = %s
+    ORDER BY s.sort_order, s.id
+"""
+
+EMISSIONS_SQL = """
+    SELECT
+        e.id,
+        e.name,
+        e.stage_id,
+        e.step_id,
+        e.tag_id,
+        e.factor_id,
+        f.name AS factor_name,
+        f.unit AS factor_unit,
+        e.quantity,
+        e.emission_amount,
+        e.created_at
+    FROM emissions e
+    JOIN factors f ON f.id = e.factor_id
+    WHERE e.product_id = %s
+    ORDER BY e.id
+"""
+
+
+def get_product_lifecycle(
+    product_id: int, organization_id: int, *, known=(), salt: str = ""
+) -> tuple[str | None, dict | None]:
+    """
+    Returns (fingerprint, rows). fingerprint is None when the product does not
+    exist in the organization; rows is None when the fingerprint is in
+    `known`, i.e. the caller's copy is current. Otherwise rows holds
+    "product", "stages", "steps" and "emissions". `salt` goes into the
+    fingerprint, so callers can version the shape they build from the rows.
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            # one read view for every query: mysql-connector does not autocommit
+            cur.execute(FINGERPRINT_SQL, (product_id, organization_id, product_id, product_id))
+            parts = cur.fetchone()
+            if parts["product"] is None:
+                return None, None
+            raw = "\n".join([salt, str(product_id), parts["product"], parts["steps"], parts["emissions"], parts["stages"]])
+            fingerprint = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+            if fingerprint in known:
+                return fingerprint, None
+
+            cur.execute(PRODUCT_SQL, (product_id,))
+            product = cur.fetchone()
+            cur.execute(STAGES_SQL)
+            stages = cur.fetchall()
+            cur.execute(STEPS_SQL, (product_id,))
+            steps = cur.fetchall()
+            cur.execute(EMISSIONS_SQL, (product_id,))
+            emissions = cur.fetchall()
+        finally:
+            cur.close()
+    return fingerprint, {"product": product, "stages": stages, "steps": steps, "emissions": emissions}
@@ -0,0 +1,179 @@
+# backend/models/onchain_batch_model.py
+#
+# Merkle batches of emissions_onchain rows. The dispatcher records a batch with
+# every member's leaf hash and inclusion proof before anchoring the root, then
+# settles all members together once chain-service answers.
+import json
+
+from db_connection import get_db
+from models.onchain_events_model import record_status_events
+
+# rows per UPDATE when attaching proofs; keeps statements well under max_allowed_packet
+PROOF_CHUNK = 500
+
+
+def create_batch(worker: str, merkle_root: str, leaves: list[dict]) -> int:
+    """
+    Insert a batch and attach each leaf {"id", "leaf_index", "leaf_hash", "proof"}
+    to its outbox row claimed by `worker`. Returns the batch id.
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            conn.start_transaction()
+            cur.execute(
+                "INSERT INTO onchain_batches (merkle_root, leaf_count) VALUES (%s, %s)",
+                (merkle_root, len(leaves)),
+            )
+            batch_id = cur.lastrowid
+
+            for start in range(0, len(leaves), PROOF_CHUNK):
+                chunk = leaves[start:start + PROOF_CHUNK]
+                derived = " UNION ALL ".join(
+                    ["SELECT %s AS id, %s AS leaf_index, %s AS leaf_hash, %s AS merkle_proof"] * len(chunk)
+                )
+                params = []
+                for leaf in chunk:
+                    params += [leaf["id"], leaf["leaf_index"], leaf["leaf_hash"], json.dumps(leaf["proof"])]
+                cur.execute(
+                    f"""
+                    UPDATE emissions_onchain eo
+                    JOIN ({derived}) v ON v.id = eo.id
+                    SET eo.batch_id = %s,
+                        eo.leaf_index = v.leaf_index,
+                        eo.leaf_hash = v.leaf_hash,
+                        eo.merkle_proof = CAST(v.merkle_proof AS JSON)
+                    WHERE eo.claimed_by = %s
+                    """,
+                    (*params, batch_id, worker),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    return batch_id
+
+
+def mark_batch_sent(batch_id: int, worker: str, tx_hash: str | None, record_id: int | None) -> int:
+    """Settle a batch whose root was anchored; returns the member rows updated."""
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            # chain-service answers /anchor only after the root's transaction is
+            # mined; its callback may already have set status and tx_hash
+            cur.execute(
+                """
+                UPDATE onchain_batches
+                SET status = IF(status IN ('pending', 'failed'), 'submitted', status),
+                    tx_hash = COALESCE(tx_hash, %s),
+                    record_id = COALESCE(record_id, %s),
+                    error_msg = NULL
+                WHERE id = %s
+                """,
+                (tx_hash, record_id, batch_id),
+            )
+            cur.execute(
+                """
+                UPDATE emissions_onchain eo
+                JOIN onchain_batches b ON b.id = eo.batch_id
+                SET eo.sent_hash = eo.payload_hash,
+                    eo.anchored_hash = eo.payload_hash,
+                    eo.status = IF(eo.status IN ('pending', 'failed'), 'submitted', eo.status),
+                    eo.tx_hash = b.tx_hash,
+                    eo.error_msg = NULL,
+                    eo.next_attempt_at = NULL,
+                    eo.claimed_by = NULL,
+                    eo.claimed_at = NULL
+                WHERE eo.batch_id = %s AND eo.claimed_by = %s
+                """,
+                (batch_id, worker),
+            )
+            updated = cur.rowcount
+            record_status_events(cur, "eo.batch_id = %s", (batch_id,))
+            conn.commit()
+            return updated
+        finally:
+            cur.close()
+
+
+def release_batch(
+    batch_id: int, worker: str, error_msg: str, *, max_attempts: int, delay_seconds: int, dead: bool = False
+) -> int:
+    """
+    Record a failed anchor. Members go back to 'pending' after `delay_seconds`,
+    or to 'dead' when `dead` is set or they have used up max_attempts; their
+    proofs are dropped since the root never made it on chain.
+    """
+    error_msg = error_msg[:500]
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            # members lose their batch_id below; remember them for the event log
+            cur.execute(
+                "SELECT id FROM emissions_onchain WHERE batch_id = %s AND claimed_by = %s",
+                (batch_id, worker),
+            )
+            member_ids = [r[0] for r in cur.fetchall()]
+            cur.execute(
+                "UPDATE onchain_batches SET status = 'failed', error_msg = %s WHERE id = %s",
+                (error_msg, batch_id),
+            )
+            cur.execute(
+                """
+                UPDATE emissions_onchain
+                SET status = IF(%s OR attempts >= %s, 'dead', 'pending'),
+                    next_attempt_at = IF(status = 'dead', NULL, NOW() + INTERVAL %s SECOND),
+                    error_msg = %s,
+                    batch_id = NULL,
+                    leaf_index = NULL,
+                    leaf_hash = NULL,
+                    merkle_proof = NULL,
+                    claimed_by = NULL,
+                    claimed_at = NULL
+                WHERE batch_id = %s AND claimed_by = %s AND status IN ('pending', 'failed')
+                """,
+                (dead, max_attempts, delay_seconds, error_msg, batch_id, worker),
+            )
+            released = cur.rowcount
+            if member_ids:
+                placeholders = ", ".join(["%s"] * len(member_ids))
+                record_status_events(cur, f"eo.id IN ({placeholders})", tuple(member_ids))
+            conn.commit()
+            return released
+        finally:
+            cur.close()
+
+
+def get_emission_proof(emission_id: int) -> dict | None:
+    sql = """
+        SELECT
+            eo.emission_id,
+            eo.status,
+            eo.payload_json,
+            eo.leaf_index,
+            eo.leaf_hash,
+            eo.merkle_proof,
+            b.id AS batch_id,
+            b.merkle_root,
+            b.leaf_count,
+            b.status AS batch_status,
+            b.tx_hash,
+            b.record_id
+        FROM emissions_onchain eo
+        JOIN onchain_batches b ON b.id = eo.batch_id
+        WHERE eo.emission_id = %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (emission_id,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+    if row:
+        for key in ("payload_json", "merkle_proof"):
+            if isinstance(row[key], (str, bytes)):
+                row[key] = json.loads(row[key])
+    return row
@@ -0,0 +1,91 @@
+# backend/models/onchain_events_model.py
+#
+# onchain_events: status transitions of emissions_onchain rows, tailed by
+# routes/onchain_events.py to feed the server-sent-event stream.
+from db_connection import get_db
+
+EVENT_COLUMNS = "id, emission_id, product_id, organization_id, status, tx_hash, created_at"
+
+
+def record_status_events(cur, where_sql: str, params: tuple = ()) -> int:
+    """
+    Log the current status of the emissions_onchain rows (aliased eo) matching
+    `where_sql`, on the caller's cursor so it commits with the status change.
+    A row whose status equals its last logged one is skipped, so only
+    transitions are recorded.
+    """
+    cur.execute(
+        f"""
+        INSERT INTO onchain_events (emission_id, product_id, organization_id, status, tx_hash)
+        SELECT eo.emission_id, e.product_id, p.organization_id, eo.status, eo.tx_hash
+        FROM emissions_onchain eo
+        JOIN emissions e ON e.id = eo.emission_id
+        JOIN products p ON p.id = e.product_id
+        LEFT JOIN onchain_events last ON last.id = (
+            SELECT MAX(ev.id) FROM onchain_events ev WHERE ev.emission_id = eo.emission_id
+        )
+        WHERE ({where_sql})
+          AND NOT (last.status <=> eo.status)
+        """,
+        params,
+    )
+    return cur.rowcount
+
+
+def list_latest_event_ids(limit: int) -> list[int]:
+    """Ids of the newest `limit` visible events, ascending."""
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT id FROM onchain_events ORDER BY id DESC LIMIT %s", (limit,))
+            return [r[0] for r in reversed(cur.fetchall())]
+        finally:
+            cur.close()
+
+
+def list_events_after(after_id: int, limit: int = 1000, *, product_id: int | None = None,
+                      organization_id: int | None = None, also_ids=()) -> list[dict]:
+    """
+    Events with id > after_id, plus those in `also_ids` (ids a tailer skipped
+    while their transaction was open), in id order, optionally for one
+    product or organization.
+    """
+    if also_ids:
+        placeholders = ", ".join(["%s"] * len(also_ids))
+        where, params = [f"(id > %s OR id IN ({placeholders}))"], [after_id, *also_ids]
+    else:
+        where, params = ["id > %s"], [after_id]
+    if product_id is not None:
+        where.append("product_id = %s")
+        params.append(product_id)
+    if organization_id is not None:
+        where.append("organization_id = %s")
+        params.append(organization_id)
+    sql = f"""
+        SELECT {EVENT_COLUMNS}
+        FROM onchain_events
+        WHERE {" AND ".join(where)}
+        ORDER BY id
+        LIMIT %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (*params, limit))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def purge_events(retention_hours: int, batch: int = 10000) -> int:
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "DELETE FROM onchain_events WHERE created_at < NOW() - INTERVAL %s HOUR LIMIT %s",
+                (retention_hours, batch),
+            )
+            conn.commit()
+            return cur.rowcount
+        finally:
+            cur.close()
@@ -0,0 +1,195 @@
+# backend/models/onchain_outbox_model.py
+#
+# emissions_onchain used as an outbox: 'pending' rows are claimed in batches by
+# the on-chain dispatcher, sent to chain-service and then marked submitted,
+# rescheduled for a retry or dead-lettered.
+from db_connection import get_db
+from models.onchain_events_model import record_status_events
+
+
+def claim_outbox_batch(worker: str, batch_size: int, lease_seconds: int) -> list[dict]:
+    """
+    Claim up to batch_size due rows for `worker`. SKIP LOCKED lets several
+    dispatchers claim concurrently without waiting on each other's rows; the
+    row locks are held only until the claim is committed, not while sending.
+    The claimed payload becomes sent_hash now, because chain-service calls
+    back before it answers the send.
+    """
+    select_sql = """
+        SELECT id, emission_id, payload_json, payload_hash, anchored_hash, attempts
+        FROM emissions_onchain
+        WHERE status = 'pending'
+          AND (next_attempt_at IS NULL OR next_attempt_at <= NOW())
+          AND (claimed_at IS NULL OR claimed_at < NOW() - INTERVAL %s SECOND)
+        ORDER BY id
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            conn.start_transaction()
+            cur.execute(select_sql, (lease_seconds, batch_size))
+            rows = cur.fetchall()
+            if rows:
+                ids = [r["id"] for r in rows]
+                placeholders = ", ".join(["%s"] * len(ids))
+                cur.execute(
+                    f"""
+                    UPDATE emissions_onchain
+                    SET claimed_by = %s,
+                        claimed_at = NOW(),
+                        sent_hash = payload_hash,
+                        attempts = attempts + 1
+                    WHERE id IN ({placeholders})
+                    """,
+                    (worker, *ids),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    for r in rows:
+        r["attempts"] += 1
+    return rows
+
+
+def mark_outbox_sent(row_id: int, worker: str, tx_hash: str | None) -> int:
+    # chain-service answers /send only after the transaction is mined, so the
+    # payload is anchored; its callback may already have set status and tx_hash,
+    # and a hash in the response is this send's own transaction
+    sql = """
+        UPDATE emissions_onchain
+        SET sent_hash = payload_hash,
+            anchored_hash = payload_hash,
+            status = IF(status IN ('pending', 'failed'), 'submitted', status),
+            tx_hash = COALESCE(%s, tx_hash),
+            error_msg = NULL,
+            next_attempt_at = NULL,
+            claimed_by = NULL,
+            claimed_at = NULL
+        WHERE id = %s AND claimed_by = %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (tx_hash, row_id, worker))
+            updated = cur.rowcount
+            record_status_events(cur, "eo.id = %s", (row_id,))
+            conn.commit()
+            return updated
+        finally:
+            cur.close()
+
+
+def mark_outbox_unchanged(row_id: int, worker: str) -> int:
+    """Settle a row whose payload is the one last anchored on chain, without sending."""
+    sql = """
+        UPDATE emissions_onchain
+        SET status = 'confirmed',
+            error_msg = NULL,
+            next_attempt_at = NULL,
+            claimed_by = NULL,
+            claimed_at = NULL
+        WHERE id = %s AND claimed_by = %s AND payload_hash = anchored_hash
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (row_id, worker))
+            updated = cur.rowcount
+            record_status_events(cur, "eo.id = %s", (row_id,))
+            conn.commit()
+            return updated
+        finally:
+            cur.close()
+
+
+def mark_outbox_retry(row_id: int, worker: str, error_msg: str, delay_seconds: int) -> int:
+    sql = """
+        UPDATE emissions_onchain
+        SET status = 'pending',
+            error_msg = %s,
+            next_attempt_at = NOW() + INTERVAL %s SECOND,
+            claimed_by = NULL,
+            claimed_at = NULL
+        WHERE id = %s AND claimed_by = %s AND status IN ('pending', 'failed')
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (error_msg[:500], delay_seconds, row_id, worker))
+            updated = cur.rowcount
+            record_status_events(cur, "eo.id = %s", (row_id,))
+            conn.commit()
+            return updated
+        finally:
+            cur.close()
+
+
+def mark_outbox_dead(row_id: int, worker: str, error_msg: str) -> int:
+    sql = """
+        UPDATE emissions_onchain
+        SET status = 'dead',
+            error_msg = %s,
+            next_attempt_at = NULL,
+            claimed_by = NULL,
+            claimed_at = NULL
+        WHERE id = %s AND claimed_by = %s AND status IN ('pending', 'failed')
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (error_msg[:500], row_id, worker))
+            updated = cur.rowcount
+            record_status_events(cur, "eo.id = %s", (row_id,))
+            conn.commit()
+            return updated
+        finally:
+            cur.close()
+
+
+def get_outbox_metrics(window_seconds: int = 60) -> dict:
+    """Queue depth per status plus backlog age and recent throughput."""
+    counts_sql = """
+        SELECT status, COUNT(*) AS n
+        FROM emissions_onchain
+        GROUP BY status
+    """
+    backlog_sql = """
+        SELECT
+            SUM(next_attempt_at IS NULL OR next_attempt_at <= NOW()) AS ready,
+            SUM(claimed_at IS NOT NULL) AS in_flight,
+            TIMESTAMPDIFF(SECOND, MIN(created_at), NOW()) AS oldest_pending_seconds
+        FROM emissions_onchain
+        WHERE status = 'pending'
+    """
+    throughput_sql = """
+        SELECT COUNT(*) AS n
+        FROM emissions_onchain
+        WHERE status IN ('submitted', 'confirmed')
+          AND updated_at >= NOW() - INTERVAL %s SECOND
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(counts_sql)
+            depth = {r["status"]: r["n"] for r in cur.fetchall()}
+            cur.execute(backlog_sql)
+            backlog = cur.fetchone() or {}
+            cur.execute(throughput_sql, (window_seconds,))
+            sent = cur.fetchone()["n"]
+        finally:
+            cur.close()
+
+    return {
+        "queue_depth": depth,
+        "ready": int(backlog.get("ready") or 0),
+        "in_flight": int(backlog.get("in_flight") or 0),
+        "oldest_pending_seconds": backlog.get("oldest_pending_seconds"),
+        "sent_last_window": sent,
+        "window_seconds": window_seconds,
+    }
@@ -0,0 +1,79 @@
+# backend/models/order_sequence_model.py
+#
+# order_id allocation for product_types from the per-organization counter in
+# product_type_sequences. Each allocation is one UPDATE of one row, committed
+# on its own, so concurrent creates only queue on that row for microseconds
+# and never lock product_types ranges. Ids of a create that fails afterwards
+# are not reused; order_id only orders product types, so gaps are harmless.
+#
+# With PRODUCT_TYPE_ORDER_BLOCK > 1 each worker reserves that many ids per
+# round trip and hands them out from memory. Ids then stay unique but are no
+# longer in creation order across workers.
+import threading
+
+from config import Config
+
+_blocks: dict[int, list[int]] = {}  # organization id -> [next id, end of block)
+_blocks_lock = threading.Lock()
+
+
+def _reserve(cur, organization_id: int, count: int) -> int | None:
+    """Bump the counter by `count`; returns the first reserved id, None when the org has no row."""
+    cur.execute(
+        """
+        UPDATE product_type_sequences
+        SET next_order_id = LAST_INSERT_ID(next_order_id + %s)
+        WHERE organization_id = %s
+        """,
+        (count, organization_id),
+    )
+    if cur.rowcount == 0:
+        return None
+    cur.execute("SELECT LAST_INSERT_ID()")
+    return cur.fetchone()[0] - count
+
+
+def reserve_order_ids(conn, organization_id: int, count: int = 1) -> int:
+    """
+    Reserve `count` consecutive order_ids on `conn` and commit; returns the
+    first. Call it before starting the transaction that uses the ids.
+    """
+    cur = conn.cursor()
+    try:
+        first = _reserve(cur, organization_id, count)
+        if first is None:
+            # first product type since the migration: seed from what exists
+            cur.execute(
+                """
+                INSERT IGNORE INTO product_type_sequences (organization_id, next_order_id)
+                SELECT %s, COALESCE(MAX(order_id), 0) + 1
+                FROM product_types
+                WHERE organization_id = %s
+                """,
+                (organization_id, organization_id),
+            )
+            first = _reserve(cur, organization_id, count)
+        conn.commit()
+        return first
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def next_order_id(conn, organization_id: int, block: int | None = None) -> int:
+    """One order_id for a new product type, from this worker's block when blocks are enabled."""
+    block = block or Config.PRODUCT_TYPE_ORDER_BLOCK
+    if block <= 1:
+        return reserve_order_ids(conn, organization_id, 1)
+    with _blocks_lock:
+        reserved = _blocks.get(organization_id)
+        if reserved and reserved[0] < reserved[1]:
+            reserved[0] += 1
+            return reserved[0] - 1
+    first = reserve_order_ids(conn, organization_id, block)
+    with _blocks_lock:
+        # keep one id, park the rest (a concurrent refill just wastes a block)
+        _blocks[organization_id] = [first + 1, first + block]
+    return first
@@ -1,5 +1,9 @@
 # backend/models/organizations_model.py
+import time
+
 from db_connection import get_db
+from models.revoked_tokens_model import insert_revocation
+from models.user_model import ACCESS_TOKEN_LIFETIME, invalidate_user_org
 
 
 def get_organization_by_id(org_id: int) -> dict | None:
@@ -107,6 +111,12 @@ def assign_user_to_org(user_id: int, org_id: int):
                 sql,
                 (org_id, user_id),
             )
+            # every worker stops trusting the organization_id claim of older tokens
+            now = int(time.time())
+            insert_revocation(
+                cur, "org", str(user_id), now, now + int(ACCESS_TOKEN_LIFETIME.total_seconds())
+            )
             conn.commit()
         finally:
             cur.close()
+    invalidate_user_org(user_id)
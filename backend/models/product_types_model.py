@@ -1,26 +1,20 @@
 # backend/models/product_types_model.py
 from __future__ import annotations
 from db_connection import get_db
+from models.order_sequence_model import next_order_id
 
 
 # -------------- CREATE A PRODUCT TYPE ---------------
 def create_product_type(organization_id: int, name: str) -> int:
     with get_db() as conn:
+        # committed on its own: the counter row is not held during the insert
+        order_id = next_order_id(conn, organization_id)
         cur = conn.cursor()
         try:
-            conn.start_transaction()  # disables autocommit for this tx
-
-            cur.execute(
-                "SELECT COALESCE(MAX(order_id), 0) + 1 "
-                "FROM product_types WHERE organization_id=%s FOR UPDATE",
-                (organization_id,)
-            )
-            (next_order,) = cur.fetchone()
-
             cur.execute(
                 "INSERT INTO product_types (organization_id, name, order_id) "
                 "VALUES (%s, %s, %s)",
-                (organization_id, name, next_order,)
+                (organization_id, name, order_id,)
             )
             conn.commit()
             return cur.lastrowid
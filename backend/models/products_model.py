@@ -22,31 +22,53 @@ def create_product(organization_id: int, type_id: int, name: str, serial_number:
         finally:
             cur.close()
 
-def list_products( organization_id: int, product_type_id: int ) -> list[dict]:
-    sql = """
-        SELECT 
-            p.id, 
-            p.name, 
-            p.serial_number, 
-            p.total_emission, 
-            p.created_at, 
-            p.ended_at, 
-            p.code
-        FROM products p
-        WHERE organization_id = %s AND p.type_id = %s
-        ORDER BY p.created_at DESC
+def list_products(
+    organization_id: int,
+    product_type_id: int,
+    *,
+    limit: int = 100,
+    after: Optional[tuple] = None,
+) -> list[dict]:
+    """
+    One page of a product type's products, newest first, keyset-paginated on
+    (created_at, id): `after` is the (created_at, id) of the previous page's
+    last row. total_emission and emission_count are summed from emissions in
+    the same query, for the page's products only.
+    """
+    where = "p.organization_id = %s AND p.type_id = %s"
+    params = [organization_id, product_type_id]
+    if after is not None:
+        where += " AND (p.created_at < %s OR (p.created_at = %s AND p.id < %s))"
+        params += [after[0], after[0], after[1]]
+    sql = f"""
+        SELECT
+            p.id,
+            p.name,
+            p.serial_number,
+            p.created_at,
+            p.ended_at,
+            p.code,
+            COALESCE(SUM(e.emission_amount), 0) AS total_emission,
+            COUNT(e.id) AS emission_count
+        FROM (
+            SELECT p.id, p.name, p.serial_number, p.created_at, p.ended_at, p.code
+            FROM products p
+            WHERE {where}
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT %s
+        ) p
+        LEFT JOIN emissions e ON e.product_id = p.id
+        GROUP BY p.id, p.name, p.serial_number, p.created_at, p.ended_at, p.code
+        ORDER BY p.created_at DESC, p.id DESC
     """
     with get_db() as conn:
         cur = conn.cursor(dictionary=True)
         try:
-            cur.execute(
-                sql, 
-                (organization_id, product_type_id,),
-            )
+            cur.execute(sql, (*params, limit))
             return cur.fetchall()
         finally:
             cur.close()
-    
+
 # -------------- UPDATE A PRODUCT ---------------
 def update_product(product_id: int, organization_id: int, type_id: Optional[int], name: str, serial_number: Optional[str], code: Optional[str]) -> None:
     sql = """
@@ -90,6 +112,21 @@ def fetch_product(product_id: int) -> Optional[dict]:
             return cur.fetchone()
         finally:
             cur.close()
+
+
+def count_type_products(type_id: int, cap: int) -> int:
+    """Products of a type, counted up to `cap` (enough to tell "more than cap-1")."""
+    sql = """
+        SELECT COUNT(*)
+        FROM (SELECT id FROM products WHERE type_id = %s LIMIT %s) AS t
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (type_id, cap))
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
           
           
 # -------------- DELETE A PRODUCT ---------------
@@ -0,0 +1,222 @@
+# backend/models/report_jobs_model.py
+from db_connection import get_db
+
+
+def create_report_job(product_id: int) -> int:
+    sql = """
+        INSERT INTO report_jobs (product_id, status)
+        VALUES (%s, 'queued')
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (product_id,))
+            conn.commit()
+            return cur.lastrowid
+        finally:
+            cur.close()
+
+
+def get_report_job(job_id: int) -> dict | None:
+    sql = """
+        SELECT
+            id,
+            product_id,
+            status,
+            file_path,
+            error_msg,
+            expires_at,
+            (expires_at IS NOT NULL AND expires_at <= NOW()) AS expired,
+            created_at,
+            updated_at
+        FROM report_jobs
+        WHERE id = %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (job_id,))
+            return cur.fetchone()
+        finally:
+            cur.close()
+
+
+def claim_report_job(job_id: int, worker: str, lease_seconds: int, max_attempts: int) -> bool:
+    # a job is claimable when unclaimed, or when its owner stopped renewing the lease
+    sql = """
+        UPDATE report_jobs
+        SET claimed_by = %s,
+            claimed_at = NOW(),
+            lease_until = NOW() + INTERVAL %s SECOND,
+            attempts = attempts + 1
+        WHERE id = %s
+          AND status IN ('queued', 'running')
+          AND (lease_until IS NULL OR lease_until < NOW())
+          AND attempts < %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (worker, lease_seconds, job_id, max_attempts))
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            cur.close()
+
+
+def list_claimable_report_jobs(max_attempts: int, limit: int = 100) -> list[dict]:
+    sql = """
+        SELECT id, product_id
+        FROM report_jobs
+        WHERE status IN ('queued', 'running')
+          AND (lease_until IS NULL OR lease_until < NOW())
+          AND attempts < %s
+        ORDER BY id
+        LIMIT %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (max_attempts, limit))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def renew_report_job_leases(job_ids: list[int], worker: str, lease_seconds: int) -> None:
+    """Extend the leases of jobs `worker` is still rendering."""
+    if not job_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(job_ids))
+    sql = f"""
+        UPDATE report_jobs
+        SET lease_until = NOW() + INTERVAL %s SECOND
+        WHERE id IN ({placeholders})
+          AND claimed_by = %s
+          AND status IN ('queued', 'running')
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (lease_seconds, *job_ids, worker))
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def release_report_jobs(job_ids: list[int], worker: str) -> None:
+    """Give up the leases of unfinished jobs so any worker can claim them again."""
+    if not job_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(job_ids))
+    sql = f"""
+        UPDATE report_jobs
+        SET lease_until = NULL
+        WHERE id IN ({placeholders})
+          AND claimed_by = %s
+          AND status IN ('queued', 'running')
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (*job_ids, worker))
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def fail_exhausted_report_jobs(max_attempts: int) -> int:
+    """Fail unfinished jobs that lost their worker `max_attempts` times."""
+    sql = """
+        UPDATE report_jobs
+        SET status = 'failed',
+            error_msg = 'render worker stopped before finishing the job'
+        WHERE status IN ('queued', 'running')
+          AND (lease_until IS NULL OR lease_until < NOW())
+          AND attempts >= %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (max_attempts,))
+            conn.commit()
+            return cur.rowcount
+        finally:
+            cur.close()
+
+
+def mark_report_job_running(job_id: int, worker: str) -> None:
+    sql = """
+        UPDATE report_jobs
+        SET status = 'running'
+        WHERE id = %s AND claimed_by = %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (job_id, worker))
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def finish_report_job(job_id: int, worker: str, file_path: str, ttl_seconds: int) -> bool:
+    """False when `worker` no longer holds the job (it was claimed again)."""
+    sql = """
+        UPDATE report_jobs
+        SET status = 'done',
+            file_path = %s,
+            error_msg = NULL,
+            expires_at = NOW() + INTERVAL %s SECOND
+        WHERE id = %s AND claimed_by = %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (file_path, ttl_seconds, job_id, worker))
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            cur.close()
+
+
+def fail_report_job(job_id: int, worker: str, error_msg: str) -> bool:
+    sql = """
+        UPDATE report_jobs
+        SET status = 'failed',
+            error_msg = %s
+        WHERE id = %s AND claimed_by = %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (error_msg[:500], job_id, worker))
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            cur.close()
+
+
+def delete_expired_report_jobs(limit: int = 100) -> list[str]:
+    """Delete expired jobs and return the file paths they left behind."""
+    select_sql = """
+        SELECT id, file_path
+        FROM report_jobs
+        WHERE expires_at IS NOT NULL AND expires_at <= NOW()
+        ORDER BY expires_at
+        LIMIT %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(select_sql, (limit,))
+            rows = cur.fetchall()
+            if not rows:
+                return []
+            ids = [r["id"] for r in rows]
+            placeholders = ", ".join(["%s"] * len(ids))
+            cur.execute(f"DELETE FROM report_jobs WHERE id IN ({placeholders})", tuple(ids))
+            conn.commit()
+            return [r["file_path"] for r in rows if r["file_path"]]
+        finally:
+            cur.close()
@@ -0,0 +1,100 @@
+# backend/models/revoked_tokens_model.py
+#
+# revoked_tokens: the source of truth for JWT revocation. Workers mirror it in
+# routes/token_revocation.py and only come here to confirm a Bloom filter hit.
+from db_connection import get_db
+
+REVOCATION_COLUMNS = "id, kind, token_key, revoked_at, expires_at"
+
+
+def insert_revocation(cur, kind: str, token_key: str, revoked_at: int, expires_at: int):
+    """Record a revocation on the caller's cursor, so it commits with the caller's change."""
+    cur.execute(
+        """
+        INSERT INTO revoked_tokens (kind, token_key, revoked_at, expires_at)
+        VALUES (%s, %s, %s, %s)
+        """,
+        (kind, token_key, revoked_at, expires_at),
+    )
+
+
+def revoke(kind: str, token_key: str, revoked_at: int, expires_at: int):
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            insert_revocation(cur, kind, token_key, revoked_at, expires_at)
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def list_revocations_after(after_id: int, now: int, limit: int = 5000, also_ids=()) -> list[dict]:
+    """
+    Unexpired revocations with id > after_id, plus those in `also_ids` (ids
+    a reader skipped while their transaction was open), in id order.
+    """
+    if also_ids:
+        placeholders = ", ".join(["%s"] * len(also_ids))
+        id_sql, params = f"(id > %s OR id IN ({placeholders}))", (after_id, *also_ids)
+    else:
+        id_sql, params = "id > %s", (after_id,)
+    sql = f"""
+        SELECT {REVOCATION_COLUMNS}
+        FROM revoked_tokens
+        WHERE {id_sql} AND expires_at > %s
+        ORDER BY id
+        LIMIT %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, (*params, now, limit))
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+
+def find_revocation(sid: str | None, user_id: str, issued_at: int, now: int) -> bool:
+    """True when the token (its session, or its user as of issued_at) is revoked."""
+    sql = """
+        SELECT 1
+        FROM revoked_tokens
+        WHERE expires_at > %s
+          AND ((kind = 'session' AND token_key = %s)
+               OR (kind = 'user' AND token_key = %s AND revoked_at >= %s))
+        LIMIT 1
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (now, sid or "", user_id, issued_at))
+            return cur.fetchone() is not None
+        finally:
+            cur.close()
+
+
+def find_org_change(user_id: str, now: int) -> int | None:
+    """When the user's organization last changed (unix seconds), if a mark is still live."""
+    sql = """
+        SELECT MAX(revoked_at)
+        FROM revoked_tokens
+        WHERE kind = 'org' AND token_key = %s AND expires_at > %s
+    """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (user_id, now))
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+
+def purge_revocations(now: int) -> int:
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("DELETE FROM revoked_tokens WHERE expires_at <= %s", (now,))
+            conn.commit()
+            return cur.rowcount
+        finally:
+            cur.close()
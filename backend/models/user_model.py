@@ -1,14 +1,27 @@
 # backend/models/user_model.py
+import threading
+import time
+import uuid
 from datetime import timedelta
 
 from db_connection import get_db
 from flask_jwt_extended import create_access_token, create_refresh_token
-from werkzeug.security import check_password_hash, generate_password_hash
+from models.revoked_tokens_model import insert_revocation
+from password_hasher import get_password_hasher
 
 # Schema columns:
 # id, email_account, email_ci (generated), password_hash, name,
 # user_type ('shop'|'customer'), organization_id, created_at
 
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=60)
+REFRESH_TOKEN_LIFETIME = timedelta(days=7)
+
+# user id -> (fetched_at unix seconds, organization_id); see get_user_org_id
+ORG_CACHE_SECONDS = 60
+ORG_CACHE_MAX_USERS = 10000
+_org_cache: dict[int, tuple[float, int | None]] = {}
+_org_lock = threading.Lock()
+
 
 def create_user(
     account: str,
@@ -22,7 +35,7 @@ def create_user(
     if not email or not password or not user_name:
         raise ValueError("account, password, and user_name are required")
 
-    hashed = generate_password_hash(password)
+    hashed = get_password_hasher().hash(password)
     sql = """
         INSERT INTO users (email_account, password_hash, name, user_type, organization_id)
         VALUES (%s, %s, %s, %s, %s)
@@ -62,7 +75,32 @@ def get_user_by_account(account: str) -> dict | None:
 
 
 def verify_password(stored_hash: str, provided_password: str) -> bool:
-    return check_password_hash(stored_hash, provided_password)
+    return get_password_hasher().verify(stored_hash, provided_password)
+
+
+def update_password_hash(user_id: int, old_hash: str, new_hash: str) -> bool:
+    """Swap in new_hash unless the password changed in the meantime."""
+    sql = """
+        UPDATE users
+        SET password_hash = %s
+        WHERE id = %s AND password_hash = %s
+        """
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, (new_hash, user_id, old_hash))
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            cur.close()
+
+
+def rehash_password_if_needed(user_id: int, stored_hash: str, password: str) -> bool:
+    """After a successful login, upgrade a hash made with old parameters in the background."""
+    hasher = get_password_hasher()
+    if not hasher.needs_rehash(stored_hash):
+        return False
+    return hasher.rehash_later(password, lambda new_hash: update_password_hash(user_id, stored_hash, new_hash))
 
 
 def generate_tokens(
@@ -72,14 +110,16 @@ def generate_tokens(
         "account": account,
         "user_type": user_type,
         "organization_id": organization_id,
+        # one id per sign-in, shared by its access and refresh tokens, so logout can revoke both
+        "sid": uuid.uuid4().hex,
     }
     access = create_access_token(
         identity=str(user_id),
         additional_claims=claims,
-        expires_delta=timedelta(minutes=60),
+        expires_delta=ACCESS_TOKEN_LIFETIME,
     )
     refresh = create_refresh_token(
-        identity=str(user_id), additional_claims=claims, expires_delta=timedelta(days=7)
+        identity=str(user_id), additional_claims=claims, expires_delta=REFRESH_TOKEN_LIFETIME
     )
     return {"access_token": access, "refresh_token": refresh}
 
@@ -128,15 +168,55 @@ def get_user_organization(user_id: int) -> dict | None:
             cur.close()
 
 
+def get_user_org_id(user_id: int, *, fresh_after: float | None = None) -> int | None:
+    """
+    users.organization_id, cached for ORG_CACHE_SECONDS. `fresh_after` (unix
+    seconds, e.g. when the organization last changed) skips cache entries
+    read before then.
+    """
+    now = time.time()
+    with _org_lock:
+        hit = _org_cache.get(user_id)
+        if hit and now - hit[0] < ORG_CACHE_SECONDS and (fresh_after is None or hit[0] > fresh_after):
+            return hit[1]
+
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT organization_id FROM users WHERE id = %s", (user_id,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+    org_id = row[0] if row else None
+
+    with _org_lock:
+        if len(_org_cache) >= ORG_CACHE_MAX_USERS:
+            _org_cache.clear()
+        _org_cache[user_id] = (now, org_id)
+    return org_id
+
+
+def invalidate_user_org(user_id: int):
+    """Forget this worker's cached organization of a user whose membership changed."""
+    with _org_lock:
+        _org_cache.pop(user_id, None)
+
+
 def delete_user(user_id: int) -> None:
     sql = """
         DELETE FROM users
         WHERE id = %s
     """
+    now = int(time.time())
     with get_db() as conn:
         cur = conn.cursor()
         try:
             cur.execute(sql, (user_id,))
+            # every token issued so far dies with the user
+            insert_revocation(
+                cur, "user", str(user_id), now, now + int(REFRESH_TOKEN_LIFETIME.total_seconds())
+            )
             conn.commit()
         finally:
-            cur.close()
\ No newline at end of file
+            cur.close()
+    invalidate_user_org(user_id)
@@ -0,0 +1,222 @@
+# backend/password_hasher.py
+#
+# Password hashing and verification off the request thread. werkzeug's scrypt
+# and pbkdf2 are deliberately slow and hold the GIL, so a burst of logins on
+# the request threads stalls every other request in the worker. Here they run
+# in a small per-worker ProcessPoolExecutor, whose processes come from a
+# forkserver: the pool starts on a request thread, and a plain fork there
+# would copy locks other threads hold. At most `max_pending` operations
+# may be queued or running; beyond that callers get PasswordHasherBusy at once
+# (the routes answer 503) instead of piling up behind the pool.
+#
+# Hashes made with other parameters than PASSWORD_HASH_METHOD still verify;
+# needs_rehash() tells the caller to store a fresh hash after a good login.
+# Storing it is a database write, so it runs on a separate thread: future
+# callbacks run on the pool's management thread, and a slow write there would
+# hold back every other hash and verify result in the worker.
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from config import Config
+
+LATENCY_SAMPLES = 1000  # per operation, for the percentiles in stats()
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing slot is taken; retry later."""
+
+
+def _hash_job(password: str, method: str) -> tuple[str, float]:
+    t0 = time.perf_counter()
+    return generate_password_hash(password, method=method), time.perf_counter() - t0
+
+
+def _verify_job(stored_hash: str, password: str) -> tuple[bool, float]:
+    t0 = time.perf_counter()
+    return check_password_hash(stored_hash, password), time.perf_counter() - t0
+
+
+def _percentile(ordered: list[float], pct: float) -> float | None:
+    if not ordered:
+        return None
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[k], 4)
+
+
+class PasswordHasher:
+    def __init__(self, method: str = "scrypt", workers: int = 2, max_pending: int = 32, timeout: float = 10):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._pool: ProcessPoolExecutor | None = None
+        self._store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-rehash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._stores_pending = 0  # rehashed passwords waiting to be stored
+        self._prefix: str | None = None
+        self._counts = {"hash": 0, "verify": 0, "rejected": 0, "errors": 0, "rehashed": 0, "rehash_dropped": 0}
+        # (seconds from submit to result, seconds of hashing in the pool process)
+        self._latency = {op: deque(maxlen=LATENCY_SAMPLES) for op in ("hash", "verify")}
+
+    # ---- pool ----
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("forkserver")
+                )
+            return self._pool
+
+    def _reset_pool(self, broken: ProcessPoolExecutor):
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False)
+
+    def submit(self, op: str, fn, *args) -> Future:
+        """Queue one job or raise PasswordHasherBusy; the slot frees when the job ends."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counts["rejected"] += 1
+                raise PasswordHasherBusy(f"{self._pending} password operations in flight")
+            self._pending += 1
+
+        started = time.perf_counter()
+        pool = self._get_pool()
+        try:
+            future = pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # a pool process died (e.g. OOM-killed); start a new pool once
+            self._reset_pool(pool)
+            try:
+                future = self._get_pool().submit(fn, *args)
+            except Exception:
+                self._release()
+                raise
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(lambda f: self._finished(op, started, f))
+        return future
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+
+    def _finished(self, op: str, started: float, future: Future):
+        total = time.perf_counter() - started
+        with self._lock:
+            self._pending -= 1
+            if future.cancelled() or future.exception() is not None:
+                self._counts["errors"] += 1
+                return
+            self._counts[op] += 1
+            self._latency[op].append((total, future.result()[1]))
+
+    # ---- operations ----
+    def _wait(self, future: Future):
+        try:
+            return future.result(self.timeout)[0]
+        except TimeoutError:
+            raise PasswordHasherBusy(f"password operation took longer than {self.timeout}s") from None
+
+    def hash(self, password: str) -> str:
+        return self._wait(self.submit("hash", _hash_job, password, self.method))
+
+    def verify(self, stored_hash: str, password: str) -> bool:
+        if not stored_hash:
+            return False
+        return self._wait(self.submit("verify", _verify_job, stored_hash, password))
+
+    def needs_rehash(self, stored_hash: str) -> bool:
+        """True when stored_hash was made with other parameters than self.method."""
+        if self._prefix is None:
+            # werkzeug fills in default parameters, so ask it what the method expands to
+            self._prefix = generate_password_hash("", method=self.method).split("$", 1)[0]
+        return stored_hash.split("$", 1)[0] != self._prefix
+
+    def rehash_later(self, password: str, store) -> bool:
+        """
+        Hash `password` in the background and call store(new_hash) when done.
+        Returns False when the pool is saturated; the next login tries again.
+        """
+        try:
+            future = self.submit("hash", _hash_job, password, self.method)
+        except PasswordHasherBusy:
+            return False
+
+        def write(new_hash: str):
+            try:
+                store(new_hash)
+            except Exception as e:
+                print(f"password rehash failed: {type(e).__name__}: {e}")
+                return
+            finally:
+                with self._lock:
+                    self._stores_pending -= 1
+            with self._lock:
+                self._counts["rehashed"] += 1
+
+        def done(f: Future):
+            # management thread: hand the write off, never wait on the database here
+            if f.cancelled() or f.exception() is not None:
+                return
+            with self._lock:
+                if self._stores_pending >= self.max_pending:
+                    # the database is not keeping up; the next login tries again
+                    self._counts["rehash_dropped"] += 1
+                    return
+                self._stores_pending += 1
+            self._store_pool.submit(write, f.result()[0])
+
+        future.add_done_callback(done)
+        return True
+
+    # ---- metrics ----
+    def stats(self) -> dict:
+        with self._lock:
+            samples = {op: list(d) for op, d in self._latency.items()}
+            result = {
+                "method": self.method,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._pending,
+                "rehash_stores_pending": self._stores_pending,
+                **self._counts,
+            }
+        for op, rows in samples.items():
+            totals = sorted(r[0] for r in rows)
+            compute = sorted(r[1] for r in rows)
+            result[f"{op}_seconds"] = {
+                "samples": len(rows),
+                "p50": _percentile(totals, 50),
+                "p95": _percentile(totals, 95),
+                "p99": _percentile(totals, 99),
+                "max": round(totals[-1], 4) if totals else None,
+                "compute_p50": _percentile(compute, 50),
+            }
+        return result
+
+
+_hasher: PasswordHasher | None = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    with _hasher_lock:
+        if _hasher is None:
+            _hasher = PasswordHasher(
+                method=Config.PASSWORD_HASH_METHOD,
+                workers=Config.PASSWORD_HASH_WORKERS,
+                max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+                timeout=Config.PASSWORD_HASH_TIMEOUT,
+            )
+        return _hasher
@@ -1,5 +1,7 @@
 # backend/routes/auth.py
-from flask import Blueprint, jsonify, request
+import time
+
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import (
     create_access_token,
     get_jwt,
@@ -16,14 +18,30 @@ from models.user_model import (
     generate_tokens,
     get_user_by_account,
     get_user_by_id,
+    REFRESH_TOKEN_LIFETIME,
+    get_user_org_id,
+    rehash_password_if_needed,
     verify_password,
     delete_user,
 )
+from models.revoked_tokens_model import revoke
+from password_hasher import PasswordHasherBusy, get_password_hasher
+from routes.auth_context import org_changed_at
 from routes.helpers import display_id, parse_display_id, json_response
+from routes.rate_limit import auth_rate_limited
+from routes.token_revocation import get_revocation_store
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth") 
 
+
+def _hasher_busy():
+    resp = json_response({"status": "503: too many sign-ins in progress, retry shortly"}, 503)
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+
 @auth_bp.post("/register")
+@auth_rate_limited("register")
 def register():
     data = request.get_json(force=True)
     account = (data.get("account") or "").strip().lower()
@@ -48,9 +66,12 @@ def register():
         org_id = org["id"]
 
     # create_user
-    user_id = create_user(
-        account, password, user_name, user_type=user_type, organization_id=org_id
-    )
+    try:
+        user_id = create_user(
+            account, password, user_name, user_type=user_type, organization_id=org_id
+        )
+    except PasswordHasherBusy:
+        return _hasher_busy()
 
     # tokens embed user_type + organization_id
     tokens = generate_tokens(
@@ -70,6 +91,7 @@ def register():
             },201)
     
 @auth_bp.post("/login")
+@auth_rate_limited("login")
 def login():
     data = request.get_json(force=True)
     account = (data.get("account") or "").strip().lower()
@@ -83,8 +105,12 @@ def login():
 
 
     # Expect user to include 'password_hash'
-    if not verify_password(user["password_hash"], password):
-        return jsonify(error="invalid credentials"), 401
+    try:
+        if not verify_password(user["password_hash"], password):
+            return jsonify(error="invalid credentials"), 401
+    except PasswordHasherBusy:
+        return _hasher_busy()
+    rehash_password_if_needed(user["id"], user["password_hash"], password)
 
     tokens = generate_tokens(
         user["id"],
@@ -108,13 +134,38 @@ def refresh():
     claims = get_jwt()
     account = claims.get("account")
     user_type = claims.get("user_type", "customer")
+    # re-read the organization: it may have changed during the refresh token's lifetime
+    organization_id = get_user_org_id(int(user_id), fresh_after=org_changed_at(int(user_id)))
 
     # issue a new short-lived access token
     new_access = create_access_token(
-        identity=user_id, additional_claims={"account": account, "user_type": user_type}
+        identity=user_id,
+        additional_claims={
+            "account": account,
+            "user_type": user_type,
+            "organization_id": organization_id,
+            "sid": claims.get("sid"),
+        },
     )
     return json_response({"access_token": new_access}, 200)
 
+@auth_bp.post("/logout")
+@jwt_required(refresh=True)
+def logout():
+    sid = get_jwt().get("sid")
+    if not sid:
+        return json_response({"status": "400: token predates logout support; let it expire"}, 400)
+    now = int(time.time())
+    # the refresh token is the longest-lived token of the sign-in
+    revoke("session", sid, now, now + int(REFRESH_TOKEN_LIFETIME.total_seconds()))
+    get_revocation_store(current_app.config).note_revoked("session", sid)
+    return json_response({"status": "200: logged out"}, 200)
+
+@auth_bp.get("/hash/metrics")
+@jwt_required()
+def hash_metrics():
+    return json_response(get_password_hasher().stats(), 200)
+
 @auth_bp.get("/me")
 @jwt_required()
 def me():
@@ -148,6 +199,7 @@ def update_me():
         if not org:
             return json_response({"error 404": "organization not found"}, 404)
         assign_user_to_org(user_id, org["id"])
+        get_revocation_store(current_app.config).note_revoked("org", user_id)
     return json_response({"status": "200: update successfully"}, 200)
 
 @auth_bp.delete("/me")
@@ -158,5 +210,6 @@ def delete_me():
     if not user:
         return json_response({"status": "404: user not found"}, 404)
     delete_user(user_id)
+    get_revocation_store(current_app.config).note_revoked("user", user_id)
     return json_response({"status": "200: user deleted"}, 200)
 
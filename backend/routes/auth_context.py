@@ -0,0 +1,29 @@
+# backend/routes/auth_context.py
+#
+# Who is calling, resolved from the verified JWT instead of the database.
+# generate_tokens embeds organization_id and user_type, so most requests need
+# no lookup at all. The database (through user_model's short TTL cache) is
+# only consulted when the claim is missing, e.g. tokens issued before the
+# claim existed, or when the user's organization changed after the token was
+# issued. Changes are recorded as 'org' marks in revoked_tokens, which every
+# worker mirrors in its revocation store.
+from flask import current_app
+from flask_jwt_extended import get_jwt
+
+from models.user_model import get_user_org_id
+from routes.token_revocation import get_revocation_store
+
+
+def org_changed_at(user_id: int) -> int | None:
+    """When the user's organization last changed (unix seconds), if recently."""
+    return get_revocation_store(current_app.config).org_changed_at(user_id)
+
+
+def current_org_id() -> int | None:
+    """Organization of the caller; call inside a @jwt_required() view."""
+    claims = get_jwt()
+    uid = int(claims["sub"])
+    changed = org_changed_at(uid)
+    if "organization_id" in claims and (changed is None or changed < claims.get("iat", 0)):
+        return claims["organization_id"]
+    return get_user_org_id(uid, fresh_after=changed)
@@ -1,11 +1,11 @@
 # backend/routes/emissions.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import (
     get_jwt_identity,
     jwt_required,
 )
     
-from models.user_model import get_user_organization
+from routes.auth_context import current_org_id
 from models.product_types_model import get_product_type_by_id
 from models.products_model import fetch_product
 from models.emissions_model import (
@@ -20,11 +20,17 @@ from models.emissions_model import (
 )
 
 from routes.helpers import json_response, parse_display_id, display_id
+from routes.report_cache import invalidate_product_reports
 
 
 product_emission_bp = Blueprint("emissions", __name__, url_prefix="/emissions")
 emission_bp = Blueprint("emissions", __name__, url_prefix="/emissions")
 
+
+def _invalidate_reports(product_id: int):
+    # cached workbooks are keyed by content, this just frees their disk space early
+    invalidate_product_reports(current_app.config["REPORT_CACHE_DIR"], product_id)
+
 # Product Emissions routes 
 # -------- GET: List emissions from one product --------
 @product_emission_bp.get("emissions")
@@ -60,9 +66,10 @@ def create(product_id):
     factor_id = data.get("factor_id")
     quantity = data.get("quantity")
     created_by = uid
+    product_id_int = parse_display_id(product_id, "PRD")
     create_emission(
             name,
-            parse_display_id(product_id, "PRD"),
+            product_id_int,
             stage_id,
             factor_id,
             quantity,
@@ -70,6 +77,7 @@ def create(product_id):
             step_id,
             created_by,
     )
+    _invalidate_reports(product_id_int)
     return json_response({"message": "Emission record created"}, 201)
 
 @product_emission_bp.get("emissions/summary")
@@ -82,9 +90,9 @@ def summary(product_id):
 @emission_bp.get("")
 @jwt_required()
 def get_all_by_org():
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    org_id = org["id"]
+    org_id = current_org_id()
+    if org_id is None:
+        return jsonify({"error": "user has no organization"}), 400
     ps = get_emissions_by_org(org_id)
     return jsonify(emissions = ps), 200
 
@@ -123,12 +131,20 @@ def get_one(emission_id):
 def update(emission_id):
     data = request.get_json()
     quantity = data.get("new_amount")
-    update_emission_quantity(parse_display_id(emission_id, "EMS"), quantity)
+    emission_id_int = parse_display_id(emission_id, "EMS")
+    emission = get_emission(emission_id_int)
+    update_emission_quantity(emission_id_int, quantity)
+    if emission:
+        _invalidate_reports(emission["product_id"])
     return json_response({"message": "Emission record updated"}, 200)
 
 @emission_bp.delete("/<string:emission_id>")
 @jwt_required()
 def delete(emission_id):
-    delete_emission(parse_display_id(emission_id, "EMS"))
+    emission_id_int = parse_display_id(emission_id, "EMS")
+    emission = get_emission(emission_id_int)
+    delete_emission(emission_id_int)
+    if emission:
+        _invalidate_reports(emission["product_id"])
     return json_response({"message": "Emission record deleted"}, 200)
 
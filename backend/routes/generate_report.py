@@ -1,13 +1,15 @@
-import sys, json, argparse
+import os, sys, json, argparse, pickle, threading
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import accumulate
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, List, Tuple
 import openpyxl
 from openpyxl.utils.cell import range_boundaries
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from copy import copy
-from models.emissions_model import get_emissions_by_product
-from models.products_model import fetch_product
-from models.factor_model import get_factor
+from models.emissions_model import get_product_report_data
+from routes.record_store import record_version_path, save_record_version
 from flask import current_app
 
 TARGET_STAGE_IN_EXCEL = {
@@ -33,6 +35,10 @@ TARGET_STAGE_IN_EXCEL = {
     },
 }
 
+PRODUCT_NAME_CELL = "C9"
+
+RENDER_MODES = ("exact", "fast")
+
 PROTECTED_MERGED_RANGES = [
     "B71:M71",
     "B157:O157",
@@ -67,23 +73,31 @@ STAGE_ENG_TO_ZH = {
 
 
 STAGE_ORDER_KEYS = ["raw", "manufacture", "distribution", "use", "disposal"]
+STAGE_ORDER = [STAGE_ENG_TO_ZH[k] for k in STAGE_ORDER_KEYS]
 
 
-def generate_json(product_id: int):
+def build_report_data(product_id: int) -> dict | None:
+    """
+    Assemble the report record for a product in memory.
+    Returns None when the product does not exist.
+    """
+    # product + emissions + factor units in one round trip
+    pd, ems = get_product_report_data(product_id)
+    if pd is None:
+        return None
+    return report_data_from_rows(pd, ems)
 
-    pd = fetch_product(product_id) 
-    ems = get_emissions_by_product(product_id) # list of dicts
-    
-    records_dir = Path(current_app.config["REPORT_RECORDS_DIR"])
-    records_dir.mkdir(parents=True, exist_ok=True)
 
-    output_json = f"{product_id}.json"
-    output_path = records_dir / output_json
+def build_reports_data(grouped: dict) -> dict[int, dict]:
+    """Batch form of build_report_data, from get_products_report_data output."""
+    return {pid: report_data_from_rows(pd, ems) for pid, (pd, ems) in grouped.items()}
+
 
+def report_data_from_rows(pd: dict, ems: list[dict]) -> dict:
     # structure the data according to the expected JSON format
     data = {
         "product": {
-            "id": product_id,
+            "id": pd.get('id'),
             "name": pd.get('name'),
             "type_id": pd.get('type_id'),
         },
@@ -102,7 +116,7 @@ def generate_json(product_id: int):
             "material": em.get("name"),
             "factor_id": em.get("factor_id"),
             "amount": em.get("quantity"),
-            "unit": get_factor(em.get("factor_id"))["unit"], # from factor
+            "unit": em.get("unit"), # joined from factors
             "emission_amount": em.get("emission_amount"),
             "timestamp": em.get("created_at").isoformat(),
         }
@@ -114,13 +128,44 @@ def generate_json(product_id: int):
             "stage_name": STAGE_ENG_TO_ZH.get(stage_id),
             "records": records
         })
-        
-   
-    # write to output JSON file, under report/records/
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
 
-    return output_path
+    return data
+
+
+def save_record_json(data: dict, records_dir, *, keep_versions: int = 0, max_age_days: int = 0) -> Path:
+    """Store the record as a new version (unless unchanged) and return its JSON path."""
+    entry = save_record_version(
+        records_dir, data, keep_versions=keep_versions, max_age_days=max_age_days
+    )
+    return record_version_path(records_dir, data["product"]["id"], entry["v"])
+
+
+# single background writer: snapshots are best effort and must not block downloads
+_snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-snapshot")
+
+def _save_record_json_logged(data: dict, records_dir, **policy) -> Path | None:
+    try:
+        return save_record_json(data, records_dir, **policy)
+    except OSError as e:
+        print(f"Error writing report record for product {data['product']['id']}: {e}")
+        return None
+
+def snapshot_record_async(data: dict, records_dir, **policy) -> Future:
+    """`policy` is passed on to save_record_json (keep_versions, max_age_days)."""
+    return _snapshot_executor.submit(_save_record_json_logged, data, records_dir, **policy)
+
+
+def generate_json(product_id: int):
+    data = build_report_data(product_id)
+    if data is None:
+        raise ValueError(f"product_id={product_id} does not exist")
+    # versioned snapshot under report/records/<product_id>/
+    return save_record_json(
+        data,
+        current_app.config["REPORT_RECORDS_DIR"],
+        keep_versions=current_app.config["REPORT_RECORD_KEEP_VERSIONS"],
+        max_age_days=current_app.config["REPORT_RECORD_MAX_AGE_DAYS"],
+    )
 
 
 def load_json(p: Path):
@@ -174,9 +219,32 @@ def copy_row_style_borders(ws, src_row: int, dst_row: int, cols_letters: list):
         try: dst.font = copy(src.font)
         except: pass
 
-def insert_rows_preserve_merges(ws, idx: int, amount: int = 1):
-    if amount <= 0:
+def row_offset(insertions: List[Tuple[int, int]]) -> Callable[[int], int]:
+    """
+    Build row -> number of rows inserted above it, for (idx, amount)
+    insertions that each go before row idx.
+    """
+    insertions = sorted((idx, amount) for idx, amount in insertions if amount > 0)
+    idxs = [idx for idx, _ in insertions]
+    shifts = list(accumulate(amount for _, amount in insertions))
+
+    def offset(row: int) -> int:
+        i = bisect_right(idxs, row)
+        return shifts[i - 1] if i else 0
+
+    return offset
+
+def apply_row_insertions(ws, insertions: List[Tuple[int, int]]):
+    """
+    Insert several blocks of rows in a single pass while keeping merged cells.
+    `insertions` is a list of (idx, amount) in the sheet's current coordinates;
+    each block is inserted before row idx, exactly as if insert_rows had been
+    called for each block from the bottom up.
+    """
+    insertions = [(idx, amount) for idx, amount in insertions if amount > 0]
+    if not insertions:
         return
+    offset = row_offset(insertions)
 
     old_ranges = list(ws.merged_cells.ranges)
     merged_info = []
@@ -186,21 +254,33 @@ def insert_rows_preserve_merges(ws, idx: int, amount: int = 1):
     for mr in old_ranges:
         ws.unmerge_cells(str(mr))
 
-    ws.insert_rows(idx, amount)
-        
-    for min_col, min_row, max_col, max_row in merged_info:
-        if min_row >= idx:
-            min_row += amount
-            max_row += amount
+    # move every cell once instead of once per inserted block
+    moved = {}
+    for (row, col), cell in ws._cells.items():
+        shift = offset(row)
+        if shift:
+            cell.row = row + shift
+        moved[(row + shift, col)] = cell
+    ws._cells = moved
+    ws._current_row = ws.max_row
 
+    for min_col, min_row, max_col, max_row in merged_info:
+        shift = offset(min_row)
         ws.merge_cells(
-            start_row=min_row,
+            start_row=min_row + shift,
             start_column=min_col,
-            end_row=max_row,
+            end_row=max_row + shift,
             end_column=max_col,
         )
 
-def ensure_space_for_rows(ws, start_row: int, cols_letters: List[str], needed_rows: int) -> int:
+def insert_rows_preserve_merges(ws, idx: int, amount: int = 1):
+    apply_row_insertions(ws, [(idx, amount)])
+
+def find_free_rows(ws, start_row: int, cols_letters: List[str]) -> Tuple[int, int]:
+    """
+    Return (first_free, boundary): the first empty row at or after start_row
+    and the first non-empty row after that gap, looking only at cols_letters.
+    """
     cols = [col_letter_to_index(x) for x in cols_letters]
     max_r = ws.max_row
 
@@ -219,6 +299,11 @@ def ensure_space_for_rows(ws, start_row: int, cols_letters: List[str], needed_ro
             break
         boundary += 1
 
+    return first_free, boundary
+
+def ensure_space_for_rows(ws, start_row: int, cols_letters: List[str], needed_rows: int) -> int:
+    first_free, boundary = find_free_rows(ws, start_row, cols_letters)
+
     capacity = boundary - first_free  # current continuous empty rows
     extra = max(0, needed_rows - capacity)
 
@@ -227,47 +312,78 @@ def ensure_space_for_rows(ws, start_row: int, cols_letters: List[str], needed_ro
 
     return first_free, extra, boundary
 
-def unmerge_only_on_row_for_cols(ws, row: int, cols_letters: list):
+def plan_stage_layout(ws, stage_rows: dict, free_rows: dict | None = None) -> List[dict]:
+    """
+    Work out where every stage's rows go before the sheet is modified.
+    Free space is measured on the untouched template; since stages are laid
+    out top to bottom in STAGE_ORDER, rows inserted for a stage only shift
+    the stages below it. Each entry holds the stage's "data_row" in final
+    sheet coordinates and its row insertion ("insert_at", "extra") in
+    template coordinates, ready for apply_row_insertions.
+    `free_rows` (stage -> find_free_rows result) skips scanning `ws`.
+    """
+    layout = []
+    shift = 0  # rows inserted for the stages above
+    for stage in STAGE_ORDER:
+        rows = stage_rows.get(stage)
+        if not rows:
+            continue # no data for this stage
+
+        cfg  = TARGET_STAGE_IN_EXCEL.get(stage, {})
+        cols = cfg.get("cols")
+        if not cols:
+            print(f"no cols, skip {stage}")
+            continue
+
+        if free_rows is not None:
+            first_free, boundary = free_rows[stage]
+        else:
+            start_row = anchor_to_row(cfg["anchor"]) + 1
+            first_free, boundary = find_free_rows(ws, start_row, cols)
+        capacity = boundary - first_free
+        extra = max(0, len(rows) - capacity)
+
+        layout.append({
+            "stage": stage,
+            "cols": cols,
+            "rows": rows,
+            "first_free": first_free,
+            "capacity": capacity,
+            "data_row": first_free + shift,
+            "insert_at": boundary,
+            "extra": extra,
+        })
+        shift += extra
+    return layout
+
+def unmerge_on_rows_for_cols(ws, first_row: int, last_row: int, cols_letters: list):
     """
-    only unmerge merged cells that overlap with the specified row and column letters.
+    only unmerge merged cells that overlap with the specified rows and column letters.
     """
     target_cols = [col_letter_to_index(c) for c in cols_letters]
     min_col, max_col = min(target_cols), max(target_cols)
 
-    protected_bounds = []
+    protected_bounds = set()
     for coord in PROTECTED_MERGED_RANGES:
-        p_min_col, p_min_row, p_max_col, p_max_row = range_boundaries(coord)
-        protected_bounds.append((p_min_col, p_min_row, p_max_col, p_max_row))
+        protected_bounds.add(range_boundaries(coord))
 
     hits = []
     for rng in list(ws.merged_cells.ranges):
         # check if it's a protected area; if so, skip it entirely
-        r_min_col, r_min_row, r_max_col, r_max_row = (
-            rng.min_col,
-            rng.min_row,
-            rng.max_col,
-            rng.max_row,
-        )
-
-        is_protected = any(
-            (r_min_col == p_min_col and
-             r_max_col == p_max_col and
-             r_min_row == p_min_row and
-             r_max_row == p_max_row)
-            for (p_min_col, p_min_row, p_max_col, p_max_row) in protected_bounds
-        )
-        if is_protected:
+        if rng.bounds in protected_bounds:
             continue
 
-        same_row = (r_min_row <= row <= r_max_row)
-        overlap_col = not (r_max_col < min_col or r_min_col > max_col)
-        if same_row and overlap_col:
+        overlap_row = not (rng.max_row < first_row or rng.min_row > last_row)
+        overlap_col = not (rng.max_col < min_col or rng.min_col > max_col)
+        if overlap_row and overlap_col:
             hits.append(rng)
 
     # unmerge hits
     for rng in hits:
         ws.unmerge_cells(str(rng))
 
+def unmerge_only_on_row_for_cols(ws, row: int, cols_letters: list):
+    unmerge_on_rows_for_cols(ws, row, row, cols_letters)
 
 
 def write_rows(ws, start_row: int, cols_letters: List[str], rows: List[Tuple[str, float, str]]):
@@ -295,56 +411,88 @@ def write_rows(ws, start_row: int, cols_letters: List[str], rows: List[Tuple[str
 
         r += 1
 
-def generate_report(product_id: int, template_xlsx: str, output_xlsx: str):
-    record_json_path = generate_json(product_id)  
-    data = load_json(record_json_path)
-    wb = openpyxl.load_workbook(template_xlsx)
-    stage_rows = collect_by_stage(data)
-    product_name = collect_product_name(data)
+# template path -> (version, pickled workbook), one per worker process
+_template_cache: dict[str, tuple[tuple[int, int], bytes]] = {}
+_template_lock = threading.Lock()
 
-    ws = wb.active
-    ws["C9"].value = product_name
+def template_version(template_xlsx: str) -> tuple[int, int]:
+    st = os.stat(template_xlsx)
+    return (st.st_mtime_ns, st.st_size)
 
-    stage_anchor_rows = {}
-    for stage, cfg in TARGET_STAGE_IN_EXCEL.items():
-        anchor = cfg["anchor"]          # "B172"
-        row_idx = anchor_to_row(anchor) # 172
-        stage_anchor_rows[stage] = row_idx
-    STAGE_ORDER = ["原料取得", "製造", "配銷", "使用", "廢棄"]
+def load_template(template_xlsx: str):
+    """
+    Return a fresh, mutable copy of the template workbook.
+    The template is parsed once per worker and kept as a pickled snapshot;
+    unpickling takes about half as long as re-parsing the xlsx XML. The
+    snapshot is rebuilt when the template file's mtime or size changes.
+    Copying and saving the whole workbook still dominate an exact render
+    (hundreds of ms against a few ms of row writing); mode="fast" avoids both.
+    """
+    version = template_version(template_xlsx)
+    with _template_lock:
+        cached = _template_cache.get(template_xlsx)
+        if cached is None or cached[0] != version:
+            wb = openpyxl.load_workbook(template_xlsx)
+            cached = (version, pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL))
+            _template_cache[template_xlsx] = cached
+    return pickle.loads(cached[1])
 
-    for stage in STAGE_ORDER:
-        rows = stage_rows.get(stage)
-        if not rows:
-            continue # no data for this stage
+_fast_warned = False
 
-        cfg  = TARGET_STAGE_IN_EXCEL.get(stage, {})
-        cols = cfg.get("cols")
-        if not cols:
-            print(f"no cols, skip {stage}")
-            continue
 
-        # use the possibly-updated anchor row
-        header_row = stage_anchor_rows[stage]
-        start_row  = header_row + 1
+def _warn_fast_unsupported():
+    global _fast_warned
+    if not _fast_warned:
+        _fast_warned = True
+        print(f"report: fast render mode not supported on openpyxl {openpyxl.__version__}, rendering exact")
+
+
+def render_report(data: dict, template_xlsx: str, output, *, mode: str = "exact"):
+    """
+    Render report data into the Excel template.
+    `output` may be a file path or a writable binary file object.
+    mode="exact" edits the template with openpyxl (full fidelity);
+    mode="fast" streams the sheet from a precompiled template layout.
+    """
+    if mode not in RENDER_MODES:
+        raise ValueError(f"unknown render mode: {mode}")
+    if mode == "fast":
+        from routes.report_fast import FAST_RENDER_SUPPORTED, render_report_fast
+        if FAST_RENDER_SUPPORTED:
+            return render_report_fast(data, template_xlsx, output)
+        _warn_fast_unsupported()
+
+    wb = load_template(template_xlsx)
+    fill_report_sheet(wb.active, data)
+    wb.save(output)
+
+
+def fill_report_sheet(ws, data: dict) -> List[dict]:
+    """Write the product name and every stage's rows into the template sheet."""
+    stage_rows = collect_by_stage(data)
+    product_name = collect_product_name(data)
 
-        data_row, extra, boundary = ensure_space_for_rows(ws, start_row, cols, len(rows))
+    ws[PRODUCT_NAME_CELL].value = product_name
 
-        # unmerge + copy style
-        for i in range(len(rows)):
-            unmerge_only_on_row_for_cols(ws, data_row + i, cols)
+    # plan every stage first, then shift the sheet once and write
+    layout = plan_stage_layout(ws, stage_rows)
+    apply_row_insertions(ws, [(st["insert_at"], st["extra"]) for st in layout])
 
-        # write data
-        write_rows(ws, data_row, cols, rows)
+    for st in layout:
+        rows = st["rows"]
+        data_row = st["data_row"]
+        unmerge_on_rows_for_cols(ws, data_row, data_row + len(rows) - 1, st["cols"])
+        write_rows(ws, data_row, st["cols"], rows)
+    return layout
 
-        # update subsequent stage anchor rows
-        if extra > 0:
-            for later_stage in STAGE_ORDER:
-                if later_stage == stage:
-                    continue
-                if stage_anchor_rows[later_stage] >= boundary:
-                    stage_anchor_rows[later_stage] += extra
 
-    wb.save(output_xlsx)
+def generate_report(product_id: int, template_xlsx: str, output_xlsx, *, snapshot_dir=None):
+    data = build_report_data(product_id)
+    if data is None:
+        raise ValueError(f"product_id={product_id} does not exist")
+    if snapshot_dir:
+        snapshot_record_async(data, snapshot_dir)
+    render_report(data, template_xlsx, output_xlsx)
     print(f"output file: {output_xlsx}")
 
 def main():
@@ -352,9 +500,12 @@ def main():
     ap.add_argument("template_xlsx")
     ap.add_argument("record_json")
     ap.add_argument("output_xlsx")
+    ap.add_argument("--mode", choices=RENDER_MODES, default="exact")
     args = ap.parse_args()
 
-    generate_report(args.template_xlsx, args.record_json, args.output_xlsx)
+    render_report(
+        load_json(Path(args.record_json)), args.template_xlsx, args.output_xlsx, mode=args.mode
+    )
 
 
 if __name__ == "__main__":
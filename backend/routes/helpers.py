@@ -1,5 +1,7 @@
 # backend/helpers.py
 
+import base64
+import datetime
 import json
 from flask import Response
 
@@ -12,6 +14,7 @@ PREFIXES = {
     "steps": "STP",
     "tags": "TAG",
     "organizations": "ORG",
+    "report_jobs": "RPJ",
 }
 
 def display_id(table: str, numeric_id: int) -> str:
@@ -28,6 +31,21 @@ def parse_display_id(value: str, expected_prefix: str) -> int:
     return int(suffix)
 
 
+def encode_cursor(created_at: datetime.datetime, row_id: int) -> str:
+    """Opaque keyset cursor for (created_at, id) ordered listings."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, row_id = raw.split("|")
+        return datetime.datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor") from None
+
+
 def json_response(data, status=200):
     """
     Returns a JSON response with preserved key order.
@@ -0,0 +1,57 @@
+# backend/routes/id_tail.py
+#
+# Read position in an append-only table keyed by AUTO_INCREMENT id, for
+# tailers that poll "rows after the last id I saw". InnoDB hands out ids when
+# a row is inserted, not when its transaction commits, so a row can become
+# visible after rows with higher ids. Reading only id > last_id would skip it
+# for good. IdTail also remembers the ids it skipped over (gaps) and asks for
+# them again on every poll until they show up or GAP_WAIT_SECONDS pass. Ids
+# of rolled-back inserts never show up, so gaps have to expire.
+import time
+
+GAP_WAIT_SECONDS = 60  # far longer than any transaction that writes these logs
+MAX_GAPS = 1000  # gaps tracked at once; a larger id jump only tracks its top end
+
+
+class IdTail:
+    def __init__(self, last_id: int = 0, gap_wait: float = GAP_WAIT_SECONDS):
+        self.last_id = last_id
+        self.gap_wait = gap_wait
+        self._gaps: dict[int, float] = {}  # missing id -> when it was first skipped
+
+    def gaps(self, now: float | None = None) -> list[int]:
+        """Missing ids still worth asking for, oldest first; expired ones are dropped."""
+        now = time.monotonic() if now is None else now
+        for gap in [g for g, seen in self._gaps.items() if now - seen > self.gap_wait]:
+            del self._gaps[gap]
+        return sorted(self._gaps)
+
+    def gap_count(self) -> int:
+        return len(self._gaps)
+
+    def resume_after(self) -> int:
+        """Highest id up to which every row has been accepted (or given up on)."""
+        return min(self._gaps) - 1 if self._gaps else self.last_id
+
+    def accept(self, rows: list[dict], now: float | None = None) -> list[dict]:
+        """
+        Feed the rows of one poll (ordered by id, from "id > last_id OR id IN
+        gaps"); returns the ones not accepted before, in the same order.
+        """
+        now = time.monotonic() if now is None else now
+        fresh = []
+        for row in rows:
+            row_id = row["id"]
+            if row_id in self._gaps:
+                del self._gaps[row_id]
+            elif row_id > self.last_id:
+                for missing in range(max(self.last_id + 1, row_id - MAX_GAPS), row_id):
+                    self._gaps[missing] = now
+                self.last_id = row_id
+            else:
+                continue  # already accepted
+            fresh.append(row)
+        if len(self._gaps) > MAX_GAPS:
+            for gap in sorted(self._gaps)[:len(self._gaps) - MAX_GAPS]:
+                del self._gaps[gap]
+        return fresh
@@ -1,18 +1,32 @@
 # backend/routes/onchain.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required
 from db_connection import get_db
+from models.chain_model import apply_status_updates, build_payload, get_product_statuses, get_statuses
+from models.onchain_batch_model import get_emission_proof
+from models.onchain_events_model import record_status_events
+from models.onchain_outbox_model import get_outbox_metrics
+from models.products_model import fetch_product
+from routes.auth_context import current_org_id
+from routes.onchain_events import get_event_hub, stream_events
+from routes.onchain_merkle import canonical_payload, leaf_hash, payload_hash, verify_proof
+from routes.helpers import parse_display_id
 import os, json
 
 onchain_bp = Blueprint("onchain", __name__)
 
 CHAIN_WEBHOOK_SECRET = os.getenv("CHAIN_WEBHOOK_SECRET", )  # set in .env 
+CALLBACK_STATUSES = ("submitted", "confirmed", "failed")
+BULK_MAX = 5000  # ids per status query / updates per bulk callback
+# statuses in which an unchanged payload is already queued or on chain
+SETTLED_OR_QUEUED = ("pending", "submitted", "confirmed")
 
 # ---- Helper Functions ---- #
 def fetch_emission(conn, emission_id: int): # Fetch emission details from DB
     cur = conn.cursor(dictionary=True)
     try:
         cur.execute("""
-        SELECT e.id, e.product_id, e.stage_id, e.factor_id, e.tag_id, e.quantity, e.created_by, e.sort_order, e.created_at, p.organization_id, p.type_id, p.name AS product_name
+        SELECT e.id, e.product_id, e.stage_id, e.factor_id, e.tag_id, e.quantity, e.created_by, e.created_at, p.organization_id, p.type_id, p.name AS product_name
         FROM emissions e
         JOIN products p ON p.id = e.product_id
         WHERE e.id = %s
@@ -21,21 +35,6 @@ def fetch_emission(conn, emission_id: int): # Fetch emission details from DB
     finally:
         cur.close()
 
-def build_payload(em: dict) -> dict:        # Build payload for on-chain submission
-    return {
-        "emission_id": em["id"],
-        "product_id": em["product_id"],
-        "organization_id": em["organization_id"],
-        "stage_id": em["stage_id"],
-        "factor_id": em["factor_id"],
-        "tag_id": em["tag_id"],
-        "quantity": em["quantity"],
-        "created_by": em["created_by"],
-        "sort_order": em["sort_order"],
-        "product_name": em["product_name"],
-        "timestamp": em["created_at"].isoformat() if em["created_at"] else None,
-    }
-
 
 # ---- API Endpoints ---- #
 # POST: Create or update on-chain job for an emission
@@ -48,18 +47,47 @@ def create_onchain_job(emission_id: int):
             return jsonify(error="emission not found"), 404
 
         payload = build_payload(em)
-        cur = conn.cursor()
+        digest = payload_hash(payload)
+        cur = conn.cursor(dictionary=True)
         cur.execute("""
-            INSERT INTO emissions_onchain (emission_id, status, payload_json)
-            VALUES (%s,'pending',%s)
+            SELECT status, payload_hash FROM emissions_onchain
+            WHERE emission_id=%s FOR UPDATE
+        """, (emission_id,))
+        existing = cur.fetchone()
+
+        # Unchanged payload already queued or on chain: nothing to do
+        if existing and existing["payload_hash"] == digest and existing["status"] in SETTLED_OR_QUEUED:
+            conn.commit()
+            cur.close()
+            return jsonify(ok=True, emission_id=emission_id, status=existing["status"], unchanged=True, payload=payload), 200
+
+        # A new payload drops the previous transaction and proof, so the row no
+        # longer points at a tx that anchored something else. Re-queueing the
+        # anchored payload keeps them: the dispatcher settles it without a send.
+        # (anchored_hash is assigned last; the IFs compare against its old value)
+        cur.execute("""
+            INSERT INTO emissions_onchain (emission_id, status, payload_json, payload_hash)
+            VALUES (%s,'pending',%s,%s)
             ON DUPLICATE KEY UPDATE
               status='pending',
               payload_json=VALUES(payload_json),
-              error_msg=NULL
-        """, (emission_id, json.dumps(payload, ensure_ascii=False)))
+              payload_hash=VALUES(payload_hash),
+              error_msg=NULL,
+              attempts=0,
+              next_attempt_at=NULL,
+              claimed_by=NULL,
+              claimed_at=NULL,
+              tx_hash=IF(VALUES(payload_hash) <=> anchored_hash, tx_hash, NULL),
+              batch_id=IF(VALUES(payload_hash) <=> anchored_hash, batch_id, NULL),
+              leaf_index=IF(VALUES(payload_hash) <=> anchored_hash, leaf_index, NULL),
+              leaf_hash=IF(VALUES(payload_hash) <=> anchored_hash, leaf_hash, NULL),
+              merkle_proof=IF(VALUES(payload_hash) <=> anchored_hash, merkle_proof, NULL),
+              anchored_hash=IF(VALUES(payload_hash) <=> anchored_hash, anchored_hash, NULL)
+        """, (emission_id, canonical_payload(payload).decode("utf-8"), digest))
+        record_status_events(cur, "eo.emission_id = %s", (emission_id,))
         conn.commit()
         cur.close()
-    return jsonify(ok=True, emission_id=emission_id, status="pending", payload=payload), 201
+    return jsonify(ok=True, emission_id=emission_id, status="pending", unchanged=False, payload=payload), 201
 
 # GET: Fetch on-chain status for an emission
 @onchain_bp.get("/onchain/emissions/<int:emission_id>")
@@ -81,6 +109,110 @@ def get_onchain_status(emission_id: int):
         pass
     return jsonify(row)
 
+# GET: On-chain statuses for many emissions (?ids=1,2,3) or a whole product (?product_id=PRD1)
+@onchain_bp.get("/onchain/emissions")
+def get_onchain_statuses():
+    ids_arg = request.args.get("ids")
+    product_arg = request.args.get("product_id")
+    if bool(ids_arg) == bool(product_arg):
+        return jsonify(error="pass either ids or product_id"), 400
+
+    if product_arg:
+        try:
+            product_id = parse_display_id(product_arg, "PRD") if not product_arg.isdigit() else int(product_arg)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        rows = get_product_statuses(product_id)
+        return jsonify(product_id=product_id, emissions=rows)
+
+    try:
+        ids = list(dict.fromkeys(int(i) for i in ids_arg.split(",") if i.strip()))
+    except ValueError:
+        return jsonify(error="ids must be comma-separated integers"), 400
+    if len(ids) > BULK_MAX:
+        return jsonify(error=f"at most {BULK_MAX} ids per request"), 400
+    rows = get_statuses(ids)
+    found = {r["emission_id"] for r in rows}
+    return jsonify(emissions=rows, missing=[i for i in ids if i not in found])
+
+# GET: Server-sent events of status transitions for a product (?product_id=PRD1) or organization (?organization_id=ORG1)
+# EventSource cannot send headers, so browsers pass the access token as ?jwt=
+@onchain_bp.get("/onchain/stream")
+@jwt_required(locations=["headers", "query_string"])
+def stream_onchain_status():
+    product_arg = request.args.get("product_id")
+    org_arg = request.args.get("organization_id")
+    if bool(product_arg) == bool(org_arg):
+        return jsonify(error="pass either product_id or organization_id"), 400
+
+    try:
+        if product_arg:
+            product_id = int(product_arg) if product_arg.isdigit() else parse_display_id(product_arg, "PRD")
+            scope = {"product_id": product_id}
+        else:
+            org_id = int(org_arg) if org_arg.isdigit() else parse_display_id(org_arg, "ORG")
+            scope = {"organization_id": org_id}
+        # EventSource resends the last id it saw when it reconnects
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    # ERROR 403: Only the caller's own organization (or its products)
+    org_id = current_org_id()
+    if "product_id" in scope:
+        product = fetch_product(scope["product_id"])
+        if not product or product["organization_id"] != org_id:
+            return jsonify(error="product not found"), 404
+    elif scope["organization_id"] != org_id:
+        return jsonify(error="forbidden"), 403
+
+    cfg = current_app.config
+    events = stream_events(
+        get_event_hub(cfg),
+        last_event_id=last_event_id,
+        heartbeat_seconds=cfg["CHAIN_EVENTS_HEARTBEAT_SECONDS"],
+        **scope,
+    )
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# GET: Merkle inclusion proof for an emission anchored in a batch
+@onchain_bp.get("/onchain/emissions/<int:emission_id>/proof")
+def get_onchain_proof(emission_id: int):
+    row = get_emission_proof(emission_id)
+    if not row:
+        return jsonify(error="emission not anchored in a batch"), 404
+
+    # recompute from the stored payload so the answer does not trust leaf_hash
+    leaf = leaf_hash(row["payload_json"])
+    proof = row["merkle_proof"] or []
+    return jsonify(
+        emission_id=row["emission_id"],
+        status=row["status"],
+        leaf_index=row["leaf_index"],
+        leaf_hash=leaf,
+        proof=proof,
+        merkle_root=row["merkle_root"],
+        verified=leaf == row["leaf_hash"] and verify_proof(row["payload_json"], proof, row["merkle_root"]),
+        batch={
+            "id": row["batch_id"],
+            "leaf_count": row["leaf_count"],
+            "status": row["batch_status"],
+            "tx_hash": row["tx_hash"],
+            "record_id": row["record_id"],
+        },
+    )
+
+# GET: Outbox queue depth and throughput (the dispatcher logs its own counters)
+@onchain_bp.get("/onchain/outbox/metrics")
+def onchain_outbox_metrics():
+    window = request.args.get("window", default=60, type=int)
+    return jsonify(get_outbox_metrics(max(1, min(window, 3600))))
+
 # PUT: Callback for chain-service to update status
 @onchain_bp.put("/onchain/callback")
 def onchain_callback():
@@ -93,15 +225,16 @@ def onchain_callback():
     # ERROR 400: Parse JSON body
     data = request.get_json(force=True)
     status = (data.get("status") or "").lower()
-    if status not in ("submitted", "confirmed", "failed"):
+    if status not in CALLBACK_STATUSES:
         return jsonify(error="invalid status"), 400
 
-    # ERROR 400: Either emission_id or tx_hash must be provided
+    # ERROR 400: One of emission_id, batch_id or tx_hash must be provided
     emission_id = data.get("emission_id")
+    batch_id = data.get("batch_id")
     tx_hash = data.get("tx_hash")
     error_msg = data.get("error_msg")
-    if not emission_id and not tx_hash:
-        return jsonify(error="emission_id or tx_hash required"), 400
+    if not emission_id and not batch_id and not tx_hash:
+        return jsonify(error="emission_id, batch_id or tx_hash required"), 400
 
     # Update DB record
     affected = 0 # number of rows affected
@@ -110,17 +243,37 @@ def onchain_callback():
         if emission_id:
             cur.execute("""
                 UPDATE emissions_onchain
-                SET status=%s, tx_hash=COALESCE(%s, tx_hash), error_msg=%s
+                SET anchored_hash=IF(%s IN ('submitted', 'confirmed'), COALESCE(sent_hash, anchored_hash), anchored_hash),
+                    status=%s, tx_hash=COALESCE(%s, tx_hash), error_msg=%s
                 WHERE emission_id=%s
-            """, (status, tx_hash, error_msg, emission_id))
+            """, (status, status, tx_hash, error_msg, emission_id))
+            affected = cur.rowcount
+            record_status_events(cur, "eo.emission_id = %s", (emission_id,))
+        elif batch_id:
+            # a Merkle batch: the root's transaction covers every member
+            cur.execute("""
+                UPDATE onchain_batches
+                SET status=%s, tx_hash=COALESCE(%s, tx_hash), record_id=COALESCE(%s, record_id), error_msg=%s
+                WHERE id=%s
+            """, (status, tx_hash, data.get("record_id"), error_msg, batch_id))
+            cur.execute("""
+                UPDATE emissions_onchain
+                SET anchored_hash=IF(%s IN ('submitted', 'confirmed'), COALESCE(sent_hash, anchored_hash), anchored_hash),
+                    status=%s, tx_hash=COALESCE(%s, tx_hash), error_msg=%s
+                WHERE batch_id=%s
+            """, (status, status, tx_hash, error_msg, batch_id))
+            affected = cur.rowcount
+            record_status_events(cur, "eo.batch_id = %s", (batch_id,))
         else:
             cur.execute("""
                 UPDATE emissions_onchain
-                SET status=%s, error_msg=%s 
+                SET anchored_hash=IF(%s IN ('submitted', 'confirmed'), COALESCE(sent_hash, anchored_hash), anchored_hash),
+                    status=%s, error_msg=%s
                 WHERE tx_hash=%s
-            """, (status, error_msg, tx_hash))
+            """, (status, status, error_msg, tx_hash))
+            affected = cur.rowcount
+            record_status_events(cur, "eo.tx_hash = %s", (tx_hash,))
         conn.commit()
-        affected = cur.rowcount
         cur.close()
 
     # ERROR 404: If no rows affected, record not found
@@ -128,3 +281,43 @@ def onchain_callback():
         return jsonify(error="onchain record not found"), 404
     
     return jsonify(ok=True)
+
+# PUT: Bulk callback, many emission status updates applied in one statement
+@onchain_bp.put("/onchain/callback/bulk")
+def onchain_callback_bulk():
+
+    # ERROR 401: Verify secret header
+    secret = request.headers.get("X-Chain-Secret")
+    if secret != CHAIN_WEBHOOK_SECRET:
+        return jsonify(error="unauthorized"), 401
+
+    # ERROR 400: Validate every update before touching the DB
+    data = request.get_json(silent=True) or {}
+    updates = data.get("updates")
+    if not isinstance(updates, list) or not updates:
+        return jsonify(error="updates must be a non-empty list"), 400
+    if len(updates) > BULK_MAX:
+        return jsonify(error=f"at most {BULK_MAX} updates per request"), 400
+
+    # the last update for an emission wins, as it would with separate calls
+    latest = {}
+    for i, u in enumerate(updates):
+        if not isinstance(u, dict):
+            return jsonify(error=f"updates[{i}] must be an object"), 400
+        status = (u.get("status") or "").lower()
+        if status not in CALLBACK_STATUSES:
+            return jsonify(error=f"updates[{i}]: invalid status"), 400
+        try:
+            emission_id = int(u.get("emission_id"))
+        except (TypeError, ValueError):
+            return jsonify(error=f"updates[{i}]: emission_id required"), 400
+        error_msg = u.get("error_msg")
+        latest[emission_id] = {
+            "emission_id": emission_id,
+            "status": status,
+            "tx_hash": u.get("tx_hash"),
+            "error_msg": str(error_msg)[:500] if error_msg else None,
+        }
+
+    updated = apply_status_updates(list(latest.values()))
+    return jsonify(ok=True, received=len(latest), updated=updated)
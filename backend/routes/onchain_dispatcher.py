@@ -0,0 +1,294 @@
+# backend/routes/onchain_dispatcher.py
+#
+# Outbox dispatcher: drains 'pending' emissions_onchain rows into
+# chain-service. Rows are claimed in batches (FOR UPDATE SKIP LOCKED, so
+# several dispatchers can run side by side), sent, and then marked submitted,
+# retried with exponential backoff, or dead-lettered once they run out of
+# attempts.
+#
+# A row whose payload_hash matches the hash last anchored on chain for it
+# (anchored_hash, set once chain-service reports the transaction mined) is
+# settled as confirmed without sending anything. A payload whose send failed
+# is sent again.
+#
+# Modes:
+#   merkle  each claimed batch becomes one Merkle tree; only its root is
+#           anchored (POST /anchor, one transaction) and every emission keeps
+#           its inclusion proof
+#   single  one POST /send (one transaction) per emission, sent concurrently
+#           over one pooled HTTP session
+#
+# Run as its own process (from backend/):
+#   python -m routes.onchain_dispatcher [--once]
+# Point CHAIN_SERVICE_URL at any server speaking chain-service's /send API to
+# test against a local stand-in.
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from models.onchain_batch_model import create_batch, mark_batch_sent, release_batch
+from models.onchain_outbox_model import (
+    claim_outbox_batch,
+    mark_outbox_dead,
+    mark_outbox_retry,
+    mark_outbox_sent,
+    mark_outbox_unchanged,
+)
+from routes.onchain_merkle import build_tree, leaf_hash
+
+DISPATCH_MODES = ("merkle", "single")
+
+
+class PermanentSendError(Exception):
+    """chain-service rejected the payload; retrying cannot help."""
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        mode: str = "merkle",
+        batch_size: int = 50,
+        concurrency: int = 8,
+        max_attempts: int = 8,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+        lease_seconds: int = 120,
+        timeout: float = 60.0,
+        session: requests.Session | None = None,
+        worker: str | None = None,
+    ):
+        if mode not in DISPATCH_MODES:
+            raise ValueError(f"unknown dispatch mode {mode!r}")
+        self.mode = mode
+        self.send_url = f"{base_url.rstrip('/')}/send"
+        self.anchor_url = f"{base_url.rstrip('/')}/anchor"
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.timeout = timeout
+        self.worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+
+        if session is None:
+            session = requests.Session()
+            # one keep-alive connection per sender thread
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="onchain-send")
+
+        self._lock = threading.Lock()
+        self._counts = {"claimed": 0, "sent": 0, "retried": 0, "dead": 0, "skipped": 0, "batches": 0}
+        self._sent_at: deque[float] = deque()  # completion times within the rate window
+        self._last_batch_seconds = 0.0
+        self.started_at = time.time()
+
+    # ---- sending ----
+    def backoff_seconds(self, attempts: int) -> int:
+        # exponential with "equal jitter", so retries from one burst spread out
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return max(1, round(delay / 2 + random.uniform(0, delay / 2)))
+
+    @staticmethod
+    def _payload(row: dict) -> dict:
+        payload = row["payload_json"]
+        if isinstance(payload, (str, bytes)):
+            payload = json.loads(payload)
+        return payload
+
+    def _post(self, url: str, body: dict) -> dict:
+        resp = self.session.post(url, json=body, timeout=self.timeout)
+        if 400 <= resp.status_code < 500 and resp.status_code not in (408, 429):
+            raise PermanentSendError(f"chain-service {resp.status_code}: {resp.text[:200]}")
+        resp.raise_for_status()
+        try:
+            return resp.json()
+        except ValueError:
+            return {}
+
+    def send(self, row: dict) -> str | None:
+        body = {"emission_id": row["emission_id"], "payload": self._payload(row)}
+        return self._post(self.send_url, body).get("txHash")
+
+    def anchor(self, batch_id: int, merkle_root: str, leaf_count: int) -> tuple[str | None, int | None]:
+        body = {"batch_id": batch_id, "merkle_root": merkle_root, "leaf_count": leaf_count}
+        result = self._post(self.anchor_url, body)
+        record_id = result.get("recordId")
+        return result.get("txHash"), int(record_id) if record_id is not None else None
+
+    def _dispatch_row(self, row: dict) -> str:
+        try:
+            tx_hash = self.send(row)
+        except PermanentSendError as e:
+            mark_outbox_dead(row["id"], self.worker, str(e))
+            return "dead"
+        except (requests.RequestException, ValueError) as e:
+            error = f"{type(e).__name__}: {e}"
+            if row["attempts"] >= self.max_attempts:
+                mark_outbox_dead(row["id"], self.worker, f"gave up after {row['attempts']} attempts: {error}")
+                return "dead"
+            mark_outbox_retry(row["id"], self.worker, error, self.backoff_seconds(row["attempts"]))
+            return "retried"
+
+        mark_outbox_sent(row["id"], self.worker, tx_hash)
+        return "sent"
+
+    def _anchor_rows(self, rows: list[dict]) -> list[str]:
+        outcomes, members, leaves = [], [], []
+        for row in rows:
+            try:
+                leaves.append(leaf_hash(self._payload(row)))
+            except (ValueError, TypeError) as e:
+                mark_outbox_dead(row["id"], self.worker, f"unreadable payload_json: {e}")
+                outcomes.append("dead")
+                continue
+            members.append(row)
+        if not members:
+            return outcomes
+
+        root, proofs = build_tree(leaves)
+        batch_id = create_batch(self.worker, root, [
+            {"id": row["id"], "leaf_index": i, "leaf_hash": leaves[i], "proof": proofs[i]}
+            for i, row in enumerate(members)
+        ])
+        with self._lock:
+            self._counts["batches"] += 1
+
+        # members failed together, so one delay based on the furthest along will do
+        attempts = max(row["attempts"] for row in members)
+        try:
+            tx_hash, record_id = self.anchor(batch_id, root, len(members))
+        except PermanentSendError as e:
+            release_batch(batch_id, self.worker, str(e), max_attempts=self.max_attempts, delay_seconds=0, dead=True)
+            return outcomes + ["dead"] * len(members)
+        except (requests.RequestException, ValueError) as e:
+            release_batch(
+                batch_id, self.worker, f"{type(e).__name__}: {e}",
+                max_attempts=self.max_attempts, delay_seconds=self.backoff_seconds(attempts),
+            )
+            return outcomes + [
+                "dead" if row["attempts"] >= self.max_attempts else "retried" for row in members
+            ]
+
+        mark_batch_sent(batch_id, self.worker, tx_hash, record_id)
+        return outcomes + ["sent"] * len(members)
+
+    def run_once(self) -> int:
+        """Claim one batch and send it; returns the number of rows claimed."""
+        rows = claim_outbox_batch(self.worker, self.batch_size, self.lease_seconds)
+        if not rows:
+            return 0
+
+        t0 = time.monotonic()
+        outcomes, changed = [], []
+        for row in rows:
+            if row["payload_hash"] and row["payload_hash"] == row["anchored_hash"]:
+                mark_outbox_unchanged(row["id"], self.worker)
+                outcomes.append("skipped")
+            else:
+                changed.append(row)
+        if changed and self.mode == "merkle":
+            outcomes += self._anchor_rows(changed)
+        elif changed:
+            outcomes += self._pool.map(self._dispatch_row, changed)
+        elapsed = time.monotonic() - t0
+
+        now = time.time()
+        with self._lock:
+            self._counts["claimed"] += len(rows)
+            for outcome in outcomes:
+                self._counts[outcome] += 1
+                if outcome == "sent":
+                    self._sent_at.append(now)
+            self._last_batch_seconds = elapsed
+        return len(rows)
+
+    def run_forever(self, poll_seconds: float, stop: threading.Event, report_every: float = 60.0):
+        next_report = time.monotonic() + report_every
+        while not stop.is_set():
+            try:
+                claimed = self.run_once()
+            except Exception as e:  # DB hiccup: keep the worker alive
+                print(f"onchain dispatcher: batch failed: {type(e).__name__}: {e}")
+                claimed = 0
+            if time.monotonic() >= next_report:
+                print(f"onchain dispatcher: {json.dumps(self.stats())}")
+                next_report = time.monotonic() + report_every
+            # a full batch means more work is probably waiting
+            if claimed < self.batch_size:
+                stop.wait(poll_seconds)
+
+    # ---- metrics ----
+    def stats(self, window_seconds: int = 60) -> dict:
+        cutoff = time.time() - window_seconds
+        with self._lock:
+            while self._sent_at and self._sent_at[0] < cutoff:
+                self._sent_at.popleft()
+            return {
+                "worker": self.worker,
+                "mode": self.mode,
+                **self._counts,
+                "sent_per_second": round(len(self._sent_at) / window_seconds, 3),
+                "last_batch_seconds": round(self._last_batch_seconds, 3),
+                "uptime_seconds": round(time.time() - self.started_at),
+            }
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.session.close()
+
+
+def dispatcher_from_config(config=Config) -> OutboxDispatcher:
+    if not config.CHAIN_SERVICE_URL:
+        raise SystemExit("CHAIN_SERVICE_URL is not set")
+    merkle = config.CHAIN_DISPATCH_MODE == "merkle"
+    return OutboxDispatcher(
+        config.CHAIN_SERVICE_URL,
+        mode=config.CHAIN_DISPATCH_MODE,
+        batch_size=config.CHAIN_ANCHOR_BATCH_SIZE if merkle else config.CHAIN_DISPATCH_BATCH_SIZE,
+        concurrency=config.CHAIN_DISPATCH_CONCURRENCY,
+        max_attempts=config.CHAIN_DISPATCH_MAX_ATTEMPTS,
+        backoff_base=config.CHAIN_DISPATCH_BACKOFF_BASE,
+        backoff_max=config.CHAIN_DISPATCH_BACKOFF_MAX,
+        lease_seconds=config.CHAIN_DISPATCH_LEASE_SECONDS,
+        timeout=config.CHAIN_DISPATCH_TIMEOUT,
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Send pending on-chain submissions to chain-service")
+    ap.add_argument("--once", action="store_true", help="drain one batch and exit")
+    args = ap.parse_args()
+
+    dispatcher = dispatcher_from_config()
+    try:
+        if args.once:
+            dispatcher.run_once()
+        else:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+            signal.signal(signal.SIGINT, lambda *_: stop.set())
+            dispatcher.run_forever(Config.CHAIN_DISPATCH_POLL_SECONDS, stop)
+    finally:
+        dispatcher.close()
+        print(f"onchain dispatcher: {json.dumps(dispatcher.stats())}")
+
+
+if __name__ == "__main__":
+    main()
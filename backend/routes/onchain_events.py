@@ -0,0 +1,180 @@
+# backend/routes/onchain_events.py
+#
+# Server-sent events for on-chain status changes. Status changes are logged to
+# onchain_events in the same transaction that applies them (callbacks, bulk
+# callbacks, the dispatcher), so the log sees every worker and process. Each
+# backend process runs one tailer thread, only while it has subscribers, that
+# reads new events by id and fans them out to its open streams. Load on the
+# database is one indexed query per process per poll, however many clients
+# are connected.
+#
+# Event ids are allocated before their transaction commits, so the tailer
+# (an IdTail) re-asks for ids it skipped until they commit, and an event can
+# reach clients after one with a higher id. The SSE id of each message is
+# therefore a resume cursor, not the event id: every event up to it has been
+# sent on this stream. A stream resumes from Last-Event-ID by replaying the
+# log after that cursor; events sent after it out of order may be repeated,
+# and clients de-duplicate them by the event_id in the data. A client that
+# falls too far behind is disconnected and catches up the same way when its
+# EventSource reconnects.
+import json
+import queue
+import threading
+import time
+
+from models.onchain_events_model import list_events_after, list_latest_event_ids, purge_events
+from routes.id_tail import MAX_GAPS, IdTail
+
+EVENT_PAGE = 1000  # events per tail or replay query
+PURGE_EVERY_SECONDS = 600
+
+
+class Subscription:
+    def __init__(self, product_id: int | None, organization_id: int | None, max_queue: int):
+        self.product_id = product_id
+        self.organization_id = organization_id
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def matches(self, event: dict) -> bool:
+        if self.product_id is not None and event["product_id"] != self.product_id:
+            return False
+        if self.organization_id is not None and event["organization_id"] != self.organization_id:
+            return False
+        return True
+
+    def offer(self, event: dict, cursor: int):
+        try:
+            self.queue.put_nowait((event, cursor))
+        except queue.Full:
+            self.overflowed = True
+
+
+class OnchainEventHub:
+    def __init__(self, poll_seconds: float = 0.5, retention_hours: int = 24, max_queue: int = 1000):
+        self.poll_seconds = poll_seconds
+        self.retention_hours = retention_hours
+        self.max_queue = max_queue
+        self._subs: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pos = IdTail()
+        self._next_purge = 0.0
+
+    def subscribe(self, *, product_id: int | None = None, organization_id: int | None = None) -> Subscription:
+        sub = Subscription(product_id, organization_id, self.max_queue)
+        with self._lock:
+            self._subs.add(sub)
+            if self._thread is None:
+                # nobody was listening, so nothing committed before now is
+                # owed to anyone; ids missing among the newest are still open
+                pos = IdTail()
+                pos.accept([{"id": i} for i in list_latest_event_ids(MAX_GAPS)])
+                self._pos = pos
+                self._thread = threading.Thread(target=self._tail, name="onchain-events", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    def _tail(self):
+        while True:
+            with self._lock:
+                if not self._subs:
+                    self._thread = None
+                    return
+                subs = list(self._subs)
+
+            try:
+                events = list_events_after(self._pos.last_id, EVENT_PAGE, also_ids=self._pos.gaps())
+                if time.monotonic() >= self._next_purge:
+                    self._next_purge = time.monotonic() + PURGE_EVERY_SECONDS
+                    purge_events(self.retention_hours)
+            except Exception as e:  # DB hiccup: keep the tailer alive
+                print(f"onchain events: tail failed: {type(e).__name__}: {e}")
+                events = []
+
+            fresh = self._pos.accept(events)
+            low = self._pos.resume_after()
+            for i, event in enumerate(fresh):
+                # every event up to the cursor has been offered once this one is:
+                # below the oldest open gap and below the rest of this page
+                cursor = min(low, fresh[i + 1]["id"] - 1) if i + 1 < len(fresh) else low
+                for sub in subs:
+                    if sub.matches(event):
+                        sub.offer(event, cursor)
+            # a full page means more is probably waiting
+            if len(events) < EVENT_PAGE:
+                time.sleep(self.poll_seconds)
+
+
+def format_event(event: dict, cursor: int) -> str:
+    data = {
+        "event_id": event["id"],
+        "emission_id": event["emission_id"],
+        "product_id": event["product_id"],
+        "organization_id": event["organization_id"],
+        "status": event["status"],
+        "tx_hash": event["tx_hash"],
+        "at": event["created_at"].isoformat() if event["created_at"] else None,
+    }
+    return f"id: {cursor}\nevent: status\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_events(hub: OnchainEventHub, *, product_id: int | None = None, organization_id: int | None = None,
+                  last_event_id: int | None = None, heartbeat_seconds: float = 15):
+    """Generator of SSE text for one client."""
+    # subscribe before replaying, so nothing slips between the two
+    sub = hub.subscribe(product_id=product_id, organization_id=organization_id)
+    try:
+        yield "retry: 3000\n\n"
+        cursor = last_event_id or 0
+        replayed = set()
+        if last_event_id is not None:
+            # events committing during the replay arrive through the
+            # subscription, so the cursor stays put until the replay is done
+            after = last_event_id
+            while True:
+                missed = list_events_after(after, EVENT_PAGE, product_id=product_id, organization_id=organization_id)
+                for event in missed:
+                    yield format_event(event, cursor)
+                    replayed.add(event["id"])
+                    after = event["id"]
+                if len(missed) < EVENT_PAGE:
+                    break
+
+        # after an overflow, deliver what was queued so the client's cursor is as far along as possible
+        while not (sub.overflowed and sub.queue.empty()):
+            try:
+                event, event_cursor = sub.queue.get(timeout=heartbeat_seconds)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if event["id"] in replayed:
+                continue
+            cursor = max(cursor, event_cursor)
+            yield format_event(event, cursor)
+        # fell behind: end the stream, the client reconnects with Last-Event-ID
+    finally:
+        hub.unsubscribe(sub)
+
+
+_hub: OnchainEventHub | None = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub(config) -> OnchainEventHub:
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = OnchainEventHub(
+                poll_seconds=config["CHAIN_EVENTS_POLL_SECONDS"],
+                retention_hours=config["CHAIN_EVENTS_RETENTION_HOURS"],
+            )
+        return _hub
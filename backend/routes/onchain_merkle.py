@@ -0,0 +1,108 @@
+# backend/routes/onchain_merkle.py
+#
+# Merkle batching for on-chain anchoring. Each emission's build_payload output
+# is canonicalized and hashed into a leaf; only the root of a batch is written
+# on chain, and each emission keeps its inclusion proof so it can be verified
+# on its own against that root.
+#
+#   leaf = sha256(0x00 || canonical_payload)
+#   node = sha256(0x01 || left || right)
+#
+# The prefixes keep a leaf from ever being passed off as an inner node. An
+# unpaired node at the end of a level is carried up unchanged rather than
+# duplicated, so a batch cannot have two different leaf lists with one root.
+#
+# A proof is a list of [side, sibling_hash] from the leaf up, where side says
+# whether the sibling sits to the "L"eft or "R"ight of the running hash.
+import datetime
+import hashlib
+import json
+from decimal import Decimal
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def _json_default(value):
+    # a DECIMAL hashes like the JSON number payload_json stores it as, so a
+    # leaf can be recomputed from either build_payload output or the stored row
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def canonical_payload(payload: dict) -> bytes:
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_json_default,
+    ).encode("utf-8")
+
+
+def payload_hash(payload: dict) -> str:
+    """Content hash stored as emissions_onchain.payload_hash to spot unchanged payloads."""
+    return hashlib.sha256(canonical_payload(payload)).hexdigest()
+
+
+def leaf_hash(payload: dict) -> str:
+    return hashlib.sha256(LEAF_PREFIX + canonical_payload(payload)).hexdigest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_tree(leaves: list[str]) -> tuple[str, list[list[list[str]]]]:
+    """
+    Return (root, proofs) for hex leaf hashes; proofs[i] is the inclusion
+    proof of leaves[i]. O(n) hashing, O(n log n) proof entries.
+    """
+    if not leaves:
+        raise ValueError("cannot build a Merkle tree without leaves")
+
+    level = [bytes.fromhex(h) for h in leaves]
+    proofs: list[list[list[str]]] = [[] for _ in leaves]
+    # members[j] lists the original leaves below node j of the current level
+    members = [[i] for i in range(len(leaves))]
+
+    while len(level) > 1:
+        next_level, next_members = [], []
+        for j in range(0, len(level) - 1, 2):
+            left, right = level[j], level[j + 1]
+            for i in members[j]:
+                proofs[i].append(["R", right.hex()])
+            for i in members[j + 1]:
+                proofs[i].append(["L", left.hex()])
+            next_level.append(_node(left, right))
+            next_members.append(members[j] + members[j + 1])
+        if len(level) % 2:
+            next_level.append(level[-1])
+            next_members.append(members[-1])
+        level, members = next_level, next_members
+
+    return level[0].hex(), proofs
+
+
+def root_from_proof(leaf: str, proof: list[list[str]]) -> str:
+    running = bytes.fromhex(leaf)
+    for side, sibling in proof:
+        other = bytes.fromhex(sibling)
+        if side == "L":
+            running = _node(other, running)
+        elif side == "R":
+            running = _node(running, other)
+        else:
+            raise ValueError(f"bad proof side {side!r}")
+    return running.hex()
+
+
+def verify_proof(payload: dict, proof: list[list[str]], root: str) -> bool:
+    """True when `payload` is included in the batch anchored as `root`."""
+    try:
+        return root_from_proof(leaf_hash(payload), proof) == root.lower()
+    except (ValueError, TypeError):
+        return False
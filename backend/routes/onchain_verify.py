@@ -0,0 +1,218 @@
+# backend/routes/onchain_verify.py
+#
+# Integrity check of what is anchored against the current emissions data.
+# Walks emissions_onchain in keyset chunks, rebuilds every payload with
+# chain_model.build_payload from today's rows and compares its hash with
+#   payload_hash   the payload queued for the chain
+#   sent_hash      the payload last sent to the chain (anchored_hash once
+#                  the transaction is mined)
+#   merkle proof   for batched rows, the current payload must still lead to
+#                  the batch root
+# and, with --chain, the batch root stored in RecordStorage (fetched from
+# chain-service's /record/:id with bounded concurrency, once per batch).
+#
+# Problems go to a JSON Lines report, one line per affected emission. Progress
+# is checkpointed after every chunk, so an interrupted run picks up where it
+# stopped with --resume.
+#
+# Usage (from backend/):
+#   python -m routes.onchain_verify [--chain] [--chunk 1000] [--resume]
+import argparse
+import datetime
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from models.chain_model import build_payload, fetch_onchain_chunk
+from routes.onchain_merkle import leaf_hash, payload_hash, verify_proof
+
+ANCHORED = ("submitted", "confirmed")
+DEFAULT_DIR = Path(__file__).resolve().parent.parent / "report" / "onchain_verify"
+
+
+def fetch_chain_roots(base_url: str, record_ids: set[int], concurrency: int, timeout: float = 30) -> dict:
+    """{record_id: merkle_root or None} read from chain-service's /record/:id."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_maxsize=concurrency))
+
+    def fetch(record_id: int):
+        try:
+            resp = session.get(f"{base_url.rstrip('/')}/record/{record_id}", timeout=timeout)
+            resp.raise_for_status()
+            content = json.loads(resp.json()["record"]["content"])
+            return record_id, content.get("merkle_root")
+        except (requests.RequestException, ValueError, KeyError, AttributeError):
+            return record_id, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return dict(pool.map(fetch, record_ids))
+    finally:
+        session.close()
+
+
+def check_row(row: dict, chain_roots: dict | None = None) -> tuple[str, list[str]]:
+    """(current payload hash, problems) for one emissions_onchain row joined with its emission."""
+    payload = build_payload(row)
+    current = payload_hash(payload)
+    problems = []
+
+    if row["payload_hash"] and row["payload_hash"] != current:
+        problems.append("payload_changed")  # emission edited after it was queued
+    if row["status"] in ANCHORED:
+        on_chain = row["sent_hash"] or row["anchored_hash"]
+        if on_chain and on_chain != current:
+            problems.append("chain_stale")  # what is on chain no longer matches
+        elif not on_chain and not row["batch_id"]:
+            problems.append("unverifiable")  # anchored before hashes were kept
+
+    if row["batch_id"]:
+        if row["leaf_hash"] != leaf_hash(payload) or not verify_proof(payload, row["merkle_proof"] or [], row["merkle_root"]):
+            problems.append("proof_mismatch")
+        if chain_roots is not None and row["record_id"] is not None:
+            on_chain = chain_roots.get(row["record_id"])
+            if on_chain is None:
+                problems.append("record_unreadable")
+            elif on_chain != row["merkle_root"]:
+                problems.append("root_mismatch")
+    return current, problems
+
+
+def _load_checkpoint(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: Path, state: dict):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def run_verification(
+    out_dir: Path,
+    *,
+    chunk_size: int = 1000,
+    chain_url: str | None = None,
+    concurrency: int = 8,
+    resume: bool = False,
+    limit: int = 0,
+    log=print,
+) -> dict:
+    """Verify every row (or `limit` rows) and return the final checkpoint state."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = out_dir / "checkpoint.json"
+    report = out_dir / "mismatches.jsonl"
+
+    state = _load_checkpoint(checkpoint) if resume else None
+    if state is None:
+        state = {
+            "last_id": 0,
+            "rows": 0,
+            "mismatches": 0,
+            "problems": {},
+            "seconds": 0.0,
+            "report_bytes": 0,
+            "done": False,
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        report.write_text("", encoding="utf-8")
+    elif report.exists():
+        # drop lines of a chunk that was written but never checkpointed
+        with open(report, "r+b") as f:
+            f.truncate(state["report_bytes"])
+
+    chain_roots: dict = {}
+    run_started = time.monotonic()
+    run_rows = 0
+    with open(report, "a", encoding="utf-8") as out:
+        while not state["done"]:
+            t0 = time.monotonic()
+            rows = fetch_onchain_chunk(state["last_id"], chunk_size)
+            if not rows:
+                state["done"] = True
+                _save_checkpoint(checkpoint, state)
+                break
+
+            if chain_url:
+                wanted = {r["record_id"] for r in rows if r["record_id"] is not None} - chain_roots.keys()
+                if wanted:
+                    chain_roots.update(fetch_chain_roots(chain_url, wanted, concurrency))
+
+            for row in rows:
+                current, problems = check_row(row, chain_roots if chain_url else None)
+                if not problems:
+                    continue
+                state["mismatches"] += 1
+                for p in problems:
+                    state["problems"][p] = state["problems"].get(p, 0) + 1
+                out.write(json.dumps({
+                    "emission_id": row["id"],
+                    "onchain_id": row["onchain_id"],
+                    "status": row["status"],
+                    "problems": problems,
+                    "current_hash": current,
+                    "payload_hash": row["payload_hash"],
+                    "sent_hash": row["sent_hash"],
+                    "anchored_hash": row["anchored_hash"],
+                    "batch_id": row["batch_id"],
+                }) + "\n")
+            out.flush()
+
+            # the report lines are on disk before the checkpoint moves past them
+            state["report_bytes"] = out.tell()
+            state["last_id"] = rows[-1]["onchain_id"]
+            state["rows"] += len(rows)
+            state["seconds"] = round(state["seconds"] + time.monotonic() - t0, 3)
+            _save_checkpoint(checkpoint, state)
+
+            run_rows += len(rows)
+            elapsed = time.monotonic() - run_started
+            log(
+                f"onchain verify: {state['rows']} rows, {state['mismatches']} mismatches, "
+                f"{run_rows / elapsed if elapsed else 0:.0f} rows/s"
+            )
+            if limit and run_rows >= limit:
+                break
+
+    state["rows_per_second"] = round(state["rows"] / state["seconds"], 1) if state["seconds"] else None
+    return state
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Verify anchored on-chain payloads against current emissions")
+    ap.add_argument("--out-dir", type=Path, default=DEFAULT_DIR, help="checkpoint and mismatches.jsonl go here")
+    ap.add_argument("--chunk", type=int, default=1000, help="rows per keyset chunk")
+    ap.add_argument("--chain", action="store_true", help="also compare batch roots with chain-service")
+    ap.add_argument("--concurrency", type=int, default=8, help="parallel chain-service lookups")
+    ap.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    ap.add_argument("--limit", type=int, default=0, help="stop after about this many rows (0 = all)")
+    args = ap.parse_args()
+
+    chain_url = None
+    if args.chain:
+        if not Config.CHAIN_SERVICE_URL:
+            raise SystemExit("CHAIN_SERVICE_URL is not set")
+        chain_url = Config.CHAIN_SERVICE_URL
+
+    state = run_verification(
+        args.out_dir,
+        chunk_size=args.chunk,
+        chain_url=chain_url,
+        concurrency=args.concurrency,
+        resume=args.resume,
+        limit=args.limit,
+    )
+    print(json.dumps(state, indent=2))
+    print(f"report: {args.out_dir / 'mismatches.jsonl'}")
+
+
+if __name__ == "__main__":
+    main()
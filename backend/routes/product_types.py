@@ -1,6 +1,6 @@
 # backend/routes/product_types.py
 from flask import Blueprint, request
-from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_jwt_extended import jwt_required
 from models.product_types_model import (
     create_product_type,
     get_product_type_by_id,
@@ -8,8 +8,8 @@ from models.product_types_model import (
     list_product_types,
     modify_product_type,
 )
-from models.user_model import get_user_organization
 from mysql.connector.errors import IntegrityError
+from routes.auth_context import current_org_id
 from routes.products import product_types_products_bp 
 from routes.helpers import(
     display_id, 
@@ -25,9 +25,8 @@ product_types_bp.register_blueprint(product_types_products_bp, url_prefix="/<str
 @product_types_bp.post("")
 @jwt_required()
 def add_type():
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    if not org:
+    org_id = current_org_id()
+    if org_id is None:
         return json_response({"status": "400: user has no organization"}, 400)
     data = request.get_json(force=True)
     name = data.get("name")
@@ -35,12 +34,12 @@ def add_type():
     if err:
         return json_response({"status": f"400: {err}"}, 400)
     try:
-        new_id = create_product_type(organization_id=org["id"], name=name)
-        pt = get_product_type_by_id(org["id"], new_id)
+        new_id = create_product_type(organization_id=org_id, name=name)
+        pt = get_product_type_by_id(org_id, new_id)
         return json_response({
                 "product_type_id": display_id("product_types", new_id),
                 "product_type_name": pt["name"],
-                "organization_id": display_id("organizations", org["id"]),
+                "organization_id": display_id("organizations", org_id),
                 "organization_name": pt["organization_name"],  
                 "created_at": pt["created_at"].isoformat() if pt["created_at"] is not None else None,
                 "updated_at": pt["updated_at"].isoformat() if pt["updated_at"] is not None else None,
@@ -56,11 +55,9 @@ def add_type():
 @jwt_required()
 def list_all():
 
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    if not org:
+    org_id = current_org_id()
+    if org_id is None:
         return json_response({"status": "400: user has no organization"}, 400)
-    org_id = org["id"]
     try:
         rows = list_product_types(org_id) 
         prts = []
@@ -78,11 +75,9 @@ def list_all():
 @jwt_required()
 def update_pt(product_type_id):
     product_type_id_int = parse_display_id(product_type_id, "PRT")
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    if not org:
+    org_id = current_org_id()
+    if org_id is None:
         return json_response({"status": "400: user has no organization"}, 400)
-    org_id = org["id"]
     data = request.get_json()
     new_name = (data.get("name") or "").strip()
     if not new_name:
@@ -99,11 +94,9 @@ def update_pt(product_type_id):
 @product_types_bp.delete("/<string:product_type_id>")
 @jwt_required()
 def delete_pt(product_type_id):
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    if not org:
+    org_id = current_org_id()
+    if org_id is None:
         return json_response({"status": "400: user has no organization"}, 400)
-    org_id = org["id"]
     try:
         product_type_id_int = parse_display_id(product_type_id, "PRT")
         pt = get_product_type_by_id(org_id, product_type_id_int)
@@ -127,11 +120,9 @@ def delete_pt(product_type_id):
 @product_types_bp.get("/<string:product_type_id>")
 @jwt_required()
 def get_pt(product_type_id):
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    if not org:
+    org_id = current_org_id()
+    if org_id is None:
         return json_response({"error 400": "user has no organization"}, 400)
-    org_id = org["id"]
     try:
         pt = get_product_type_by_id(org_id, parse_display_id(product_type_id, "PRT"))
         if pt:
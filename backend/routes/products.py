@@ -1,11 +1,7 @@
 # backend/routes/products.py
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import (
-    get_jwt_identity,
-    jwt_required,
-)
+from flask_jwt_extended import jwt_required
 from routes.emissions import product_emission_bp  
-from models.user_model import get_user_organization
 from models.products_model import(
                         list_products, 
                         fetch_product, 
@@ -13,12 +9,21 @@ from models.products_model import(
                         update_product, 
                         delete_product
                         )
+from models.lifecycle_model import get_product_lifecycle
 from models.steps_model import( 
                         get_steps_under_product_stage, 
                         create_steps,
                         )
 
-from routes.helpers import display_id, parse_display_id, json_response
+from routes.auth_context import current_org_id
+from routes.helpers import decode_cursor, display_id, encode_cursor, parse_display_id, json_response
+
+PRODUCT_PAGE_DEFAULT = 100
+PRODUCT_PAGE_MAX = 500
+# bump when the lifecycle tree's shape changes, so clients' ETags stop matching
+LIFECYCLE_TREE_VERSION = "1"
+# stages have no sort column; this is the order of the lifecycle page
+STAGE_ORDER = ("raw", "manufacture", "distribution", "use", "disposal")
 
 # Blueprint for product routes under a product type
 product_types_products_bp = Blueprint('products', __name__)
@@ -31,10 +36,21 @@ product_bp.register_blueprint(product_emission_bp, url_prefix="/<string:product_
 @product_types_products_bp.get("products")
 @jwt_required()
 def get_all(product_type_id):
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    org_id = org["id"]
-    rows = list_products(org_id, parse_display_id(product_type_id, "PRT"))  
+    org_id = current_org_id()
+    if org_id is None:
+        return json_response({"status": "400: user has no organization"}, 400)
+    try:
+        limit = max(1, min(int(request.args.get("limit", PRODUCT_PAGE_DEFAULT)), PRODUCT_PAGE_MAX))
+        cursor = request.args.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return json_response({"status": f"400: {e}"}, 400)
+    # one extra row tells whether another page follows
+    rows = list_products(org_id, parse_display_id(product_type_id, "PRT"), limit=limit + 1, after=after)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
     products = []
     for r in rows:
         products.append({
@@ -42,19 +58,20 @@ def get_all(product_type_id):
             "product_name": r["name"],
             "serial_number": r["serial_number"],
             "total_emission": r["total_emission"],
+            "emission_count": r["emission_count"],
             # "created_at": r["created_at"].isoformat(),
             # "ended_at": r["ended_at"].isoformat(),
             "code": r["code"],
         })
-    return json_response({"products": products}, 200)
+    return json_response({"products": products, "next_cursor": next_cursor}, 200)
 
 
 @product_types_products_bp.post("/products")
 @jwt_required()
 def create(product_type_id):
-    uid = int(get_jwt_identity())
-    org = get_user_organization(uid)
-    org_id = org["id"]
+    org_id = current_org_id()
+    if org_id is None:
+        return json_response({"status": "400: user has no organization"}, 400)
     data = request.get_json()
     name = data.get("name")
     serial_number = data.get("serial_number")
@@ -122,3 +139,102 @@ def create(product_id):
     sort_order = data.get("sort_order")
     create_steps(parse_display_id(product_id, "PRD"), stage_id , tag_id, name, sort_order)  
     return json_response({"message": "Step created under product"}, 201)
+
+
+# -------- By Product Id: the whole lifecycle in one response --------
+def build_lifecycle_tree(rows: dict) -> dict:
+    """Group product, stage, step and emission rows into one nested tree in a single pass."""
+    product = rows["product"]
+    rank = {stage_id: i for i, stage_id in enumerate(STAGE_ORDER)}
+    stages = {}
+    for st in sorted(rows["stages"], key=lambda st: (rank.get(st["id"], len(rank)), st["id"])):
+        stages[st["id"]] = {
+            "stage_id": st["id"],
+            "stage_title": st["title"],
+            "total_emission": 0.0,
+            "emission_count": 0,
+            "steps": [],
+            "unassigned_emissions": [],
+        }
+
+    steps = {}
+    for r in rows["steps"]:
+        stage = stages.get(r["stage_id"])
+        if stage is None:
+            continue
+        step = {
+            "step_id": display_id("steps", r["id"]),
+            "step_name": r["name"],
+            "tag_id": display_id("tags", r["tag_id"]) if r["tag_id"] is not None else None,
+            "tag_name": r["tag_name"],
+            "sort_order": r["sort_order"],
+            "total_emission": 0.0,
+            "emissions": [],
+        }
+        steps[r["id"]] = (r["stage_id"], step)
+        stage["steps"].append(step)
+
+    total, count = 0.0, 0
+    for r in rows["emissions"]:
+        stage = stages.get(r["stage_id"])
+        if stage is None:
+            continue
+        amount = r["emission_amount"] or 0
+        emission = {
+            "emission_id": display_id("emissions", r["id"]),
+            "emission_name": r["name"],
+            "tag_id": display_id("tags", r["tag_id"]) if r["tag_id"] is not None else None,
+            "factor_id": r["factor_id"],
+            "factor_name": r["factor_name"],
+            "factor_unit": r["factor_unit"],
+            "quantity": r["quantity"],
+            "emission_amount": r["emission_amount"],
+            "created_at": r["created_at"].isoformat() if r["created_at"] else None,
+        }
+        step_stage, step = steps.get(r["step_id"], (None, None))
+        if step is not None and step_stage == r["stage_id"]:
+            step["emissions"].append(emission)
+            step["total_emission"] += amount
+        else:
+            stage["unassigned_emissions"].append(emission)
+        stage["total_emission"] += amount
+        stage["emission_count"] += 1
+        total += amount
+        count += 1
+
+    return {
+        "product_id": display_id("products", product["id"]),
+        "product_name": product["name"],
+        "product_type_id": display_id("product_types", product["type_id"]) if product["type_id"] else None,
+        "serial_number": product["serial_number"],
+        "code": product["code"],
+        "total_emission": total,
+        "emission_count": count,
+        "stages": list(stages.values()),
+    }
+
+
+@product_bp.get("/<string:product_id>/lifecycle")
+@jwt_required()
+def lifecycle(product_id):
+    org_id = current_org_id()
+    if org_id is None:
+        return json_response({"status": "400: user has no organization"}, 400)
+    try:
+        product_id_int = parse_display_id(product_id, "PRD")
+    except ValueError as e:
+        return json_response({"status": f"400: {e}"}, 400)
+
+    # the fingerprint query alone answers a client whose copy is current
+    etag, rows = get_product_lifecycle(
+        product_id_int, org_id, known=request.if_none_match.as_set(), salt=LIFECYCLE_TREE_VERSION
+    )
+    if etag is None:
+        return json_response({"status": "404: product not found"}, 404)
+    if rows is None:
+        return "", 304, {"ETag": f'"{etag}"'}
+
+    resp = json_response(build_lifecycle_tree(rows), 200)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
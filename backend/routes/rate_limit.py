@@ -0,0 +1,217 @@
+# backend/routes/rate_limit.py
+#
+# Token-bucket rate limiting for the sign-in endpoints, keyed by client IP and
+# by account. /auth/login and /auth/register hash passwords, so a credential
+# stuffing burst would otherwise pin every CPU; a limited request is answered
+# with a 429 before any hashing or database work.
+#
+# Bucket state lives in a small memory-mapped file (RATE_LIMIT_FILE), so every
+# worker process on the host shares it without Redis. The file is a fixed
+# table of SLOTS_PER_GROUP-slot groups; a key hashes to one group and the
+# group is locked with fcntl while its bucket is updated. When a group is full
+# the least recently used slot is reused, which at worst lets that key start
+# over with a full bucket.
+#
+# The client address comes from X-Forwarded-For only when the request arrives
+# from one of RATE_LIMIT_TRUSTED_PROXIES (addresses, networks or host names
+# such as the compose service "frontend"). Anyone reaching the backend port
+# directly is keyed by their own address, so a made-up header cannot dodge the
+# IP limit.
+import fcntl
+import hashlib
+import ipaddress
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request
+
+from routes.helpers import json_response
+
+SLOT = struct.Struct("<Qdd")  # key fingerprint, tokens, last update (unix seconds)
+SLOTS_PER_GROUP = 8
+GROUP_BYTES = SLOT.size * SLOTS_PER_GROUP
+PROXY_RESOLVE_SECONDS = 60  # host names in the trusted proxy list are re-resolved this often
+
+
+def _fingerprint(key: str) -> int:
+    fp = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return fp or 1  # 0 marks an empty slot
+
+
+class TokenBucketStore:
+    def __init__(self, path: str, groups: int = 8192):
+        self.path = path
+        self.groups = groups
+        size = groups * GROUP_BYTES
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size != size:
+                # new file, or another table size: start empty (truncate zero-fills)
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size != size:
+                        os.ftruncate(fd, 0)
+                        os.ftruncate(fd, size)
+                finally:
+                    fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, size)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+        # fcntl locks are per process, so threads of one worker also need this
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1.0, now: float | None = None) -> float:
+        """
+        Take `cost` tokens from the bucket of `key`, which refills at `rate`
+        tokens per second up to `burst`. Returns 0 when allowed, otherwise the
+        seconds until enough tokens are back (nothing is taken then).
+        """
+        fp = _fingerprint(key)
+        base = (fp % self.groups) * GROUP_BYTES
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, GROUP_BYTES, base, os.SEEK_SET)
+            try:
+                now = time.time() if now is None else now
+                slot, tokens = None, burst
+                oldest, oldest_at = base, float("inf")
+                for off in range(base, base + GROUP_BYTES, SLOT.size):
+                    slot_fp, slot_tokens, updated = SLOT.unpack_from(self._map, off)
+                    if slot_fp == fp:
+                        slot = off
+                        tokens = min(burst, slot_tokens + max(0.0, now - updated) * rate)
+                        break
+                    if slot_fp == 0:
+                        updated = -1.0  # empty slots go first
+                    if updated < oldest_at:
+                        oldest, oldest_at = off, updated
+                if slot is None:
+                    slot = oldest
+
+                if tokens >= cost:
+                    SLOT.pack_into(self._map, slot, fp, tokens - cost, now)
+                    return 0.0
+                SLOT.pack_into(self._map, slot, fp, tokens, now)
+                return (cost - tokens) / rate if rate > 0 else float("inf")
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, GROUP_BYTES, base, os.SEEK_SET)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+
+_store: TokenBucketStore | None = None
+_store_pid: int | None = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store(config) -> TokenBucketStore:
+    global _store, _store_pid
+    with _store_lock:
+        # a forked worker must not share the parent's lock state
+        if _store is None or _store_pid != os.getpid():
+            _store = TokenBucketStore(config["RATE_LIMIT_FILE"], config["RATE_LIMIT_GROUPS"])
+            _store_pid = os.getpid()
+        return _store
+
+
+# (trusted proxies setting, resolved at) -> networks
+_proxies: tuple[str, float, list] = ("", 0.0, [])
+_proxies_lock = threading.Lock()
+
+
+def _resolve_proxies(spec: str) -> list:
+    networks = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+            continue
+        except ValueError:
+            pass
+        try:
+            infos = socket.getaddrinfo(entry, None)
+        except OSError:
+            continue  # not running next to that proxy; trust nothing for it
+        for info in infos:
+            networks.append(ipaddress.ip_network(info[4][0]))
+    return networks
+
+
+def trusted_proxy(addr: str | None, spec: str) -> bool:
+    global _proxies
+    if not addr or not spec:
+        return False
+    with _proxies_lock:
+        cached_spec, resolved_at, networks = _proxies
+        if cached_spec != spec or time.monotonic() - resolved_at > PROXY_RESOLVE_SECONDS:
+            networks = _resolve_proxies(spec)
+            _proxies = (spec, time.monotonic(), networks)
+    try:
+        ip = ipaddress.ip_address(addr)
+    except ValueError:
+        return False
+    return any(ip in net for net in networks)
+
+
+def client_ip(proxy_hops: int, trusted_proxies: str = "") -> str:
+    """
+    The caller's address. Behind a trusted proxy it is the X-Forwarded-For
+    entry `proxy_hops` from the end (each proxy appends its peer).
+    """
+    remote = request.remote_addr
+    if proxy_hops > 0 and trusted_proxy(remote, trusted_proxies):
+        forwarded = [a.strip() for a in request.headers.get("X-Forwarded-For", "").split(",") if a.strip()]
+        if forwarded:
+            return forwarded[-min(proxy_hops, len(forwarded))]
+    return remote or "unknown"
+
+
+def _too_many(retry_after: float):
+    resp = json_response({"status": "429: too many attempts, retry later"}, 429)
+    resp.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+    return resp
+
+
+def auth_rate_limited(endpoint: str):
+    """Limit a sign-in view by client IP and by the JSON body's account."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            config = current_app.config
+            if not config["RATE_LIMIT_ENABLED"]:
+                return view(*args, **kwargs)
+            store = get_bucket_store(config)
+
+            ip = client_ip(config["RATE_LIMIT_PROXY_HOPS"], config["RATE_LIMIT_TRUSTED_PROXIES"])
+            wait = store.take(
+                f"{endpoint}:ip:{ip}",
+                config["RATE_LIMIT_IP_PER_MINUTE"] / 60,
+                config["RATE_LIMIT_IP_BURST"],
+            )
+            if wait:
+                return _too_many(wait)
+
+            data = request.get_json(force=True, silent=True) or {}
+            account = str(data.get("account") or "").strip().lower() if isinstance(data, dict) else ""
+            if account:
+                wait = store.take(
+                    f"{endpoint}:account:{account}",
+                    config["RATE_LIMIT_ACCOUNT_PER_MINUTE"] / 60,
+                    config["RATE_LIMIT_ACCOUNT_BURST"],
+                )
+                if wait:
+                    return _too_many(wait)
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,328 @@
+# backend/routes/record_store.py
+#
+# Versioned store for report record snapshots.
+#
+#   <records_dir>/<product_id>/index.jsonl          one line per version, append-only
+#   <records_dir>/<product_id>/objects/<sha256>.json snapshot content, stored once
+#
+# A snapshot identical to the product's latest version is not recorded again;
+# one identical to an older version gets a new index line pointing at the
+# existing object. Old versions are pruned by count and age, always keeping
+# the latest one, and objects no longer referenced by the index are removed.
+#
+# Usage (from backend/):
+#   python -m routes.record_store list <product_id>
+#   python -m routes.record_store diff <product_id> [from_version] [to_version]
+#   python -m routes.record_store prune <product_id> --keep 10 [--max-age-days 90]
+#   python -m routes.record_store import-legacy     # adopt old <product_id>.json files
+import argparse
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from decimal import Decimal
+from pathlib import Path
+
+INDEX_NAME = "index.jsonl"
+OBJECTS_DIR = "objects"
+
+# a record is identified by these fields when diffing two versions
+RECORD_KEY_FIELDS = ("material", "timestamp")
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def canonical_record(data: dict) -> tuple[str, bytes]:
+    """Return (sha256, canonical JSON bytes) for a report record."""
+    body = json.dumps(
+        data,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=_json_default,
+    ).encode("utf-8")
+    return hashlib.sha256(body).hexdigest(), body
+
+
+def _product_dir(records_dir, product_id: int) -> Path:
+    return Path(records_dir) / str(product_id)
+
+
+@contextmanager
+def _locked(product_dir: Path):
+    # serializes writers across threads and gunicorn workers on this host
+    product_dir.mkdir(parents=True, exist_ok=True)
+    with open(product_dir / "index.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read_index(product_dir: Path) -> list[dict]:
+    try:
+        with open(product_dir / INDEX_NAME, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue  # torn last line from a crash mid-append
+    return entries
+
+
+def _write_atomic(path: Path, content: bytes):
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _index_line(entry: dict) -> bytes:
+    return (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def save_record_version(
+    records_dir, data: dict, *, keep_versions: int = 0, max_age_days: int = 0
+) -> dict:
+    """
+    Store a snapshot of `data` and return its index entry
+    {"v", "hash", "at"} plus "created": False when it matched the latest version.
+    """
+    product_id = data["product"]["id"]
+    digest, body = canonical_record(data)
+    product_dir = _product_dir(records_dir, product_id)
+
+    with _locked(product_dir):
+        entries = _read_index(product_dir)
+        if entries and entries[-1]["hash"] == digest:
+            return {**entries[-1], "created": False}
+
+        objects = product_dir / OBJECTS_DIR
+        objects.mkdir(exist_ok=True)
+        obj = objects / f"{digest}.json"
+        if not obj.exists():
+            _write_atomic(obj, body)
+
+        entry = {
+            "v": entries[-1]["v"] + 1 if entries else 1,
+            "hash": digest,
+            "at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        }
+        with open(product_dir / INDEX_NAME, "ab") as f:
+            f.write(_index_line(entry))
+        entries.append(entry)
+
+        if (keep_versions and len(entries) > keep_versions) or max_age_days:
+            _prune(product_dir, entries, keep_versions, max_age_days)
+    return {**entry, "created": True}
+
+
+def list_record_versions(records_dir, product_id: int) -> list[dict]:
+    return _read_index(_product_dir(records_dir, product_id))
+
+
+def record_version_path(records_dir, product_id: int, version: int | None = None) -> Path | None:
+    """Path of a stored version's JSON; the latest version when `version` is None."""
+    product_dir = _product_dir(records_dir, product_id)
+    entries = _read_index(product_dir)
+    if not entries:
+        return None
+    if version is None:
+        entry = entries[-1]
+    else:
+        entry = next((e for e in entries if e["v"] == version), None)
+        if entry is None:
+            return None
+    return product_dir / OBJECTS_DIR / f"{entry['hash']}.json"
+
+
+def load_record_version(records_dir, product_id: int, version: int | None = None) -> dict | None:
+    path = record_version_path(records_dir, product_id, version)
+    if path is None:
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None  # pruned between reading the index and the object
+
+
+def _prune(product_dir: Path, entries: list[dict], keep_versions: int, max_age_days: int) -> int:
+    kept = entries
+    if keep_versions:
+        kept = kept[-keep_versions:]
+    if max_age_days:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=max_age_days)
+        kept = [e for e in kept[:-1] if datetime.datetime.fromisoformat(e["at"]) >= cutoff] + kept[-1:]
+
+    removed = len(entries) - len(kept)
+    if removed:
+        _write_atomic(product_dir / INDEX_NAME, b"".join(_index_line(e) for e in kept))
+
+    live = {e["hash"] for e in kept}
+    for obj in (product_dir / OBJECTS_DIR).glob("*.json"):
+        if obj.stem not in live:
+            obj.unlink(missing_ok=True)
+    return removed
+
+
+def prune_record_versions(records_dir, product_id: int, keep_versions: int = 0, max_age_days: int = 0) -> int:
+    """Drop old versions by policy; the latest version is always kept. Returns versions removed."""
+    product_dir = _product_dir(records_dir, product_id)
+    if not product_dir.is_dir():
+        return 0
+    with _locked(product_dir):
+        entries = _read_index(product_dir)
+        if not entries:
+            return 0
+        return _prune(product_dir, entries, keep_versions, max_age_days)
+
+
+def _record_key(record: dict) -> tuple:
+    return tuple(record.get(f) for f in RECORD_KEY_FIELDS)
+
+
+def _stage_total(records: list[dict]) -> float:
+    return round(sum(float(r.get("emission_amount") or 0) for r in records), 5)
+
+
+def diff_records(old: dict, new: dict) -> dict:
+    """
+    Compare two report records. Records are matched per stage by
+    RECORD_KEY_FIELDS; changes list the fields that differ as [old, new].
+    """
+    product = {
+        k: [old["product"].get(k), new["product"].get(k)]
+        for k in sorted(set(old["product"]) | set(new["product"]))
+        if old["product"].get(k) != new["product"].get(k)
+    }
+
+    old_stages = {s["stage_name"]: s["records"] for s in old.get("stages", [])}
+    new_stages = {s["stage_name"]: s["records"] for s in new.get("stages", [])}
+    names = list(old_stages) + [s for s in new_stages if s not in old_stages]
+
+    stages = []
+    for name in names:
+        before, after = old_stages.get(name, []), new_stages.get(name, [])
+        pending: dict[tuple, list[dict]] = {}
+        for r in before:
+            pending.setdefault(_record_key(r), []).append(r)
+
+        added, changed = [], []
+        for r in after:
+            matches = pending.get(_record_key(r))
+            if not matches:
+                added.append(r)
+                continue
+            prev = matches.pop(0)
+            fields = {
+                k: [prev.get(k), r.get(k)]
+                for k in sorted(set(prev) | set(r))
+                if prev.get(k) != r.get(k)
+            }
+            if fields:
+                changed.append({"key": dict(zip(RECORD_KEY_FIELDS, _record_key(r))), "fields": fields})
+        removed = [r for matches in pending.values() for r in matches]
+
+        if added or removed or changed:
+            stages.append({
+                "stage_name": name,
+                "added": added,
+                "removed": removed,
+                "changed": changed,
+                "emission_total": [_stage_total(before), _stage_total(after)],
+            })
+
+    return {"product": product, "stages": stages}
+
+
+def diff_record_versions(records_dir, product_id: int, from_version: int | None = None, to_version: int | None = None) -> dict | None:
+    """
+    Diff two stored versions; defaults to the one before the latest against
+    the latest. Returns None when either version does not exist.
+    """
+    entries = list_record_versions(records_dir, product_id)
+    if not entries:
+        return None
+    if to_version is None:
+        to_version = entries[-1]["v"]
+    if from_version is None:
+        earlier = [e["v"] for e in entries if e["v"] < to_version]
+        from_version = earlier[-1] if earlier else to_version
+
+    old = load_record_version(records_dir, product_id, from_version)
+    new = load_record_version(records_dir, product_id, to_version)
+    if old is None or new is None:
+        return None
+    return {"from": from_version, "to": to_version, **diff_records(old, new)}
+
+
+def import_legacy_records(records_dir) -> int:
+    """Adopt flat <product_id>.json files written before versioning as a version each."""
+    imported = 0
+    for path in sorted(Path(records_dir).glob("*.json")):
+        if not path.stem.isdigit():
+            continue  # e.g. stray copies like "1 2.json"
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("product", {}).get("id") != int(path.stem):
+            continue
+        if save_record_version(records_dir, data)["created"]:
+            imported += 1
+    return imported
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect and maintain versioned report records")
+    ap.add_argument("--records-dir", default=str(Path(__file__).resolve().parent.parent / "report" / "records"))
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list")
+    p.add_argument("product_id", type=int)
+
+    p = sub.add_parser("diff")
+    p.add_argument("product_id", type=int)
+    p.add_argument("from_version", type=int, nargs="?")
+    p.add_argument("to_version", type=int, nargs="?")
+
+    p = sub.add_parser("prune")
+    p.add_argument("product_id", type=int)
+    p.add_argument("--keep", type=int, default=0)
+    p.add_argument("--max-age-days", type=int, default=0)
+
+    sub.add_parser("import-legacy")
+    args = ap.parse_args()
+
+    if args.command == "list":
+        for e in list_record_versions(args.records_dir, args.product_id):
+            print(f"v{e['v']}  {e['at']}  {e['hash'][:12]}")
+    elif args.command == "diff":
+        diff = diff_record_versions(args.records_dir, args.product_id, args.from_version, args.to_version)
+        if diff is None:
+            raise SystemExit("version not found")
+        print(json.dumps(diff, ensure_ascii=False, indent=2))
+    elif args.command == "prune":
+        removed = prune_record_versions(args.records_dir, args.product_id, args.keep, args.max_age_days)
+        print(f"removed {removed} version(s)")
+    elif args.command == "import-legacy":
+        print(f"imported {import_legacy_records(args.records_dir)} record(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,330 @@
 # backend/routes/report.py
-from flask import current_app, Blueprint, Flask, send_file, render_template, abort
-from pathlib import Path
+from flask import current_app, Blueprint, Response, make_response, request, send_file
+import hashlib
 import tempfile
 
 from flask_jwt_extended import jwt_required
 
-from routes.helpers import parse_display_id
-from routes.generate_report import generate_report
+from routes.helpers import display_id, parse_display_id, json_response
+from routes.generate_report import (
+    build_report_data,
+    build_reports_data,
+    render_report,
+    RENDER_MODES,
+    snapshot_record_async,
+)
+from routes.report_batch import write_reports_zip
+from routes.record_store import (
+    diff_record_versions,
+    list_record_versions,
+    load_record_version,
+)
+from routes.report_formats import report_summary, report_summary_csv
+from routes.report_cache import (
+    get_cached_report,
+    report_cache_key,
+    store_report,
+)
+from routes.report_jobs import submit_report_job, wait_for_report_job
+from models.products_model import count_type_products, fetch_product
+from models.emissions_model import (
+    get_product_type_report_data,
+    get_products_report_data,
+)
+from models.report_jobs_model import get_report_job
 
 report_bp = Blueprint("report", __name__, url_prefix="/report")
 
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# format name -> media type, in order of preference for Accept: */*
+REPORT_FORMATS = {
+    "xlsx": XLSX_MIMETYPE,
+    "json": "application/json",
+    "csv": "text/csv",
+}
+
+
+def _negotiate_format() -> str | None:
+    """?format= wins over the Accept header; None for an unknown format."""
+    fmt = request.args.get("format")
+    if fmt:
+        return fmt if fmt in REPORT_FORMATS else None
+    best = request.accept_mimetypes.best_match(list(REPORT_FORMATS.values()), default=XLSX_MIMETYPE)
+    return next(k for k, v in REPORT_FORMATS.items() if v == best)
+
 
 @report_bp.get("/<string:product_id>")
 # @jwt_required() # Disable or testing
 def download_report(product_id):
-    
+    try:
+        product_id_int = parse_display_id(product_id, "PRD")
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    fmt = _negotiate_format()
+    if fmt is None:
+        return json_response({"error": f"format must be one of {', '.join(REPORT_FORMATS)}"}, 400)
+
+    mode = request.args.get("mode", current_app.config["REPORT_RENDER_MODE"])
+    if mode not in RENDER_MODES:
+        return json_response({"error": f"mode must be one of {', '.join(RENDER_MODES)}"}, 400)
+
+    data = build_report_data(product_id_int)
+    if data is None:
+        return json_response({"error": "product not found"}, 404)
+
+    if fmt == "xlsx":
+        resp = make_response(_xlsx_report(product_id, product_id_int, data, mode))
+    else:
+        resp = _summary_report(product_id, data, fmt)
+    # the same URL serves several formats
+    resp.vary.add("Accept")
+    return resp
+
+
+def _summary_report(product_id: str, data: dict, fmt: str):
+    summary = report_summary(data)
+    if fmt == "csv":
+        resp = Response(report_summary_csv(summary), mimetype=REPORT_FORMATS["csv"])
+        resp.headers["Content-Disposition"] = f'attachment; filename="{product_id}.csv"'
+    else:
+        resp = json_response(summary, 200)
+
+    resp.set_etag(hashlib.sha256(resp.get_data()).hexdigest())
+    return resp.make_conditional(request)
+
+
+def _xlsx_report(product_id: str, product_id_int: int, data: dict, mode: str):
     template_path = current_app.config["REPORT_TEMPLATE"]
+    cache_dir = current_app.config["REPORT_CACHE_DIR"]
+    max_bytes = current_app.config["REPORT_CACHE_MAX_BYTES"]
 
-    tmp = tempfile.NamedTemporaryFile(suffix=".xlsx", delete=False)
-    tmp_path = Path(tmp.name)
-    tmp.close()
-    product_id_int = parse_display_id(product_id, "PRD")
-    generate_report(product_id_int, str(template_path), str(tmp_path))
+    # the key changes whenever the emissions, factor units or template change
+    etag = report_cache_key(data, template_path, variant=mode)
+    if etag in request.if_none_match:
+        return "", 304, {"ETag": f'"{etag}"'}
 
-    return send_file(
-        tmp_path,
+    send_kwargs = dict(
         as_attachment=True,
         download_name=f"{product_id}.xlsx",
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        mimetype=XLSX_MIMETYPE,
+        etag=etag,
+    )
+
+    if max_bytes > 0:
+        cached = get_cached_report(cache_dir, product_id_int, etag, variant=mode)
+        if cached is not None:
+            try:
+                return send_file(cached, **send_kwargs)
+            except FileNotFoundError:
+                pass  # evicted or invalidated by another worker since; render it again
+
+    # the JSON record is only a snapshot; write it off the request path
+    if current_app.config["REPORT_SNAPSHOT_RECORDS"]:
+        snapshot_record_async(
+            data,
+            current_app.config["REPORT_RECORDS_DIR"],
+            keep_versions=current_app.config["REPORT_RECORD_KEEP_VERSIONS"],
+            max_age_days=current_app.config["REPORT_RECORD_MAX_AGE_DAYS"],
+        )
+
+    if max_bytes > 0:
+        path = store_report(
+            cache_dir,
+            product_id_int,
+            etag,
+            lambda f: render_report(data, template_path, f, mode=mode),
+            max_bytes,
+            variant=mode,
+        )
+        return send_file(path, **send_kwargs)
+
+    # render in memory, spilling to an auto-deleted temp file only for huge workbooks
+    buf = tempfile.SpooledTemporaryFile(max_size=current_app.config["REPORT_SPOOL_MAX_SIZE"])
+    render_report(data, template_path, buf, mode=mode)
+    buf.seek(0)
+    return send_file(buf, **send_kwargs)
+
+
+# -------- Versioned report records --------
+@report_bp.get("/<string:product_id>/records")
+# @jwt_required() # Disable or testing
+def list_records(product_id):
+    try:
+        product_id_int = parse_display_id(product_id, "PRD")
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    versions = list_record_versions(current_app.config["REPORT_RECORDS_DIR"], product_id_int)
+    return json_response(
+        {
+            "product_id": product_id,
+            "versions": [
+                {"version": e["v"], "hash": e["hash"], "created_at": e["at"]}
+                for e in versions
+            ],
+        },
+        200,
+    )
+
+
+@report_bp.get("/<string:product_id>/records/<int:version>")
+# @jwt_required() # Disable or testing
+def get_record(product_id, version):
+    try:
+        product_id_int = parse_display_id(product_id, "PRD")
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    record = load_record_version(current_app.config["REPORT_RECORDS_DIR"], product_id_int, version)
+    if record is None:
+        return json_response({"error": "record version not found"}, 404)
+    return json_response(record, 200)
+
+
+@report_bp.get("/<string:product_id>/records/diff")
+# @jwt_required() # Disable or testing
+def diff_records(product_id):
+    try:
+        product_id_int = parse_display_id(product_id, "PRD")
+        # default: the version before `to` against `to` (latest)
+        from_version = request.args.get("from", type=int)
+        to_version = request.args.get("to", type=int)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    diff = diff_record_versions(
+        current_app.config["REPORT_RECORDS_DIR"], product_id_int, from_version, to_version
     )
+    if diff is None:
+        return json_response({"error": "record version not found"}, 404)
+    return json_response(diff, 200)
+
 
+# -------- Batch: many reports as one ZIP --------
+@report_bp.post("/batch")
+# @jwt_required() # Disable or testing
+def download_batch():
+    data = request.get_json(silent=True) or {}
+    max_products = current_app.config["REPORT_BATCH_MAX_PRODUCTS"]
+    # the limit is checked before any report data is fetched
+    try:
+        if data.get("product_type_id"):
+            type_id = parse_display_id(data["product_type_id"], "PRT")
+            if count_type_products(type_id, max_products + 1) > max_products:
+                return json_response({"error": "too many products for one batch"}, 413)
+            grouped = get_product_type_report_data(type_id)
+            archive_name = data["product_type_id"]
+        elif data.get("product_ids"):
+            if len(data["product_ids"]) > max_products:
+                return json_response({"error": "too many products for one batch"}, 413)
+            product_ids = list(dict.fromkeys(parse_display_id(p, "PRD") for p in data["product_ids"]))
+            grouped = get_products_report_data(product_ids)
+            archive_name = "reports"
+        else:
+            return json_response({"error": "product_type_id or product_ids required"}, 400)
+    except (TypeError, ValueError) as e:
+        return json_response({"error": str(e)}, 400)
+
+    if not grouped:
+        return json_response({"error": "no products found"}, 404)
+
+    reports = build_reports_data(grouped)
+    buf = tempfile.SpooledTemporaryFile(max_size=current_app.config["REPORT_SPOOL_MAX_SIZE"])
+    try:
+        write_reports_zip(
+            reports,
+            current_app.config["REPORT_TEMPLATE"],
+            buf,
+            max_workers=current_app.config["REPORT_BATCH_WORKERS"],
+            mode=current_app.config["REPORT_RENDER_MODE"],
+            timeout=current_app.config["REPORT_BATCH_RENDER_TIMEOUT"],
+        )
+    except TimeoutError as e:
+        buf.close()
+        return json_response({"error": str(e)}, 504)
+    buf.seek(0)
+    return send_file(
+        buf,
+        as_attachment=True,
+        download_name=f"{archive_name}.zip",
+        mimetype="application/zip",
+    )
+
+
+# -------- Asynchronous report jobs --------
+def _job_response(job: dict) -> dict:
+    job_id = display_id("report_jobs", job["id"])
+    body = {
+        "job_id": job_id,
+        "product_id": display_id("products", job["product_id"]),
+        "status": "expired" if job["expired"] else job["status"],
+        "error_msg": job["error_msg"],
+        "expires_at": job["expires_at"].isoformat() if job["expires_at"] else None,
+    }
+    if job["status"] == "done" and not job["expired"]:
+        body["download_url"] = f"{report_bp.url_prefix}/jobs/{job_id}/file"
+    return body
+
+
+@report_bp.post("/<string:product_id>/jobs")
+# @jwt_required() # Disable or testing
+def create_job(product_id):
+    try:
+        product_id_int = parse_display_id(product_id, "PRD")
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    if not fetch_product(product_id_int):
+        return json_response({"error": "product not found"}, 404)
+
+    job_id = submit_report_job(current_app.config, product_id_int)
+    job_display_id = display_id("report_jobs", job_id)
+    return json_response(
+        {
+            "job_id": job_display_id,
+            "status": "queued",
+            "status_url": f"{report_bp.url_prefix}/jobs/{job_display_id}",
+        },
+        202,
+    )
+
+
+@report_bp.get("/jobs/<string:job_id>")
+# @jwt_required() # Disable or testing
+def get_job(job_id):
+    try:
+        job_id_int = parse_display_id(job_id, "RPJ")
+        # ?wait=N long-polls up to N seconds for the job to finish
+        wait = min(float(request.args.get("wait", 0)), current_app.config["REPORT_JOB_MAX_WAIT"])
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    job = wait_for_report_job(job_id_int, max(wait, 0))
+    if not job:
+        return json_response({"error": "job not found"}, 404)
+    return json_response(_job_response(job), 200)
+
+
+@report_bp.get("/jobs/<string:job_id>/file")
+# @jwt_required() # Disable or testing
+def download_job_file(job_id):
+    try:
+        job_id_int = parse_display_id(job_id, "RPJ")
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    job = get_report_job(job_id_int)
+    if not job:
+        return json_response({"error": "job not found"}, 404)
+    if job["expired"]:
+        return json_response({"error": "report expired"}, 410)
+    if job["status"] != "done":
+        return json_response(_job_response(job), 409)
+
+    return send_file(
+        job["file_path"],
+        as_attachment=True,
+        download_name=f"{display_id('products', job['product_id'])}.xlsx",
+        mimetype=XLSX_MIMETYPE,
+    )
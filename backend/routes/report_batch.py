@@ -0,0 +1,112 @@
+# backend/routes/report_batch.py
+#
+# Render many product reports at once and bundle them into a ZIP archive.
+# Data for the whole batch comes from one query; rendering is spread over a
+# process pool so each core parses the template once and renders many reports.
+# The pool is shared by every batch request in the worker, so concurrent
+# batches queue for the same REPORT_BATCH_WORKERS processes instead of each
+# starting its own. Its processes come from a forkserver, because the pool is
+# started on a request thread and a plain fork there copies held locks.
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from routes.generate_report import render_report
+from routes.helpers import display_id
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor):
+    """Forget a broken pool (a process died); the next batch starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not broken:
+            return
+        _pool = None
+    broken.shutdown(wait=False)
+
+
+def render_report_bytes(data: dict, template_xlsx: str, mode: str = "exact") -> tuple[int, bytes]:
+    buf = io.BytesIO()
+    render_report(data, template_xlsx, buf, mode=mode)
+    return data["product"]["id"], buf.getvalue()
+
+
+def _write_finished(zf: zipfile.ZipFile, pending: set, timeout: float | None) -> set:
+    """Wait for at least one render, write every finished one; returns the rest."""
+    done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+    if not done:
+        raise TimeoutError(f"no report rendered within {timeout} seconds")
+    for fut in done:
+        pid, content = fut.result()
+        zf.writestr(f"{display_id('products', pid)}.xlsx", content)
+    return pending
+
+
+def write_reports_zip(
+    reports: dict[int, dict],
+    template_xlsx: str,
+    output,
+    max_workers: int | None = None,
+    mode: str = "exact",
+    timeout: float | None = None,
+) -> int:
+    """
+    Render every report in `reports` (product_id -> report data) and write
+    them into a ZIP at `output` (path or writable binary file object).
+    `max_workers` sizes the shared pool when it is first started. TimeoutError
+    is raised when the pool finishes no render for `timeout` seconds.
+    Returns the number of reports written.
+    """
+    if not reports:
+        with zipfile.ZipFile(output, "w"):
+            pass
+        return 0
+
+    workers = max(1, max_workers or os.cpu_count() or 1)
+    # xlsx files are already deflated; storing them avoids compressing twice
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_STORED) as zf:
+        if workers == 1 or len(reports) == 1:
+            for data in reports.values():
+                pid, content = render_report_bytes(data, template_xlsx, mode)
+                zf.writestr(f"{display_id('products', pid)}.xlsx", content)
+            return len(reports)
+
+        pool = _get_pool(workers)
+        # keep a few renders per pool process queued, so finished workbooks
+        # are written out instead of piling up in memory
+        window = _pool_workers * 2
+        pending = set()
+        try:
+            for data in reports.values():
+                if len(pending) >= window:
+                    pending = _write_finished(zf, pending, timeout)
+                pending.add(pool.submit(render_report_bytes, data, template_xlsx, mode))
+            while pending:
+                pending = _write_finished(zf, pending, timeout)
+        except (BrokenProcessPool, TimeoutError):
+            # a pool that stopped finishing renders is not reused
+            _discard_pool(pool)
+            raise
+        finally:
+            for fut in pending:
+                fut.cancel()
+    return len(reports)
@@ -0,0 +1,127 @@
+# backend/routes/report_cache.py
+#
+# Content-addressed on-disk cache for rendered report workbooks.
+# Files are named <product_id>-<variant>-<key>.xlsx where key hashes the
+# report data, the template contents, the variant (render mode) and the
+# renderer version, so any change to a product's emissions, factor units or
+# the template yields a new key. Recency is tracked through file mtimes, which
+# are shared by every worker on the host.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable
+
+from routes.generate_report import template_version
+
+# bump when render_report output changes for the same data
+RENDERER_VERSION = 1
+
+# template path -> (version, sha256 of the template bytes)
+_template_digests: dict[str, tuple[tuple[int, int], str]] = {}
+_digest_lock = threading.Lock()
+
+
+def template_digest(template_xlsx: str) -> str:
+    version = template_version(template_xlsx)
+    with _digest_lock:
+        cached = _template_digests.get(template_xlsx)
+        if cached is None or cached[0] != version:
+            digest = hashlib.sha256(Path(template_xlsx).read_bytes()).hexdigest()
+            cached = (version, digest)
+            _template_digests[template_xlsx] = cached
+    return cached[1]
+
+
+def report_cache_key(data: dict, template_xlsx: str, *, variant: str = "") -> str:
+    canonical = json.dumps(
+        data,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    h = hashlib.sha256()
+    h.update(f"v{RENDERER_VERSION}:{variant}:".encode())
+    h.update(template_digest(template_xlsx).encode())
+    h.update(canonical.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _entry_path(cache_dir, product_id: int, key: str, variant: str) -> Path:
+    return Path(cache_dir) / f"{product_id}-{variant or 'default'}-{key}.xlsx"
+
+
+def get_cached_report(cache_dir, product_id: int, key: str, *, variant: str = "") -> Path | None:
+    path = _entry_path(cache_dir, product_id, key, variant)
+    try:
+        os.utime(path)  # mark as most recently used
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def store_report(
+    cache_dir, product_id: int, key: str, render: Callable, max_bytes: int, *, variant: str = ""
+) -> Path:
+    """
+    Render a report straight into the cache and return its path.
+    `render` is called with a writable binary file object.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = _entry_path(cache_dir, product_id, key, variant)
+
+    fd, tmp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            render(f)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    # older renders of this product in this variant can never be served again;
+    # the other variants' files are still current
+    invalidate_product_reports(cache_dir, product_id, keep=path, variant=variant or "default")
+    evict_lru(cache_dir, max_bytes, keep=path)
+    return path
+
+
+def invalidate_product_reports(
+    cache_dir, product_id: int, *, keep: Path | None = None, variant: str | None = None
+) -> int:
+    """Delete the product's cached files, of one variant only when `variant` is given."""
+    removed = 0
+    pattern = f"{product_id}-{variant}-*.xlsx" if variant else f"{product_id}-*.xlsx"
+    for path in Path(cache_dir).glob(pattern):
+        if keep is not None and path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def evict_lru(cache_dir, max_bytes: int, *, keep: Path | None = None) -> int:
+    entries = []
+    total = 0
+    for path in Path(cache_dir).glob("*.xlsx"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue  # evicted by another worker
+        entries.append((st.st_mtime_ns, st.st_size, path))
+        total += st.st_size
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep is not None and path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    return removed
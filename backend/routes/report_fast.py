@@ -0,0 +1,472 @@
+# backend/routes/report_fast.py
+#
+# Streaming report renderer ("fast" render mode).
+# The template is compiled once per worker and template version: the active
+# sheet is saved untouched and split into its rows, merges and trailing XML,
+# and a probe render through the exact path supplies the style ids the stage
+# cells end up with. A report is then written straight into the xlsx archive
+# row by row, renumbering template rows the same way apply_row_insertions
+# does, so memory stays flat no matter how many emissions a product has.
+#
+# The sheet XML is produced by hand and uncommon cell values are serialized
+# with openpyxl's private cell writer, so this is tied to the openpyxl series
+# pinned in requirements.txt (SUPPORTED_OPENPYXL). On any other version
+# render_report falls back to the exact path instead of risking a broken file.
+import copy
+import datetime
+import heapq
+import io
+import math
+import re
+import threading
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+import openpyxl
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE, Cell
+from openpyxl.utils import get_column_letter, range_boundaries
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.xml.functions import tostring
+
+from routes.generate_report import (
+    PRODUCT_NAME_CELL,
+    PROTECTED_MERGED_RANGES,
+    STAGE_ORDER,
+    TARGET_STAGE_IN_EXCEL,
+    anchor_to_row,
+    apply_row_insertions,
+    col_letter_to_index,
+    collect_by_stage,
+    collect_product_name,
+    find_free_rows,
+    load_template,
+    plan_stage_layout,
+    row_offset,
+    template_version,
+    unmerge_on_rows_for_cols,
+    write_rows,
+)
+
+ROW_RE = re.compile(r'<row r="(\d+)"([^>]*?)(?:\s*/>|>(.*?)</row>)', re.S)
+CELL_RE = re.compile(r'<c r="([A-Z]+)(\d+)"((?:[^>]*?/>)|(?:[^>]*?>.*?</c>))', re.S)
+MERGE_RE = re.compile(r'<mergeCell ref="([A-Z0-9:]+)"\s*/>')
+DIMENSION_RE = re.compile(r'<dimension ref="([A-Z]+\d+):([A-Z]+)\d+"\s*/>')
+COMMENT_REF_RE = re.compile(r'(<comment ref="[A-Z]+)(\d+)(")')
+VML_ROW_RE = re.compile(r"(<(?:\w+:)?Row>)(\d+)(</(?:\w+:)?Row>)")
+
+# placeholders left in the split sheet XML
+DIMENSION_SLOT = "\x00dimension\x00"
+MERGES_SLOT = "\x00merges\x00"
+
+# openpyxl releases whose sheet XML and cell writer this module was checked against
+SUPPORTED_OPENPYXL = ("3.1.",)
+
+try:
+    from openpyxl.cell._writer import etree_write_cell
+except ImportError:  # moved or removed in another openpyxl release
+    etree_write_cell = None
+
+FAST_RENDER_SUPPORTED = etree_write_cell is not None and openpyxl.__version__.startswith(SUPPORTED_OPENPYXL)
+
+# flush the sheet stream roughly every this many bytes
+CHUNK_SIZE = 1 << 16
+
+# template path -> (version, compiled template), one per worker process
+_compiled_cache: dict = {}
+_compiled_lock = threading.Lock()
+# per thread: a throwaway worksheet to serialize cells against
+_scratch = threading.local()
+
+
+class CompiledTemplate:
+    """Everything render_report_fast needs from one template version."""
+
+    def __init__(self):
+        self.parts: list[tuple[str, bytes | None]] = []  # archive order; None = rendered per report
+        self.properties = None
+        self.sheet_part = ""
+        self.comment_parts: list[str] = []
+        self.vml_parts: list[str] = []
+        self.head = ""
+        self.tail = ""
+        self.dimension_cols = ("A1", "Z")
+        # template row -> (row attributes, [(col, letter, rest of <c> element)])
+        self.rows: dict[int, tuple[str, list]] = {}
+        self.row_attrs: dict[int, str] = {}
+        self.merges: list[tuple[int, int, int, int]] = []
+        # template cells covered by a merge, other than its top-left cell
+        self.merge_members: set[tuple[int, int]] = set()
+        # per merge: [(row delta, col, letter, rest)] for the cells openpyxl
+        # recreates when it re-merges the range after inserting rows
+        self.merge_cells: list[list[tuple[int, int, str, str]]] = []
+        self.free_rows: dict[str, tuple[int, int]] = {}
+        # stage -> ([(s_name, s_amount, s_unit)] per free row, style triple for inserted rows)
+        self.styles: dict[str, tuple[list, tuple]] = {}
+        self.product_name_style = None
+
+
+def _parse_rows(body: str):
+    for m in ROW_RE.finditer(body):
+        cells = [
+            (col_letter_to_index(c.group(1)), c.group(1), c.group(3))
+            for c in CELL_RE.finditer(m.group(3) or "")
+        ]
+        yield int(m.group(1)), m.group(2), cells
+
+
+def _split_sheet(xml: str, compiled: CompiledTemplate):
+    start = xml.index("<sheetData>") + len("<sheetData>")
+    end = xml.index("</sheetData>")
+    head, body, tail = xml[:start], xml[start:end], xml[end:]
+
+    m = DIMENSION_RE.search(head)
+    if m:
+        compiled.dimension_cols = (m.group(1), m.group(2))
+        head = head[:m.start()] + DIMENSION_SLOT + head[m.end():]
+    compiled.head = head
+
+    for r, attrs, cells in _parse_rows(body):
+        if attrs.strip():
+            compiled.row_attrs[r] = attrs
+        if cells:
+            compiled.rows[r] = (attrs, cells)
+
+    ms = tail.find("<mergeCells")
+    if ms != -1:
+        me = tail.index("</mergeCells>") + len("</mergeCells>")
+        compiled.merges = [range_boundaries(ref) for ref in MERGE_RE.findall(tail[ms:me])]
+        for min_col, min_row, max_col, max_row in compiled.merges:
+            for r in range(min_row, max_row + 1):
+                for c in range(min_col, max_col + 1):
+                    if (r, c) != (min_row, min_col):
+                        compiled.merge_members.add((r, c))
+        tail = tail[:ms] + MERGES_SLOT + tail[me:]
+    else:
+        tail = tail.replace("</sheetData>", "</sheetData>" + MERGES_SLOT, 1)
+    compiled.tail = tail
+
+
+def _sheet_rels(archive: zipfile.ZipFile, sheet_part: str) -> list[str]:
+    folder, name = sheet_part.rsplit("/", 1)
+    rels = f"{folder}/_rels/{name}.rels"
+    if rels not in archive.namelist():
+        return []
+    targets = re.findall(r'Target="([^"]+)"', archive.read(rels).decode("utf-8"))
+    parts = []
+    for target in targets:
+        path = target.lstrip("/") if target.startswith("/") else f"{folder}/{target}"
+        segs = []
+        for seg in path.split("/"):
+            if seg == "..":
+                segs.pop()
+            else:
+                segs.append(seg)
+        parts.append("/".join(segs))
+    return parts
+
+
+def _probe_styles(wb, compiled: CompiledTemplate) -> bytes:
+    """
+    Render capacity + 1 placeholder rows per stage through the exact path so
+    the resulting styles.xml holds every stage cell style, and record the
+    style id each stage cell gets. Returns the probe workbook bytes.
+    `wb` must be the workbook the untouched sheet was saved from: style ids
+    are handed out while saving, and reusing it keeps those ids stable.
+    """
+    ws = wb.active
+    stage_rows = {
+        stage: [("probe", 0.0, "probe")] * (end - start + 1)
+        for stage, (start, end) in compiled.free_rows.items()
+    }
+    layout = plan_stage_layout(ws, stage_rows, compiled.free_rows)
+    apply_row_insertions(ws, [(st["insert_at"], st["extra"]) for st in layout])
+
+    for st in layout:
+        rows = st["rows"]
+        data_row = st["data_row"]
+        unmerge_on_rows_for_cols(ws, data_row, data_row + len(rows) - 1, st["cols"])
+        write_rows(ws, data_row, st["cols"], rows)
+
+        cols = [col_letter_to_index(c) for c in st["cols"]]
+        ids = [
+            tuple(str(ws.cell(row=data_row + i, column=c).style_id) for c in cols)
+            for i in range(len(rows))
+        ]
+        compiled.styles[st["stage"]] = (ids[:-1], ids[-1])
+
+    name_cell = ws[PRODUCT_NAME_CELL]
+    compiled.product_name_style = str(name_cell.style_id) if name_cell.has_style else None
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    compiled.properties = wb.properties
+
+    with zipfile.ZipFile(buf) as archive:
+        xml = archive.read(compiled.sheet_part).decode("utf-8")
+    body = xml[xml.index("<sheetData>"):xml.index("</sheetData>")]
+    probe_cells = {
+        (r, col): (letter, rest)
+        for r, _, cells in _parse_rows(body)
+        for col, letter, rest in cells
+    }
+    offset = row_offset([(st["insert_at"], st["extra"]) for st in layout])
+    for min_col, min_row, max_col, max_row in compiled.merges:
+        top = min_row + offset(min_row)
+        members = []
+        for dr in range(max_row - min_row + 1):
+            for c in range(min_col, max_col + 1):
+                if (dr, c) != (0, min_col) and (top + dr, c) in probe_cells:
+                    members.append((dr, c) + probe_cells[(top + dr, c)])
+        compiled.merge_cells.append(members)
+    return buf.getvalue()
+
+
+def compile_template(template_xlsx: str) -> CompiledTemplate:
+    compiled = CompiledTemplate()
+
+    wb = load_template(template_xlsx)
+    ws = wb.active
+    for stage in STAGE_ORDER:
+        cfg = TARGET_STAGE_IN_EXCEL.get(stage, {})
+        if cfg.get("cols"):
+            start_row = anchor_to_row(cfg["anchor"]) + 1
+            compiled.free_rows[stage] = find_free_rows(ws, start_row, cfg["cols"])
+
+    pristine = io.BytesIO()
+    wb.save(pristine)
+    with zipfile.ZipFile(pristine) as archive:
+        compiled.sheet_part = ws.path.lstrip("/")
+        related = _sheet_rels(archive, compiled.sheet_part)
+        compiled.comment_parts = [p for p in related if p.startswith("xl/comments/")]
+        compiled.vml_parts = [p for p in related if p.endswith(".vml")]
+        _split_sheet(archive.read(compiled.sheet_part).decode("utf-8"), compiled)
+        own = {p: archive.read(p).decode("utf-8") for p in compiled.comment_parts + compiled.vml_parts}
+
+    probe = _probe_styles(wb, compiled)
+    with zipfile.ZipFile(io.BytesIO(probe)) as archive:
+        for name in archive.namelist():
+            if name == compiled.sheet_part or name == "docProps/core.xml":
+                compiled.parts.append((name, None))
+            elif name in own:
+                compiled.parts.append((name, own[name].encode("utf-8")))
+            else:
+                compiled.parts.append((name, archive.read(name)))
+    return compiled
+
+
+def get_compiled_template(template_xlsx: str) -> CompiledTemplate:
+    version = template_version(template_xlsx)
+    with _compiled_lock:
+        cached = _compiled_cache.get(template_xlsx)
+        if cached is None or cached[0] != version:
+            cached = (version, compile_template(template_xlsx))
+            _compiled_cache[template_xlsx] = cached
+    return cached[1]
+
+
+class _ElementSink:
+    def __init__(self):
+        self.element = None
+
+    def write(self, element):
+        self.element = element
+
+
+def _openpyxl_cell_xml(ref: str, style: str | None, value, row: int, col: int) -> str:
+    """Serialize a value the way openpyxl does; used for the uncommon types."""
+    ws = getattr(_scratch, "ws", None)
+    if ws is None:
+        ws = _scratch.ws = openpyxl.Workbook().active
+    cell = Cell(ws, row=row, column=col)
+    cell.value = value
+    sink = _ElementSink()
+    etree_write_cell(sink, ws, cell, False)
+    el = sink.element
+    if style is not None:
+        el.attrib.pop("t", None)
+        t = cell.data_type
+        el.attrib["s"] = style
+        if t == "s":
+            el.attrib["t"] = "inlineStr"
+        elif t != "f":
+            el.attrib["t"] = t
+    return tostring(el).decode("utf-8")
+
+
+def cell_xml(ref: str, style: str | None, value, row: int, col: int) -> str:
+    s = f' s="{style}"' if style is not None else ""
+    if value is None:
+        return f'<c r="{ref}"{s} t="n" />'
+
+    if type(value) is str:
+        value = value[:32767]
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        if value == "":
+            return f'<c r="{ref}"{s} t="inlineStr" />'
+        if (len(value) > 1 and value.startswith("=")) or value in ERROR_CODES or "\r" in value:
+            return _openpyxl_cell_xml(ref, style, value, row, col)
+        space = ' xml:space="preserve"' if value.strip() != value else ""
+        return f'<c r="{ref}"{s} t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+
+    if type(value) in (int, float, Decimal):
+        if math.isfinite(value):
+            return f'<c r="{ref}"{s} t="n"><v>{"%.16g" % value}</v></c>'
+
+    return _openpyxl_cell_xml(ref, style, value, row, col)
+
+
+def _shifted_merges(compiled: CompiledTemplate, offset, layout: list):
+    """
+    Shift template merges into final coordinates the way apply_row_insertions
+    does and drop the ones the stage rows overlap, like
+    unmerge_on_rows_for_cols. Returns the kept merges, the final cells
+    removed by unmerging and, when rows were inserted, the cells recreated
+    for every re-merged range (final row -> [(col, xml)]).
+    """
+    protected = {range_boundaries(coord) for coord in PROTECTED_MERGED_RANGES}
+    blocks = []
+    for st in layout:
+        cols = [col_letter_to_index(c) for c in st["cols"]]
+        blocks.append((st["data_row"], st["data_row"] + len(st["rows"]) - 1, min(cols), max(cols)))
+    inserted = any(st["extra"] for st in layout)
+
+    kept, dropped, recreated = [], set(), {}
+    for bounds, members in zip(compiled.merges, compiled.merge_cells):
+        min_col, min_row, max_col, max_row = bounds
+        top = min_row + offset(min_row)
+        bottom = max_row + offset(min_row)
+        hit = bounds not in protected and any(
+            not (bottom < first or top > last or max_col < lo or min_col > hi)
+            for first, last, lo, hi in blocks
+        )
+        if hit:
+            if not inserted:
+                for r in range(min_row, max_row + 1):
+                    for c in range(min_col, max_col + 1):
+                        if (r, c) != (min_row, min_col):
+                            dropped.add((r + offset(r), c))
+            continue
+
+        kept.append((min_col, top, max_col, bottom))
+        if inserted:
+            for dr, c, letter, rest in members:
+                recreated.setdefault(top + dr, []).append((c, f'<c r="{letter}{top + dr}"{rest}'))
+    return kept, dropped, recreated
+
+
+def _sheet_chunks(compiled: CompiledTemplate, data: dict, layout: list, offset):
+    # final row -> template row, for every template row that has cells
+    moved = {r + offset(r): r for r in compiled.rows}
+
+    # final row -> (stage layout entry, index into its rows)
+    placed = {}
+    for st in layout:
+        cols = [(letter, col_letter_to_index(letter)) for letter in st["cols"]]
+        for i in range(len(st["rows"])):
+            placed[st["data_row"] + i] = (st, cols, i)
+
+    kept, dropped, recreated = _shifted_merges(compiled, offset, layout)
+    # apply_row_insertions unmerges every range before moving cells, which
+    # drops all merged cells; re-merging recreates them at the new position
+    skip = compiled.merge_members if any(st["extra"] for st in layout) else ()
+
+    name_col, name_row = range_boundaries(PRODUCT_NAME_CELL)[:2]
+    name_row += offset(name_row)
+    product_name = collect_product_name(data)
+
+    final_rows = []
+    for r in heapq.merge(moved, placed, compiled.row_attrs, sorted(recreated)):
+        if not final_rows or final_rows[-1] != r:
+            final_rows.append(r)
+
+    last_row = max([r for r in moved] + [r for r in placed] or [1])
+    first_cell, last_col = compiled.dimension_cols
+    yield compiled.head.replace(DIMENSION_SLOT, f'<dimension ref="{first_cell}:{last_col}{last_row}" />')
+
+    buf, size = [], 0
+    for r in final_rows:
+        cells = {}
+        tpl = moved.get(r)
+        if tpl is not None:
+            for col, letter, rest in compiled.rows[tpl][1]:
+                if (r, col) not in dropped and (tpl, col) not in skip:
+                    cells[col] = f'<c r="{letter}{r}"{rest}'
+        for col, xml in recreated.get(r, ()):
+            cells[col] = xml
+
+        if r == name_row:
+            ref = f"{get_column_letter(name_col)}{r}"
+            cells[name_col] = cell_xml(ref, compiled.product_name_style, product_name, r, name_col)
+
+        hit = placed.get(r)
+        if hit is not None:
+            st, cols, i = hit
+            free_styles, inserted_style = compiled.styles[st["stage"]]
+            styles = free_styles[i] if i < st["capacity"] else inserted_style
+            for (letter, col), style, value in zip(cols, styles, st["rows"][i]):
+                cells[col] = cell_xml(f"{letter}{r}", style, value, r, col)
+
+        attrs = compiled.row_attrs.get(r, "")
+        if cells:
+            line = f'<row r="{r}"{attrs}>' + "".join(cells[c] for c in sorted(cells)) + "</row>"
+        else:
+            line = f'<row r="{r}"{attrs} />'
+        buf.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+    if kept:
+        refs = "".join(
+            f'<mergeCell ref="{get_column_letter(c1)}{r1}:{get_column_letter(c2)}{r2}" />'
+            for c1, r1, c2, r2 in kept
+        )
+        merges = f'<mergeCells count="{len(kept)}">{refs}</mergeCells>'
+    else:
+        merges = ""
+    yield compiled.tail.replace(MERGES_SLOT, merges)
+
+
+def _shift_part(text: str, pattern, offset, base: int) -> str:
+    return pattern.sub(
+        lambda m: f"{m.group(1)}{int(m.group(2)) + offset(int(m.group(2)) + base)}{m.group(3)}",
+        text,
+    )
+
+
+def render_report_fast(data: dict, template_xlsx: str, output):
+    """
+    Render report data like render_report, streaming the active sheet from
+    the compiled template instead of editing a loaded workbook.
+    `output` may be a file path or a writable binary file object.
+    """
+    compiled = get_compiled_template(template_xlsx)
+    stage_rows = collect_by_stage(data)
+    layout = plan_stage_layout(None, stage_rows, compiled.free_rows)
+    offset = row_offset([(st["insert_at"], st["extra"]) for st in layout])
+
+    # the compiled template is shared by concurrent renders
+    props = copy.copy(compiled.properties)
+    props.modified = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    core = tostring(props.to_tree())
+
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in compiled.parts:
+            if name == compiled.sheet_part:
+                with zf.open(name, "w") as fh:
+                    for chunk in _sheet_chunks(compiled, data, layout, offset):
+                        fh.write(chunk.encode("utf-8"))
+            elif name == "docProps/core.xml":
+                zf.writestr(name, core)
+            elif name in compiled.comment_parts:
+                zf.writestr(name, _shift_part(content.decode("utf-8"), COMMENT_REF_RE, offset, 0))
+            elif name in compiled.vml_parts:
+                # VML anchors count rows from zero
+                zf.writestr(name, _shift_part(content.decode("utf-8"), VML_ROW_RE, offset, 1))
+            else:
+                zf.writestr(name, content)
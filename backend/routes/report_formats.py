@@ -0,0 +1,66 @@
+# backend/routes/report_formats.py
+#
+# Lightweight report formats. The same staged records the Excel report is
+# built from (collect_by_stage output) plus per-stage subtotals and a total,
+# serialized as JSON or CSV straight from the report data; no workbook is
+# loaded or rendered.
+import csv
+import io
+
+from routes.generate_report import (
+    STAGE_ENG_TO_ZH,
+    STAGE_ORDER,
+    collect_by_stage,
+    collect_product_name,
+)
+from routes.helpers import display_id
+
+STAGE_ZH_TO_ENG = {zh: eng for eng, zh in STAGE_ENG_TO_ZH.items()}
+
+CSV_COLUMNS = ["row_type", "stage_id", "stage_name", "material", "emission_amount", "unit"]
+
+
+def _number(value):
+    # DECIMAL columns arrive as Decimal, which json cannot encode
+    return float(value) if value is not None else None
+
+
+def report_summary(data: dict) -> dict:
+    stage_rows = collect_by_stage(data)
+    ordered = [s for s in STAGE_ORDER if s in stage_rows]
+    ordered += [s for s in stage_rows if s not in STAGE_ORDER]
+
+    stages = []
+    total = 0.0
+    for stage in ordered:
+        records = [
+            {"material": name, "emission_amount": _number(amount), "unit": unit}
+            for name, amount, unit in stage_rows[stage]
+        ]
+        subtotal = round(sum(r["emission_amount"] or 0.0 for r in records), 5)
+        total += subtotal
+        stages.append({
+            "stage_id": STAGE_ZH_TO_ENG.get(stage),
+            "stage_name": stage,
+            "records": records,
+            "subtotal": subtotal,
+        })
+
+    return {
+        "product_id": display_id("products", data["product"]["id"]),
+        "product_name": collect_product_name(data),
+        "stages": stages,
+        "total": round(total, 5),
+    }
+
+
+def report_summary_csv(summary: dict) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    for st in summary["stages"]:
+        for r in st["records"]:
+            writer.writerow(["record", st["stage_id"], st["stage_name"], r["material"], r["emission_amount"], r["unit"]])
+        writer.writerow(["subtotal", st["stage_id"], st["stage_name"], "", st["subtotal"], ""])
+    writer.writerow(["total", "", "", "", summary["total"], ""])
+    return buf.getvalue()
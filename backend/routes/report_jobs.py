@@ -0,0 +1,238 @@
+# backend/routes/report_jobs.py
+#
+# Asynchronous report rendering. Jobs are persisted in the report_jobs table
+# and rendered in a per-worker ProcessPoolExecutor, so a large openpyxl render
+# never blocks a request thread. A job is claimed by exactly one worker, which
+# holds a lease on it (REPORT_JOB_LEASE_SECONDS) and renews it while the job
+# is in its pool. A sweeper thread in every worker renews those leases, claims
+# jobs whose lease ran out (their worker restarted or died), fails jobs that
+# lost REPORT_JOB_MAX_ATTEMPTS workers, and purges expired downloads.
+#
+# When a pool process dies (e.g. OOM-killed) the pool is broken for good: it
+# is replaced, and the jobs it was rendering are released for another claim.
+# Pool processes come from a forkserver: the pool is started lazily on a
+# request thread, and a plain fork there copies locks other threads hold.
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from models.report_jobs_model import (
+    claim_report_job,
+    create_report_job,
+    delete_expired_report_jobs,
+    fail_exhausted_report_jobs,
+    fail_report_job,
+    finish_report_job,
+    get_report_job,
+    list_claimable_report_jobs,
+    mark_report_job_running,
+    release_report_jobs,
+    renew_report_job_leases,
+)
+from routes.generate_report import build_report_data, render_report
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+# job id -> set once this worker's pool finishes the job; the keys are the
+# jobs whose leases this worker renews
+_done_events: dict[int, threading.Event] = {}
+# jobs whose pool broke under them, released by the next sweep
+_released: list[int] = []
+_sweeper_pid: int | None = None
+_sweeper_lock = threading.Lock()
+
+
+def _worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_report_job(
+    job_id: int,
+    worker: str,
+    product_id: int,
+    template_xlsx: str,
+    jobs_dir: str,
+    ttl_seconds: int,
+    mode: str = "exact",
+) -> str:
+    """
+    Render one job; runs inside a pool process and records the outcome itself.
+    Every attempt renders into its own file, and the outcome is only recorded
+    while `worker` still holds the claim: a worker whose lease ran out and
+    whose job was claimed again cannot overwrite the new owner's result.
+    """
+    fd, output_path = tempfile.mkstemp(dir=jobs_dir, prefix=f"{job_id}-", suffix=".xlsx")
+    os.close(fd)
+    try:
+        mark_report_job_running(job_id, worker)
+        data = build_report_data(product_id)
+        if data is None:
+            raise ValueError(f"product_id={product_id} does not exist")
+
+        render_report(data, template_xlsx, output_path, mode=mode)
+        if finish_report_job(job_id, worker, output_path, ttl_seconds):
+            return "done"
+        Path(output_path).unlink(missing_ok=True)
+        return "lost"
+    except Exception as e:
+        Path(output_path).unlink(missing_ok=True)
+        fail_report_job(job_id, worker, f"{type(e).__name__}: {e}")
+        return "failed"
+
+
+def _get_pool(config) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            Path(config["REPORT_JOBS_DIR"]).mkdir(parents=True, exist_ok=True)
+            _pool = ProcessPoolExecutor(
+                max_workers=config["REPORT_JOB_WORKERS"],
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor) -> bool:
+    """Forget a broken pool; the next _get_pool starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is not broken:
+            return False
+        _pool = None
+        return True
+
+
+def _submit(config, fn, *args) -> tuple[ProcessPoolExecutor, Future]:
+    pool = _get_pool(config)
+    try:
+        return pool, pool.submit(fn, *args)
+    except BrokenProcessPool:
+        # a pool process died since the last job; start a new pool once
+        if _discard_pool(pool):
+            pool.shutdown(wait=False)
+        pool = _get_pool(config)
+        return pool, pool.submit(fn, *args)
+
+
+def _job_finished(job_id: int, pool: ProcessPoolExecutor, future: Future):
+    # runs on the pool's management thread: no database work here
+    if future.cancelled() or future.exception() is not None:
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            _discard_pool(pool)
+        with _pool_lock:
+            _released.append(job_id)
+    event = _done_events.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+
+def _dispatch(config, job_id: int, product_id: int) -> bool:
+    worker = _worker_name()
+    if not claim_report_job(job_id, worker, config["REPORT_JOB_LEASE_SECONDS"], config["REPORT_JOB_MAX_ATTEMPTS"]):
+        return False  # another worker owns it
+
+    _done_events[job_id] = threading.Event()
+    try:
+        pool, future = _submit(
+            config,
+            run_report_job,
+            job_id,
+            worker,
+            product_id,
+            config["REPORT_TEMPLATE"],
+            config["REPORT_JOBS_DIR"],
+            config["REPORT_JOB_TTL_SECONDS"],
+            config["REPORT_RENDER_MODE"],
+        )
+    except Exception as e:
+        # leave it to the next sweep (here or in another worker)
+        _done_events.pop(job_id, None)
+        release_report_jobs([job_id], worker)
+        print(f"report job {job_id}: submit failed: {type(e).__name__}: {e}")
+        return False
+    future.add_done_callback(lambda f: _job_finished(job_id, pool, f))
+    return True
+
+
+def submit_report_job(config, product_id: int) -> int:
+    start_report_job_sweeper(config)
+    job_id = create_report_job(product_id)
+    _dispatch(config, job_id, product_id)
+    return job_id
+
+
+def recover_report_jobs(config) -> int:
+    recovered = 0
+    for job in list_claimable_report_jobs(config["REPORT_JOB_MAX_ATTEMPTS"]):
+        if _dispatch(config, job["id"], job["product_id"]):
+            recovered += 1
+    return recovered
+
+
+def sweep_report_jobs(config) -> int:
+    """One heartbeat: renew this worker's leases, then reclaim and purge. Returns jobs recovered."""
+    worker = _worker_name()
+    renew_report_job_leases(list(_done_events), worker, config["REPORT_JOB_LEASE_SECONDS"])
+    with _pool_lock:
+        released = _released[:]
+        del _released[:]
+    release_report_jobs(released, worker)
+    fail_exhausted_report_jobs(config["REPORT_JOB_MAX_ATTEMPTS"])
+    recovered = recover_report_jobs(config)
+    purge_expired_report_jobs()
+    return recovered
+
+
+def _sweep_loop(config):
+    while True:
+        time.sleep(config["REPORT_JOB_HEARTBEAT_SECONDS"])
+        try:
+            sweep_report_jobs(config)
+        except Exception as e:  # DB hiccup: leases outlive a few missed beats
+            print(f"report jobs: sweep failed: {type(e).__name__}: {e}")
+
+
+def start_report_job_sweeper(config):
+    """Start this worker's sweeper thread (once per process)."""
+    global _sweeper_pid
+    if multiprocessing.parent_process() is not None:
+        return  # a pool process re-importing the main module (python app.py)
+    with _sweeper_lock:
+        if _sweeper_pid == os.getpid():
+            return
+        _sweeper_pid = os.getpid()
+    threading.Thread(target=_sweep_loop, args=(config,), name="report-jobs", daemon=True).start()
+
+
+def purge_expired_report_jobs() -> int:
+    paths = delete_expired_report_jobs()
+    for p in paths:
+        Path(p).unlink(missing_ok=True)
+    return len(paths)
+
+
+def wait_for_report_job(job_id: int, timeout: float) -> dict | None:
+    """Long-poll: return the job once it has finished or the timeout passed."""
+    event = _done_events.get(job_id)
+    if event is not None:
+        event.wait(timeout)
+        return get_report_job(job_id)
+
+    # rendered by another worker (or already finished): poll the row
+    deadline = time.monotonic() + timeout
+    job = get_report_job(job_id)
+    delay = 0.2
+    while job and job["status"] in ("queued", "running"):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 2.0)
+        job = get_report_job(job_id)
+    return job
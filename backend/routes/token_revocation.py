@@ -0,0 +1,211 @@
+# backend/routes/token_revocation.py
+#
+# Revocation check for every verified JWT (JWTManager's blocklist loader).
+# The revoked_tokens table is the source of truth; each worker mirrors its
+# keys ("session:<sid>", "user:<id>") in a Bloom filter that a background
+# thread extends by reading new rows by id every TOKEN_REVOCATION_SYNC_SECONDS.
+# Row ids are allocated before their transaction commits (delete_user holds
+# its row open with the DELETE), so the reader is an IdTail that keeps asking
+# for ids it skipped until they commit.
+# A token whose keys are not in the filter is not revoked, which is almost
+# every request and costs no query. A filter hit is confirmed against the
+# table (false positives are about TOKEN_REVOCATION_FP_RATE), and confirmed
+# revocations are remembered.
+#
+# Revocations made by this worker are added to its filter immediately; other
+# workers see them after their next sync. The filter cannot forget keys, so it
+# is rebuilt from the unexpired rows every REBUILD_SECONDS.
+#
+# "org:<id>" keys mark users whose organization changed; they revoke nothing,
+# but org_changed_at() tells auth_context to stop trusting the organization_id
+# claim of older tokens.
+import hashlib
+import math
+import threading
+import time
+
+from models.revoked_tokens_model import (
+    find_org_change,
+    find_revocation,
+    list_revocations_after,
+    purge_revocations,
+)
+from routes.id_tail import IdTail
+
+SYNC_PAGE = 5000
+REBUILD_SECONDS = 3600
+CONFIRMED_MAX = 10000  # confirmed revoked tokens (and org changes) remembered per worker
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def _key(kind: str, token_key) -> str:
+    return f"{kind}:{token_key}"
+
+
+class RevocationStore:
+    def __init__(self, capacity: int = 100000, fp_rate: float = 0.01, sync_seconds: float = 2):
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.sync_seconds = sync_seconds
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, fp_rate)
+        self._pos = IdTail()
+        self._confirmed: dict[str, None] = {}  # insertion-ordered set of revoked jtis
+        self._org_changes: dict[str, int | None] = {}  # user id -> last org change, once looked up
+        self._org_marks_seen = 0  # bumped per org mark, so a lookup racing one is not cached
+        self._counts = {"checks": 0, "bloom_hits": 0, "confirmed": 0, "false_positives": 0, "sync_errors": 0}
+        self._rebuild()
+        threading.Thread(target=self._sync_loop, name="token-revocation", daemon=True).start()
+
+    # ---- sync ----
+    def _load_into(self, bloom: BloomFilter, pos: IdTail):
+        now = int(time.time())
+        while True:
+            rows = list_revocations_after(pos.last_id, now, SYNC_PAGE, pos.gaps())
+            for row in pos.accept(rows):
+                bloom.add(_key(row["kind"], row["token_key"]))
+                if row["kind"] == "org":
+                    with self._lock:
+                        self._org_changes.pop(row["token_key"], None)
+                        self._org_marks_seen += 1
+            if len(rows) < SYNC_PAGE:
+                return
+
+    def _rebuild(self):
+        """Replace the filter with one built from the unexpired rows."""
+        probe, pos = BloomFilter(self.capacity, self.fp_rate), IdTail()
+        self._load_into(probe, pos)
+        if probe.count > self.capacity // 2:
+            # keep the false-positive rate near its target as revocations pile up
+            self.capacity = probe.count * 2
+            probe, pos = BloomFilter(self.capacity, self.fp_rate), IdTail()
+            self._load_into(probe, pos)
+        with self._lock:
+            # rows that arrived while loading are picked up by the next sync
+            self._bloom = probe
+            self._pos = pos
+
+    def sync(self):
+        # only the sync thread moves the read position
+        with self._lock:
+            bloom, pos = self._bloom, self._pos
+        self._load_into(bloom, pos)
+
+    def _sync_loop(self):
+        next_rebuild = time.monotonic() + REBUILD_SECONDS
+        while True:
+            time.sleep(self.sync_seconds)
+            try:
+                if time.monotonic() >= next_rebuild:
+                    next_rebuild = time.monotonic() + REBUILD_SECONDS
+                    purge_revocations(int(time.time()))
+                    self._rebuild()
+                else:
+                    self.sync()
+            except Exception as e:  # DB hiccup: keep serving from the current filter
+                with self._lock:
+                    self._counts["sync_errors"] += 1
+                print(f"token revocation: sync failed: {type(e).__name__}: {e}")
+
+    # ---- checks ----
+    def note_revoked(self, kind: str, token_key):
+        """Make a revocation this worker just stored visible here at once."""
+        with self._lock:
+            self._bloom.add(_key(kind, token_key))
+            if kind == "org":
+                self._org_changes.pop(str(token_key), None)
+                self._org_marks_seen += 1
+
+    def is_revoked(self, claims: dict) -> bool:
+        sid = claims.get("sid")
+        user_id = str(claims.get("sub"))
+        jti = claims.get("jti")
+        with self._lock:
+            self._counts["checks"] += 1
+            if jti in self._confirmed:
+                return True
+            hit = (sid is not None and _key("session", sid) in self._bloom) or _key("user", user_id) in self._bloom
+            if not hit:
+                return False
+            self._counts["bloom_hits"] += 1
+
+        revoked = find_revocation(sid, user_id, int(claims.get("iat", 0)), int(time.time()))
+        with self._lock:
+            if revoked:
+                self._counts["confirmed"] += 1
+                self._confirmed[jti] = None
+                if len(self._confirmed) > CONFIRMED_MAX:
+                    self._confirmed.pop(next(iter(self._confirmed)))
+            else:
+                self._counts["false_positives"] += 1
+        return revoked
+
+    def org_changed_at(self, user_id) -> int | None:
+        """When the user's organization last changed (unix seconds), None when it did not recently."""
+        user_id = str(user_id)
+        with self._lock:
+            if _key("org", user_id) not in self._bloom:
+                return None
+            if user_id in self._org_changes:
+                return self._org_changes[user_id]
+            seen = self._org_marks_seen
+
+        changed = find_org_change(user_id, int(time.time()))
+        with self._lock:
+            if seen != self._org_marks_seen:
+                return changed
+            self._org_changes[user_id] = changed
+            if len(self._org_changes) > CONFIRMED_MAX:
+                self._org_changes.pop(next(iter(self._org_changes)))
+        return changed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counts,
+                "keys": self._bloom.count,
+                "capacity": self._bloom.capacity,
+                "bloom_bytes": len(self._bloom._bits),
+                "last_id": self._pos.last_id,
+                "open_gaps": self._pos.gap_count(),
+            }
+
+
+_store: RevocationStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_revocation_store(config) -> RevocationStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RevocationStore(
+                capacity=config["TOKEN_REVOCATION_CAPACITY"],
+                fp_rate=config["TOKEN_REVOCATION_FP_RATE"],
+                sync_seconds=config["TOKEN_REVOCATION_SYNC_SECONDS"],
+            )
+        return _store
@@ -77,6 +77,57 @@ app.post("/send", async (req, res) => {
   }
 });
 
+// POST /anchor: 後端以 Merkle root 批次上鏈，一筆交易涵蓋整批 emissions
+app.post("/anchor", async (req, res) => {
+  const { batch_id, merkle_root, leaf_count } = req.body;
+
+  if (!batch_id || !/^[0-9a-f]{64}$/.test(merkle_root || "") || !(leaf_count > 0)) {
+    return res.status(400).json({ ok: false, error: "Missing batch_id, merkle_root or leaf_count" });
+  }
+
+  try {
+    console.log(`⬆ Anchoring batch_id=${batch_id}, leaves=${leaf_count}, root=${merkle_root}`);
+
+    const content = JSON.stringify({ type: "merkle_batch", batch_id, merkle_root, leaf_count });
+    const tx = await contract.addRecord(content);
+    const receipt = await tx.wait();
+
+    // RecordStorage id of the root, for looking it up again via /record/:id
+    let recordId = null;
+    for (const log of receipt.logs) {
+      const parsed = contract.interface.parseLog(log);
+      if (parsed && parsed.name === "RecordUpdated") {
+        recordId = parsed.args.id.toString();
+        break;
+      }
+    }
+
+    console.log(`success: txHash=${tx.hash}, recordId=${recordId}`);
+
+    await axios.put(
+      process.env.CALLBACK_URL,
+      { batch_id, status: "submitted", tx_hash: tx.hash, record_id: recordId },
+      { headers: { "X-Chain-Secret": process.env.CHAIN_SECRET } }
+    );
+
+    res.json({ ok: true, txHash: tx.hash, recordId });
+  } catch (err) {
+    console.error(" Error anchoring:", err);
+
+    try {
+      await axios.put(
+        process.env.CALLBACK_URL,
+        { batch_id, status: "failed", error_msg: err.message },
+        { headers: { "X-Chain-Secret": process.env.CHAIN_SECRET || ""} }
+      );
+    } catch (callbackErr) {
+      console.error("Callback failed:", callbackErr);
+    }
+
+    res.status(500).json({ ok: false, error: err.message });
+  }
+});
+
 // GET /record/:id
 // fetching record from blockchain
 app.get("/record/:id", async(req, res) => {
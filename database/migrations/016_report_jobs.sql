@@ -0,0 +1,23 @@
+-- 016_report_jobs.sql
+-- Queue for asynchronous report rendering.
+-- A job is claimed by one backend worker (claimed_by = host:pid); jobs whose
+-- claim went stale (worker restarted) are picked up again by another worker.
+
+CREATE TABLE IF NOT EXISTS report_jobs (
+  id           BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+  product_id   BIGINT UNSIGNED NOT NULL,
+  status       ENUM('queued','running','done','failed') NOT NULL DEFAULT 'queued',
+  file_path    VARCHAR(500) NULL,             -- rendered workbook once done
+  error_msg    VARCHAR(500) NULL,
+  claimed_by   VARCHAR(100) NULL,
+  claimed_at   TIMESTAMP NULL,
+  expires_at   TIMESTAMP NULL,                -- file is downloadable until then
+  created_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at   TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  CONSTRAINT `fk_products_report_jobs_product_id`
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE,
+
+  KEY idx_report_jobs_status (status, claimed_at),
+  KEY idx_report_jobs_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,14 @@
+-- 017_onchain_outbox.sql
+-- Turn emissions_onchain into an outbox drained by the on-chain dispatcher.
+-- A row is claimed by one dispatcher (claimed_by = host:pid) while it is being
+-- sent; claims older than the dispatcher's lease are taken over by another.
+-- Failed sends are retried after next_attempt_at; rows that keep failing end
+-- up in the 'dead' (dead-letter) state until they are re-queued.
+
+ALTER TABLE emissions_onchain
+  MODIFY COLUMN status ENUM('pending','submitted','confirmed','failed','dead') NOT NULL DEFAULT 'pending',
+  ADD COLUMN attempts        INT UNSIGNED NOT NULL DEFAULT 0 AFTER error_msg,
+  ADD COLUMN next_attempt_at TIMESTAMP NULL AFTER attempts,
+  ADD COLUMN claimed_by      VARCHAR(100) NULL AFTER next_attempt_at,
+  ADD COLUMN claimed_at      TIMESTAMP NULL AFTER claimed_by,
+  ADD KEY idx_onchain_outbox (status, next_attempt_at);
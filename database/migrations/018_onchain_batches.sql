@@ -0,0 +1,34 @@
+-- 018_onchain_batches.sql
+-- Merkle-batched anchoring: the dispatcher groups pending emissions into a
+-- batch, anchors only the batch's Merkle root in one transaction, and stores
+-- each emission's leaf hash and inclusion proof next to its outbox row.
+-- Emissions of one batch share the batch's tx_hash, so tx_hash is no longer
+-- unique per row.
+
+SET NAMES utf8mb4;
+
+CREATE TABLE IF NOT EXISTS onchain_batches (
+  id             BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+  merkle_root    CHAR(64) NOT NULL,             -- hex sha256, see routes/onchain_merkle.py
+  leaf_count     INT UNSIGNED NOT NULL,
+  status         ENUM('pending','submitted','confirmed','failed') NOT NULL DEFAULT 'pending',
+  tx_hash        VARCHAR(66) NULL,
+  record_id      BIGINT UNSIGNED NULL,          -- RecordStorage id holding the root
+  error_msg      VARCHAR(500) NULL,
+  created_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  updated_at     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+  UNIQUE KEY ux_batch_tx_hash (tx_hash),
+  KEY idx_batch_status (status)
+);
+
+ALTER TABLE emissions_onchain
+  DROP INDEX ux_tx_hash,
+  ADD KEY idx_tx_hash (tx_hash),
+  ADD COLUMN batch_id     BIGINT UNSIGNED NULL AFTER tx_hash,
+  ADD COLUMN leaf_index   INT UNSIGNED NULL AFTER batch_id,
+  ADD COLUMN leaf_hash    CHAR(64) NULL AFTER leaf_index,
+  ADD COLUMN merkle_proof JSON NULL AFTER leaf_hash,
+  ADD KEY idx_onchain_batch (batch_id),
+  ADD CONSTRAINT fk_eo_batch FOREIGN KEY (batch_id)
+    REFERENCES onchain_batches(id) ON DELETE SET NULL;
@@ -0,0 +1,11 @@
+-- 019_onchain_payload_hash.sql
+-- Canonical payload hashes (sha256 of the sorted-key, compact JSON payload):
+--   payload_hash   the payload currently queued in payload_json
+--   anchored_hash  the payload last written on chain for this emission
+-- Re-posting an unchanged payload is a no-op, and the dispatcher settles a
+-- pending row without a transaction when payload_hash = anchored_hash.
+-- Existing rows start with NULL hashes and are sent once more when re-posted.
+
+ALTER TABLE emissions_onchain
+  ADD COLUMN payload_hash  CHAR(64) NULL AFTER payload_json,
+  ADD COLUMN anchored_hash CHAR(64) NULL AFTER payload_hash;
@@ -0,0 +1,21 @@
+-- 020_onchain_events.sql
+-- Append-only log of on-chain status transitions, written in the same
+-- transaction as the status change. Every backend process tails it by id and
+-- pushes new events to its server-sent-event subscribers, so the stream works
+-- across workers and for changes made by the dispatcher process.
+-- Events older than CHAIN_EVENTS_RETENTION_HOURS are purged by the tailers.
+
+CREATE TABLE IF NOT EXISTS onchain_events (
+  id               BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+  emission_id      BIGINT UNSIGNED NOT NULL,
+  product_id       BIGINT UNSIGNED NOT NULL,
+  organization_id  BIGINT UNSIGNED NULL,
+  status           ENUM('pending','submitted','confirmed','failed','dead') NOT NULL,
+  tx_hash          VARCHAR(66) NULL,
+  created_at       TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+  KEY idx_event_emission (emission_id, id),
+  KEY idx_event_product (product_id, id),
+  KEY idx_event_org (organization_id, id),
+  KEY idx_event_created (created_at)
+);
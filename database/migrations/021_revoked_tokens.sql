@@ -0,0 +1,18 @@
+-- 021_revoked_tokens.sql
+-- Revoked JWTs. A 'session' row revokes every token of one sign-in (the sid
+-- claim shared by its access and refresh tokens, e.g. on logout); a 'user' row
+-- revokes every token of a user issued at or before revoked_at (e.g. when the
+-- user is deleted). Each backend worker mirrors the keys in a Bloom filter and
+-- reads new rows by id, so the common "not revoked" check needs no query.
+-- Rows are purged once every token they could match has expired.
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+  id          BIGINT UNSIGNED PRIMARY KEY AUTO_INCREMENT,
+  kind        ENUM('session','user') NOT NULL,
+  token_key   VARCHAR(64) NOT NULL,            -- sid claim or user id
+  revoked_at  BIGINT NOT NULL,                 -- unix seconds
+  expires_at  BIGINT NOT NULL,                 -- unix seconds; no matching token outlives it
+
+  KEY idx_revoked_key (kind, token_key),
+  KEY idx_revoked_expires (expires_at)
+);
@@ -0,0 +1,7 @@
+-- 022_products_keyset.sql
+-- Keyset pagination of a product type's products, newest first:
+-- WHERE organization_id = ? AND type_id = ? AND (created_at, id) < cursor
+-- ORDER BY created_at DESC, id DESC reads one index range.
+
+ALTER TABLE products
+  ADD KEY idx_prod_org_type_created (organization_id, type_id, created_at, id);
@@ -0,0 +1,20 @@
+-- 023_product_type_sequences.sql
+-- Per-organization counter for product_types.order_id. create_product_type
+-- bumps one row with UPDATE ... LAST_INSERT_ID(...) in its own tiny
+-- transaction instead of SELECT MAX(order_id) ... FOR UPDATE, which scanned
+-- and gap-locked the organization's product types for the whole insert.
+-- Organizations without a row get one on their first create.
+
+CREATE TABLE IF NOT EXISTS product_type_sequences (
+  organization_id  BIGINT UNSIGNED PRIMARY KEY,
+  next_order_id    INT UNSIGNED NOT NULL,
+
+  CONSTRAINT fk_pt_seq_org FOREIGN KEY (organization_id)
+    REFERENCES organizations(id) ON DELETE CASCADE
+);
+
+INSERT INTO product_type_sequences (organization_id, next_order_id)
+SELECT organization_id, MAX(order_id) + 1
+FROM product_types
+GROUP BY organization_id
+ON DUPLICATE KEY UPDATE next_order_id = GREATEST(next_order_id, VALUES(next_order_id));
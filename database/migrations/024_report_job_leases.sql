@@ -0,0 +1,19 @@
+-- 024_report_job_leases.sql
+-- Leases for asynchronous report jobs. The worker that claims a job holds it
+-- until lease_until and renews the lease while the job is in its pool, so a
+-- job orphaned by a restarted worker is re-claimed within a lease period
+-- instead of after a fixed staleness window. attempts counts claims; a job
+-- that keeps losing its worker (e.g. the render is OOM-killed) is failed
+-- after REPORT_JOB_MAX_ATTEMPTS.
+-- Jobs claimed before this migration keep their old 15 minute window.
+
+ALTER TABLE report_jobs
+  ADD COLUMN lease_until TIMESTAMP NULL AFTER claimed_at,
+  ADD COLUMN attempts    INT UNSIGNED NOT NULL DEFAULT 0 AFTER lease_until,
+  DROP KEY idx_report_jobs_status,
+  ADD KEY idx_report_jobs_lease (status, lease_until);
+
+UPDATE report_jobs
+SET lease_until = claimed_at + INTERVAL 900 SECOND
+WHERE claimed_at IS NOT NULL
+  AND status IN ('queued', 'running');
@@ -0,0 +1,19 @@
+-- 025_onchain_sent_hash.sql
+-- Split "sent" from "confirmed" payload hashes:
+--   sent_hash      the payload of the last transaction handed to chain-service
+--   anchored_hash  the payload of the last transaction known to be mined
+-- anchored_hash used to be written at send time, so a transaction that later
+-- failed still looked anchored and the dispatcher settled the requeued row
+-- without resending it. Now it is set only once chain-service reports the
+-- transaction mined: a successful /send or /anchor response, or a
+-- 'submitted'/'confirmed' callback (chain-service sends both after tx.wait()).
+-- Existing rows keep their hash as sent_hash; it only counts as anchored for
+-- rows that are submitted or confirmed.
+
+ALTER TABLE emissions_onchain
+  ADD COLUMN sent_hash CHAR(64) NULL AFTER payload_hash;
+
+UPDATE emissions_onchain
+SET sent_hash = anchored_hash,
+    anchored_hash = IF(status IN ('submitted', 'confirmed'), anchored_hash, NULL)
+WHERE anchored_hash IS NOT NULL;
@@ -0,0 +1,10 @@
+-- 026_org_change_marks.sql
+-- 'org' rows in revoked_tokens mark that a user's organization changed at
+-- revoked_at. They revoke nothing: tokens issued before then stay valid, but
+-- every worker (through the same Bloom filter sync as revocations) stops
+-- trusting their organization_id claim and reads users.organization_id
+-- instead. They expire with the last access token that could carry the old
+-- claim; refreshed tokens always get a freshly read organization.
+
+ALTER TABLE revoked_tokens
+  MODIFY kind ENUM('session','user','org') NOT NULL;
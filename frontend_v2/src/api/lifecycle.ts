@@ -16,6 +16,8 @@
 //    DELETE /api/emissions/:emissionId
 // - Factors:
 //    GET /api/factors
+// - Lifecycle tree (product → stages → steps → emissions, one request):
+//    GET /api/products/:productId/lifecycle
 //
 // NOTE: 後端未公開 /api/stages 時：
 //   1) 先讀 localStorage 覆蓋（lifecycle:stageMap，可放 {raw:'raw',...} 或 legacy 數字版 map）
@@ -672,6 +674,67 @@ export async function apiListEmissionsByProduct(
   }
 }
 
+/* ========== lifecycle tree（一次取回 steps + emissions） ========== */
+// 後端回 ETag；http 預設 no-store，這裡改用 no-cache 讓瀏覽器存下回應並帶
+// If-None-Match 重新驗證，內容沒變時後端只回 304，fetch 拿到的是快取的 200
+function numericSuffix(v: any): number | null {
+  if (typeof v === "number") return v;
+  const m = String(v ?? "").match(/(\d+)$/);
+  return m ? Number(m[1]) : null;
+}
+
+export async function apiGetProductLifecycle(
+  productId: string | number
+): Promise<{
+  stepsByStage: Partial<Record<StageId, StepDTO[]>>;
+  emissions: EmissionDTO[];
+}> {
+  const res = await http.get<any>(
+    `/api/products/${encodeURIComponent(String(productId))}/lifecycle`,
+    undefined,
+    { cache: "no-cache" }
+  );
+  const stepsByStage: Partial<Record<StageId, StepDTO[]>> = {};
+  const emissions: EmissionDTO[] = [];
+  const productNum = numericSuffix(res?.product_id) ?? 0;
+
+  // 攤平成與 apiListStepsByStage / apiListEmissionsByProduct 相同的形狀
+  const toEmission = (stageId: StageId, e: any, stepId: any): EmissionDTO => ({
+    id: numericSuffix(e.emission_id) ?? 0,
+    product_id: productNum,
+    name: e.emission_name ?? "",
+    stage_id: stageId,
+    factor_id: e.factor_id ?? null,
+    tag_id: numericSuffix(e.tag_id),
+    step_id: numericSuffix(stepId),
+    quantity: e.quantity ?? null,
+    emission_amount: e.emission_amount ?? null,
+    factor_unit: e.factor_unit ?? null,
+    created_at: e.created_at ?? undefined,
+  });
+
+  for (const stage of res?.stages ?? []) {
+    const stageId = stage.stage_id as StageId;
+    stepsByStage[stageId] = (stage.steps ?? []).map((st: any) => {
+      for (const e of st.emissions ?? []) {
+        emissions.push(toEmission(stageId, e, st.step_id));
+      }
+      return {
+        id: st.step_id,
+        stage_id: stageId,
+        tag_id: st.tag_id ?? null,
+        name: st.step_name ?? "",
+        sort_order: typeof st.sort_order === "number" ? st.sort_order : null,
+      };
+    });
+    for (const e of stage.unassigned_emissions ?? []) {
+      emissions.push(toEmission(stageId, e, null));
+    }
+  }
+  emissions.sort((a, b) => a.id - b.id);
+  return { stepsByStage, emissions };
+}
+
 /* 建立 emission 的 payload */
 export interface CreateEmissionPayload {
   fixedStage?: StageKey; // 推薦用這個，由本檔轉 stage_id（字串）
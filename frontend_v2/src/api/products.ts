@@ -91,14 +91,19 @@ function encodeId(v: string | number): string {
   return encodeURIComponent(String(v));
 }
 
-// GET /api/product_types/:typeId/products
-export async function apiListProducts(
-  typeId: string
-): Promise<UIProduct[]> {
+// GET /api/product_types/:typeId/products?limit=&cursor=
+// One page, newest first; nextCursor is null on the last page
+export async function apiListProductsPage(
+  typeId: string,
+  cursor?: string | null,
+  limit = 100
+): Promise<{ items: UIProduct[]; nextCursor: string | null }> {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) params.set("cursor", cursor);
   const raw = await http.get<any>(
-    `/api/product_types/${encodeId(typeId)}/products`
+    `/api/product_types/${encodeId(typeId)}/products?${params}`
   );
-  return toUIList(raw);
+  return { items: toUIList(raw), nextCursor: raw?.next_cursor ?? null };
 }
 
 // POST /api/product_types/:typeId/products
@@ -3,7 +3,7 @@ import {
   apiSearchFactors,
   apiListFactorsByTag,
   apiListEmissionsByProduct,
-  apiListStepsByStage,
+  apiGetProductLifecycle,
   apiSaveStepOrder,
   FactorDTO,
   EmissionDTO,
@@ -328,72 +328,62 @@ export default function ProductLifeCyclePage() {
 
     setTarget(loadTarget(shopId, productId!));
 
-    // 後端 emissions
+    // 後端 lifecycle：一次取回 steps + emissions；若有 steps 則覆蓋對應階段
     (async () => {
+      let tree: Awaited<ReturnType<typeof apiGetProductLifecycle>>;
       try {
-        const list = await apiListEmissionsByProduct(pidForApi as any);
-        const mapped = (list || []).map(mapEmissionToLifeRecord);
-        setRecords(mapped);
+        tree = await apiGetProductLifecycle(pidForApi as any);
       } catch (e) {
-        console.error("[emissions] 載入產品排放紀錄失敗", e);
+        console.error("[lifecycle] 載入產品生命週期失敗", e);
         setRecords([]);
+        return;
       }
-    })();
-
-    // 後端 steps：若有資料則覆蓋對應階段的 steps
-    (async () => {
-      try {
-        const backendStepsByStage: Record<FixedStageId, UserStep[]> = {
-          raw: [],
-          manufacture: [],
-          distribution: [],
-          use: [],
-          disposal: [],
-        };
 
-        for (const s of FIXED_STAGE_TEMPLATES) {
-          const rows = await apiListStepsByStage(s.id as any, {
-            productId: pidForApi as any,
-          });
+      setRecords(tree.emissions.map(mapEmissionToLifeRecord));
+
+      const backendStepsByStage: Record<FixedStageId, UserStep[]> = {
+        raw: [],
+        manufacture: [],
+        distribution: [],
+        use: [],
+        disposal: [],
+      };
+
+      for (const s of FIXED_STAGE_TEMPLATES) {
+        const rows = tree.stepsByStage[s.id as StageId] ?? [];
+
+        backendStepsByStage[s.id] = rows.map((r) => {
+          let numericTagId: number | null = null;
+          if (typeof r.tag_id === "string") {
+            const m = r.tag_id.match(/\d+$/);
+            if (m) numericTagId = Number(m[0]);
+          } else if (typeof r.tag_id === "number") {
+            numericTagId = r.tag_id;
+          }
+
+          const tagName: StepTag =
+            (r.tag as StepTag | null) ||
+            (numericTagId != null
+              ? TAG_ID_TO_STEP_TAG[numericTagId] ?? (r.name as StepTag)
+              : (r.name as StepTag));
 
-          backendStepsByStage[s.id] = rows.map((r) => {
-            let numericTagId: number | null = null;
-            if (typeof r.tag_id === "string") {
-              const m = r.tag_id.match(/\d+$/);
-              if (m) numericTagId = Number(m[0]);
-            } else if (typeof r.tag_id === "number") {
-              numericTagId = r.tag_id;
-            }
-
-            const tagName: StepTag =
-              (r.tag as StepTag | null) ||
-              (numericTagId != null
-                ? TAG_ID_TO_STEP_TAG[numericTagId] ?? (r.name as StepTag)
-                : (r.name as StepTag));
-
-            return {
-              id: `db:${r.id}`,
-              label: r.name,
-              tag: tagName,
-            };
-          });
-        }
-
-        setStages((prev) =>
-          prev.map((s) => {
-            const backend = backendStepsByStage[s.id];
-            if (backend && backend.length) {
-              return { ...s, steps: backend };
-            }
-            return s;
-          })
-        );
-      } catch (e) {
-        console.warn(
-          "[steps] 載入後端 steps 失敗，暫時使用本地 stageConfig",
-          e
-        );
+          return {
+            id: `db:${r.id}`,
+            label: r.name,
+            tag: tagName,
+          };
+        });
       }
+
+      setStages((prev) =>
+        prev.map((s) => {
+          const backend = backendStepsByStage[s.id];
+          if (backend && backend.length) {
+            return { ...s, steps: backend };
+          }
+          return s;
+        })
+      );
     })();
   }, [productId, workingShopId, canRead, canEdit, ready]);
 
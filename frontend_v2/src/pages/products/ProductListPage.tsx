@@ -9,7 +9,7 @@ import { useUser } from "@/context/UserContext";
 import { PrimaryButton, GhostButton } from "@/ui/primitives/Button";
 
 import {
-  apiListProducts,
+  apiListProductsPage,
   apiCreateProduct,
   apiDeleteProduct,
   apiUpdateProduct,
@@ -83,6 +83,34 @@ type TidLike = "__all" | string;
 // 在前端多加一個 _typeId（字串），記錄這個商品屬於哪個分類
 type ProductRow = UIProduct & { _typeId?: string };
 
+// typeId -> 下一頁的 cursor（null = 已到最後一頁）
+type Cursors = Record<string, string | null>;
+
+const PAGE_SIZE = 100;
+
+// 每個類型取一頁；cursors 有值時接著上次的位置往下取
+async function fetchTypePages(
+  typeIds: string[],
+  cursors?: Cursors
+): Promise<{ rows: ProductRow[]; cursors: Cursors }> {
+  const pages = await Promise.all(
+    typeIds.map((typeId) =>
+      apiListProductsPage(typeId, cursors?.[typeId], PAGE_SIZE).then(
+        (page) => ({ typeId, page })
+      )
+    )
+  );
+  const rows: ProductRow[] = [];
+  const next: Cursors = {};
+  for (const { typeId, page } of pages) {
+    next[typeId] = page.nextCursor;
+    rows.push(
+      ...page.items.map((p) => ({ ...p, _typeId: typeId } as ProductRow))
+    );
+  }
+  return { rows, cursors: next };
+}
+
 export default function ProductListPage() {
   const { user, isAuthed } = useUser();
   const account = user?.account ?? null;
@@ -195,12 +223,19 @@ export default function ProductListPage() {
   }, [tid, canEdit, typeOptions]);
 
   // ---------- 商品清單 ----------
+  // 先只載第一頁，其餘按「載入更多」再取
   const [products, setProducts] = useState<ProductRow[]>([]);
+  const [cursors, setCursors] = useState<Cursors>({});
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // 每次重新載入就 +1，讓還在跑的「載入更多」結果作廢
+  const listGenRef = useRef(0);
+  const hasMore = Object.values(cursors).some(Boolean);
 
   // 依照目前 tid 載入商品清單
   useEffect(() => {
     let cancelled = false;
+    listGenRef.current += 1;
 
     (async () => {
       setLoading(true);
@@ -219,56 +254,35 @@ export default function ProductListPage() {
             }
           }
 
-          if (types.length === 0) {
-            if (!cancelled) setProducts([]);
+          const typeIds = types.map(getTypeDisplayId).filter(Boolean);
+          if (typeIds.length === 0) {
+            if (!cancelled) {
+              setProducts([]);
+              setCursors({});
+            }
             return;
           }
 
-          const promises = types
-            .map((t) => {
-              const typeId = getTypeDisplayId(t);
-              if (!typeId) return null;
-              return apiListProducts(typeId).then((list) =>
-                list.map(
-                  (p) =>
-                    ({
-                      ...p,
-                      _typeId: typeId,
-                    } as ProductRow)
-                )
-              );
-            })
-            .filter(
-              (x): x is Promise<ProductRow[]> => x !== null
-            );
-
-          if (promises.length === 0) {
-            if (!cancelled) setProducts([]);
-            return;
+          const first = await fetchTypePages(typeIds);
+          if (!cancelled) {
+            setProducts(first.rows);
+            setCursors(first.cursors);
           }
-
-          const chunks = await Promise.all(promises);
-          const all = chunks.flat();
-          if (!cancelled) setProducts(all);
           return;
         }
 
         // 指定單一類型
-        const list = await apiListProducts(tid);
+        const first = await fetchTypePages([tid]);
         if (!cancelled) {
-          setProducts(
-            list.map(
-              (p) =>
-                ({
-                  ...p,
-                  _typeId: tid,
-                } as ProductRow)
-            )
-          );
+          setProducts(first.rows);
+          setCursors(first.cursors);
         }
       } catch (e) {
         console.error("[ProductList] list products failed:", e);
-        if (!cancelled) setProducts([]);
+        if (!cancelled) {
+          setProducts([]);
+          setCursors({});
+        }
       } finally {
         if (!cancelled) setLoading(false);
       }
@@ -284,61 +298,48 @@ export default function ProductListPage() {
     const target: TidLike = tidOverride ?? tid;
     if (!target) return;
 
-    setLoading(true);
-
-    if (target === "__all") {
-      if (typeOptions.length === 0) {
-        setProducts([]);
-        setLoading(false);
-        return;
-      }
-
-      const promises = typeOptions
-        .map((t) => {
-          const typeId = getTypeDisplayId(t);
-          if (!typeId) return null;
-          return apiListProducts(typeId).then((list) =>
-            list.map(
-              (p) =>
-                ({
-                  ...p,
-                  _typeId: typeId,
-                } as ProductRow)
-            )
-          );
-        })
-        .filter(
-          (x): x is Promise<ProductRow[]> => x !== null
-        );
-
-      if (promises.length === 0) {
-        setProducts([]);
-        setLoading(false);
-        return;
-      }
+    const typeIds =
+      target === "__all"
+        ? typeOptions.map(getTypeDisplayId).filter(Boolean)
+        : [target];
+    const gen = ++listGenRef.current;
 
-      Promise.all(promises)
-        .then((chunks) => setProducts(chunks.flat()))
-        .finally(() => setLoading(false));
+    if (typeIds.length === 0) {
+      setProducts([]);
+      setCursors({});
+      setLoading(false);
       return;
     }
 
-    // 單一類型
-    apiListProducts(target)
-      .then((list) =>
-        setProducts(
-          list.map(
-            (p) =>
-              ({
-                ...p,
-                _typeId: target,
-              } as ProductRow)
-          )
-        )
-      )
+    setLoading(true);
+    fetchTypePages(typeIds)
+      .then((first) => {
+        if (gen !== listGenRef.current) return;
+        setProducts(first.rows);
+        setCursors(first.cursors);
+      })
       .finally(() => setLoading(false));
   }
 
+  // 還有下一頁的類型各再取一頁，接在目前清單後面
+  async function loadMore() {
+    const typeIds = Object.keys(cursors).filter((t) => cursors[t]);
+    if (!typeIds.length || loadingMore) return;
+
+    const gen = listGenRef.current;
+    setLoadingMore(true);
+    try {
+      const more = await fetchTypePages(typeIds, cursors);
+      if (gen !== listGenRef.current) return;
+      setProducts((prev) => [...prev, ...more.rows]);
+      setCursors((prev) => ({ ...prev, ...more.cursors }));
+    } catch (e) {
+      console.error("[ProductList] load more products failed:", e);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   // 取得「這次新增商品要用哪個 typeId」
   async function ensureTypeIdToUse(): Promise<string> {
     // 選「新增類型…」
@@ -724,6 +725,24 @@ export default function ProductListPage() {
               })
             )}
           </S.List>
+
+          {hasMore && (
+            <div
+              style={{
+                display: "flex",
+                justifyContent: "center",
+                marginTop: 16,
+              }}
+            >
+              <GhostButton
+                type="button"
+                onClick={loadMore}
+                disabled={loadingMore}
+              >
+                {loadingMore ? "載入中…" : "載入更多"}
+              </GhostButton>
+            </div>
+          )}
         </>
       )}
 